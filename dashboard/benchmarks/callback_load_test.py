@@ -0,0 +1,304 @@
+"""
+Concurrent load test of the update_output_div callback.
+
+Run from the dashboard directory, fully offline on a synthetic dataset:
+
+    python -m benchmarks.callback_load_test --requests 200 --concurrency 4
+
+Requests are sent through the Flask test client of the app by default. The test client
+runs every request in this process, so concurrent requests compete for one GIL like the
+threads of a single gunicorn worker. To measure a whole instance, start gunicorn on the
+prepared data directory and pass its address:
+
+    CTX_DATA_DIR=/tmp/ctx-load-test gunicorn --config ../docker/gunicorn.conf.py ctxdashboard.app:server
+    python -m benchmarks.callback_load_test --data-dir /tmp/ctx-load-test --url http://localhost:8080
+
+With CTX_BACKGROUND_CALLBACKS=1 the callback runs as a background job and a request polls
+for the result like the dash renderer does, so latencies include the job start and the
+poll interval.
+
+Inputs are drawn at random around the defaults of the filter form, e.g. most requests
+keep a filter unset and some narrow it down to a subset of the patient meta values.
+Every request comes from its own session, so none is dropped as superseded. With
+--identical all requests of a run send the same inputs, like many researchers opening
+the dashboard with the default filters, and concurrent ones share one computation.
+With --criteria-only all requests of a run keep the filters and only change the
+acceptance criteria. They send the figure signature of a first response like a page
+that already shows these patients, so the heatmaps and the pie chart are patched.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+from ctxfitness.preprocessing_pipeline import RAW_DAILIES_EXCEL_COLUMN_FILTER, PreprocessingPipeline
+from ctxfitness.synthetic_dailies import SyntheticDailiesConfig, generate_dailies
+from ctxdashboard.data_store.dashboard_data_store import DAILIES_EXCEL_FILE, PATIENT_META_EXCEL_FILE, SNAPSHOT_CURRENT_FILE, SNAPSHOT_DIR, build_snapshot
+from ctxdashboard.domain.acceptance_windows import ACCEPTANCE_WINDOWS
+from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc
+from ctxdashboard.util.background_callbacks import BACKGROUND_POLL_INTERVAL_MS
+from ctxdashboard.util.payload_size import DASH_UPDATE_COMPONENT_PATH
+from ctxdashboard.util.warm_up import READY_PATH
+
+INCLUDE_UNKNOWN = "Include unknown"
+# probability that a request narrows down one of the optional patient filters
+FILTER_PROBABILITY = 0.25
+DEFAULT_N_PATIENTS = 40
+DEFAULT_N_DAYS = 120
+
+
+@dataclass
+class LoadTestReport:
+    requests: int
+    errors: int
+    concurrency: int
+    seconds: float
+    throughput_per_s: float
+    latency_p50_s: float
+    latency_p95_s: float
+    latency_p99_s: float
+    latency_max_s: float
+    mean_payload_bytes: float
+
+
+def prepare_data_dir(data_dir: str, n_patients: int, n_days: int, seed: int) -> None:
+    """
+    Writes the synthetic dailies, run through the preprocessing pipeline, and patient meta
+    data as the dashboard expects them and builds the snapshot. Existing datasets are reused.
+    """
+    if os.path.exists(os.path.join(data_dir, SNAPSHOT_DIR, SNAPSHOT_CURRENT_FILE)):
+        return
+    os.makedirs(data_dir, exist_ok=True)
+    logging.getLogger("IntervalNormalizer").setLevel(logging.CRITICAL)
+    df_raw, df_patient_meta = generate_dailies(SyntheticDailiesConfig(
+        n_patients=n_patients, n_study_days=n_days, seed=seed))
+    PreprocessingPipeline.run_pipeline_on_frame(df_raw[RAW_DAILIES_EXCEL_COLUMN_FILTER]).to_excel(
+        os.path.join(data_dir, DAILIES_EXCEL_FILE))
+    df_patient_meta.to_excel(os.path.join(data_dir, PATIENT_META_EXCEL_FILE), index=False)
+    build_snapshot(data_dir)
+
+
+def random_subset(rng: np.random.Generator, series: pd.Series) -> List[str]:
+    if rng.random() > FILTER_PROBABILITY:
+        return []
+    values = [str(value) for value in series.unique()]
+    return list(rng.choice(values, size=rng.integers(1, len(values) + 1), replace=False))
+
+
+def random_interval(rng: np.random.Generator, series: pd.Series) -> List[int]:
+    min_value, max_value = int(np.floor(series.min())), int(np.ceil(series.max()))
+    if rng.random() > FILTER_PROBABILITY:
+        return [min_value, max_value]
+    return sorted(int(value) for value in rng.integers(min_value, max_value + 1, 2))
+
+
+def create_random_inputs(rng: np.random.Generator, patient_cofactors: pd.DataFrame) -> List[Any]:
+    # in the order of the inputs of update_output_div
+    min_days = int(rng.integers(1, 15))
+    return [
+        int(np.clip(np.round(rng.normal(8, 3)), 1, 24)),
+        min_days,
+        int(rng.integers(1, min_days + 1)),
+        str(rng.choice(list(ACCEPTANCE_WINDOWS))),
+        int(rng.integers(min_days, 60)),
+        random_subset(rng, patient_cofactors[pmc.ECOG]),
+        random_interval(rng, patient_cofactors[pmc.AGE]),
+        random_subset(rng, patient_cofactors[pmc.GENDER]),
+        random_subset(rng, patient_cofactors[pmc.THERAPY]),
+        random_subset(rng, patient_cofactors[pmc.THERAPY_REGIMEN]),
+        random_subset(rng, patient_cofactors[pmc.TREATMENT_NAIVE]),
+        random_subset(rng, patient_cofactors[pmc.PRIOR_TREATMENT]),
+        random_subset(rng, patient_cofactors[pmc.PRIMARY_TUMOR]),
+        random_interval(rng, patient_cofactors[pmc.TUG]),
+        [INCLUDE_UNKNOWN] if rng.random() > FILTER_PROBABILITY else [],
+        random_interval(rng, patient_cofactors[pmc.HGS]),
+        [INCLUDE_UNKNOWN] if rng.random() > FILTER_PROBABILITY else [],
+    ]
+
+
+def create_payload(callback_id: str,
+                   callback: Dict[str, Any],
+                   values: List[Any],
+                   state_values: Dict[str, Any]) -> Dict[str, Any]:
+    # the body the dash renderer posts when one of the inputs changes, states are looked up by component id
+    callback_inputs = callback["inputs"]
+    return {
+        "output": callback_id,
+        "outputs": [{"id": output.split(".")[0], "property": output.split(".")[1]}
+                    for output in callback_id.strip(".").split("...")],
+        "inputs": [dict(callback_input, value=value) for callback_input, value in zip(callback_inputs, values)],
+        "state": [dict(callback_state, value=state_values.get(callback_state["id"])) for callback_state in callback["state"]],
+        "changedPropIds": [f"{callback_inputs[0]['id']}.{callback_inputs[0]['property']}"],
+    }
+
+
+def send_and_poll(post: Callable[[Dict[str, Any], Dict[str, str]], Tuple[int, bytes]],
+                  payload: Dict[str, Any]) -> Tuple[int, bytes]:
+    status, body = post(payload, {})
+    if status != 200 or not body.startswith(b'{"cacheKey"'):
+        return status, body
+    # a background job was started, poll with its handles until the outputs arrive
+    handles = json.loads(body)
+    query = {"cacheKey": handles["cacheKey"], "job": handles["job"]}
+    while True:
+        time.sleep(BACKGROUND_POLL_INTERVAL_MS / 1000)
+        status, body = post(payload, query)
+        if status != 200 or b'"response":' in body:
+            return status, body
+
+
+def create_test_client_sender(server: Any) -> Callable[[Dict[str, Any]], Tuple[int, bytes]]:
+    def post(payload: Dict[str, Any], query: Dict[str, str]) -> Tuple[int, bytes]:
+        response = server.test_client().post(DASH_UPDATE_COMPONENT_PATH, json=payload, query_string=query)
+        return response.status_code, response.data
+
+    def send(payload: Dict[str, Any]) -> Tuple[int, bytes]:
+        return send_and_poll(post, payload)
+    return send
+
+
+def create_http_sender(url: str) -> Callable[[Dict[str, Any]], Tuple[int, bytes]]:
+    def post(payload: Dict[str, Any], query: Dict[str, str]) -> Tuple[int, bytes]:
+        request = urllib.request.Request(
+            url.rstrip("/") + DASH_UPDATE_COMPONENT_PATH + ("?" + urllib.parse.urlencode(query) if query else ""),
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read()
+
+    def send(payload: Dict[str, Any]) -> Tuple[int, bytes]:
+        return send_and_poll(post, payload)
+    return send
+
+
+def wait_until_ready(app_module: Any, url: Union[str, None]) -> float:
+    # the runs measure warmed up workers, like the platform only routes traffic to ready ones
+    start = time.perf_counter()
+    if url is None:
+        app_module.warm_up.ensure_started()
+        app_module.warm_up.ready.wait()
+    else:
+        while True:
+            try:
+                with urllib.request.urlopen(url.rstrip("/") + READY_PATH) as response:
+                    if response.status == 200:
+                        break
+            except urllib.error.HTTPError:
+                pass
+            time.sleep(0.5)
+    return time.perf_counter() - start
+
+
+def run_load_test(send: Callable[[Dict[str, Any]], Tuple[int, bytes]],
+                  payloads: List[Dict[str, Any]],
+                  concurrency: int) -> LoadTestReport:
+    def timed_send(payload: Dict[str, Any]) -> Tuple[float, bool, int]:
+        start = time.perf_counter()
+        try:
+            status, body = send(payload)
+            n_bytes = len(body)
+        except Exception as e:
+            logging.getLogger("LoadTest").error(f"Request failed: {e}")
+            status, n_bytes = -1, 0
+        return time.perf_counter() - start, status == 200, n_bytes
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_send, payloads))
+    seconds = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ok, _n_bytes in results])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return LoadTestReport(
+        requests=len(results),
+        errors=sum(1 for _latency, ok, _n_bytes in results if not ok),
+        concurrency=concurrency,
+        seconds=seconds,
+        throughput_per_s=len(results) / seconds,
+        latency_p50_s=float(p50),
+        latency_p95_s=float(p95),
+        latency_p99_s=float(p99),
+        latency_max_s=float(latencies.max()),
+        mean_payload_bytes=float(np.mean([n_bytes for _latency, _ok, n_bytes in results])))
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent load test of the dashboard callback.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4],
+                        help="number of concurrent clients, one run per value")
+    parser.add_argument("--warmup", type=int, default=5, help="requests sent before every run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="dataset directory, a synthetic one is created if it is empty")
+    parser.add_argument("--patients", type=int, default=DEFAULT_N_PATIENTS)
+    parser.add_argument("--days", type=int, default=DEFAULT_N_DAYS)
+    parser.add_argument("--url", help="address of a running dashboard instead of the in-process test client")
+    parser.add_argument("--identical", action="store_true", help="send the same inputs with every request of a run")
+    parser.add_argument("--criteria-only", action="store_true",
+                        help="keep the filters of the first request of a run and only change the criteria")
+    parser.add_argument("--output", help="path of the JSON file the reports are written to")
+    args = parser.parse_args(argv)
+
+    tmp_dir: Union[tempfile.TemporaryDirectory, None] = None
+    if args.data_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        args.data_dir = tmp_dir.name
+    try:
+        prepare_data_dir(args.data_dir, args.patients, args.days, args.seed)
+        # the app loads its data store on import
+        os.environ["CTX_DATA_DIR"] = args.data_dir
+        app_module = importlib.import_module("ctxdashboard.app")
+        heatmap_output = f"{app_module.layout.out_times_heatmap.id}.figure"
+        session_store_id = app_module.layout.in_session_store.id
+        signature_store_id = app_module.layout.in_figure_signature_store.id
+        callback_id, callback = next((callback_id, callback) for callback_id, callback in app_module.app.callback_map.items()
+                                     if heatmap_output in callback_id.strip(".").split("..."))
+        patient_cofactors = app_module.data_store_holder.get().patient_cofactors
+
+        send = create_http_sender(args.url) if args.url is not None else create_test_client_sender(app_module.server)
+        print(f"ready after {wait_until_ready(app_module, args.url):.1f}s of warm-up")
+        rng = np.random.default_rng(args.seed)
+        reports: List[LoadTestReport] = []
+        for concurrency in args.concurrency:
+            inputs = [create_random_inputs(rng, patient_cofactors) for _ in range(args.warmup + args.requests)]
+            if args.identical:
+                inputs = [inputs[0]] * args.warmup + [inputs[args.warmup]] * args.requests
+            figure_signature = None
+            if args.criteria_only:
+                # the criteria are the first five inputs, the rest are the filters
+                inputs = [values[:5] + inputs[0][5:] for values in inputs]
+                _status, body = send(create_payload(callback_id, callback, inputs[0], {session_store_id: "load-test-signature"}))
+                figure_signature = json.loads(body)["response"][signature_store_id]["data"]
+            payloads = [create_payload(callback_id, callback, values,
+                                       {session_store_id: f"load-test-{concurrency}-{i}", signature_store_id: figure_signature})
+                        for i, values in enumerate(inputs)]
+            run_load_test(send, payloads[:args.warmup], concurrency)
+            report = run_load_test(send, payloads[args.warmup:], concurrency)
+            reports.append(report)
+            print(f"concurrency {concurrency:>3}: {report.throughput_per_s:8.2f} req/s, "
+                  f"p50 {report.latency_p50_s:.3f}s, p95 {report.latency_p95_s:.3f}s, p99 {report.latency_p99_s:.3f}s, "
+                  f"{report.errors} errors, {report.mean_payload_bytes / 1e3:.1f} kB per response")
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    if args.output is not None:
+        with open(args.output, "w") as output:
+            json.dump({"patients": args.patients, "days": args.days,
+                       "reports": [asdict(report) for report in reports]}, output, indent=2)
+    return 1 if any(report.errors > 0 for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,39 +1,64 @@
+import functools
 import os
-from typing import Dict, List, Tuple
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, List, Tuple, Union
 from ctxdashboard.components.applayout_component import AppLayoutComponent
-from dash import Dash, html, dcc, Output, Input
+from dash import Dash, html, Output, Input, State, no_update
+from dash.exceptions import PreventUpdate
+from flask import g, has_request_context
 import pandas as pd
-from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
-from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler, simple_min_hours_daily_acceptance_criterion, minimum_overall_and_consecutive_days_patient_acceptance_criterion
 import dash_bootstrap_components as dbc
-from ctxdashboard.figures.patient_heatmap import render_acceptance_heatmap, render_times_heatmap
-from ctxdashboard.figures.pie_chart import create_acceptance_pie_chart
+from ctxdashboard.figures.patient_heatmap import get_heatmap_signature, patch_acceptance_heatmap, patch_times_heatmap, render_acceptance_heatmap, render_times_heatmap
+from ctxdashboard.figures.pie_chart import create_acceptance_pie_figure, patch_acceptance_pie_chart
 from ctxdashboard.filter_patients.filter_patients import filter_patients
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+from ctxdashboard.data_store.data_watcher import DataStoreHolder, DataWatcher
+from ctxdashboard.data_store.patient_handler_cache import PatientHandlerCache
+from ctxdashboard.domain.patient_evaluation import AcceptanceCriteria, evaluate_patients
+from ctxdashboard.figures.qualifying_windows_table import create_qualifying_windows_table
+from ctxdashboard.util.background_callbacks import BACKGROUND_POLL_INTERVAL_MS, create_background_callback_manager
+from ctxdashboard.util.payload_size import register_payload_size_reporting
+from ctxdashboard.util.single_flight import LatestRequests, SingleFlight, SupersededError, canonical_callback_key
+from ctxdashboard.util.warm_up import WarmUp, register_readiness_endpoint
+from ctxdashboard.metrics.dashboard_metrics import CallbackStage, callback_calls, callback_seconds, callback_stage_seconds, register_coalescing_metrics, register_metrics_endpoint
 
-normalized_dailies: pd.DataFrame = pd.read_excel(
-    os.path.join(os.path.dirname(__file__), "../data/dailies.xlsx")
-).sort_values(pdc.USER_LAST_NAME, ascending=False)
+UPDATE_OUTPUT_DIV_CALLBACK = "update_output_div"
 
-patient_cofactors: pd.DataFrame = pd.read_excel(
-    os.path.join(os.path.dirname(__file__), "../data/patient-meta.xlsx"))
+data_store_holder = DataStoreHolder.load()
+patient_handler_cache = PatientHandlerCache()
+background_callback_manager = create_background_callback_manager()
+# identical computations in flight are shared by the request threads of this worker
+single_flight = SingleFlight()
+latest_requests = LatestRequests()
+data_watcher = DataWatcher(data_store_holder)
+data_watcher.add_listener(patient_handler_cache.invalidate_changed)
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# the filter options are built from the patient meta data at startup
+patient_cofactors: pd.DataFrame = data_store_holder.get().patient_cofactors
+
+app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=True)
 
 layout = AppLayoutComponent.createComponent(patient_cofactors)
 
 app.layout = layout.body
 
-
-@ app.callback(
-    Output(layout.out_times_heatmap, component_property='children'),
-    Output(layout.out_acceptance_heatmap, component_property='children'),
+UPDATE_OUTPUT_DIV_DEPENDENCIES = [
+    Output(layout.out_times_heatmap, component_property='figure'),
+    Output(layout.out_acceptance_heatmap, component_property='figure'),
     Output(layout.filter_form.out_min_hours_per_day_display,
            component_property='children'),
-    Output(layout.out_piechart, component_property='children'),
+    Output(layout.out_piechart, component_property='figure'),
+    Output(layout.out_qualifying_windows, component_property='children'),
+    Output(layout.out_patient_figures, component_property='hidden'),
+    Output(layout.out_no_patients_warning, component_property='hidden'),
+    Output(layout.in_figure_signature_store, component_property='data'),
     Input(layout.filter_form.in_min_hours_per_day_input,
           component_property='value'),
     Input(layout.filter_form.in_min_days_input, component_property="value"),
     Input(layout.filter_form.in_min_consecutive_days_input, component_property="value"),
+    Input(layout.filter_form.in_acceptance_window_select, component_property="value"),
+    Input(layout.filter_form.in_qualifying_window_days_input, component_property="value"),
     Input(layout.filter_form.in_ecog_multi_select, component_property="value"),
     Input(layout.filter_form.in_age_slider, component_property="value"),
     Input(layout.filter_form.in_gender_multi_select, component_property="value"),
@@ -51,11 +76,21 @@ app.layout = layout.body
     Input(layout.filter_form.in_tug_nan_checkbox, component_property="value"),
     Input(layout.filter_form.in_hgs_range_slider, component_property="value"),
     Input(layout.filter_form.in_hgs_nan_checkbox, component_property="value"),
-)
+    State(layout.in_figure_signature_store, component_property="data"),
+    # passed to the callback wrappers below, not to update_output_div
+    State(layout.in_session_store, component_property="data"),
+]
+UPDATE_OUTPUT_DIV_SESSION_ARG = len([dependency for dependency in UPDATE_OUTPUT_DIV_DEPENDENCIES
+                                     if isinstance(dependency, (Input, State))]) - 1
+
+
 def update_output_div(
+    set_progress: Callable[[Tuple[Any, ...]], None],
     min_hours_per_day: int,
     min_days_input: int,
     min_consecutive_days_input: int,
+    acceptance_window: str,
+    qualifying_window_days: int,
     ecog_values: List[str],
     age_interval: Tuple[str, str],
     gender_multi_select_values: List[str],
@@ -68,65 +103,179 @@ def update_output_div(
     tug_nan_checkbox: List[str],
     hgs_range_slider: Tuple[str, str],
     hgs_nan_checkbox: List[str],
+    figure_signature: Union[str, None],
+    *,
+    data_store: Union[DashboardDataStore, None] = None,
+    record_metrics: bool = True
 ):
-    filtered_ids = filter_patients(patient_cofactors=patient_cofactors,
-                                   ecog_values=ecog_values,
-                                   age_interval=age_interval,
-                                   gender_multi_select_values=gender_multi_select_values,
-                                   therapy_multi_select=therapy_multi_select,
-                                   therapy_regimen_multi_select=therapy_regimen_multi_select,
-                                   treatment_naive_multi_select=treatment_naive_multi_select,
-                                   prior_treatment_multi_select=prior_treatment_multi_select,
-                                   primary_tumor_multi_select=primary_tumor_multi_select,
-                                   tug_range_slider=tug_range_slider,
-                                   tug_include_nans=tug_nan_checkbox,
-                                   hgs_range_slider=hgs_range_slider,
-                                   hgs_include_nans=hgs_nan_checkbox)
-
-    patient_dailies_handlers: List[CTxPatientDailiesHandler] = []
-    total_durations_sorted = normalized_dailies.groupby(pdc.USER_LAST_NAME)[pdc.DAILY_DURATION_S].sum().sort_values(ascending=True)
-    for user_id in total_durations_sorted.index:
-        if str(user_id) in filtered_ids:
-            sub_frame = normalized_dailies[normalized_dailies[pdc.USER_LAST_NAME] == user_id]
-            if sub_frame.shape[0] > 0:
-                patient_dailies_handlers.append(CTxPatientDailiesHandler.from_frame(
-                    user_id,
-                    sub_frame,
-                    simple_min_hours_daily_acceptance_criterion(min_hours_per_day),
-                    minimum_overall_and_consecutive_days_patient_acceptance_criterion(min_days_input, min_consecutive_days_input)))
-    heatmap_graph = dcc.Graph(
-        className="pat-heatmap-times-svg",
-        figure=render_times_heatmap(
-            patient_dailies_handlers, min_hours_per_day),
-        config=dict(
-            displayModeBar=False
-        ),
-        responsive=True
-    ) if len(patient_dailies_handlers) > 0 else html.Div()
-
-    heatmap_acceptance_graph = dcc.Graph(
-        className="pat-heatmap-acceptance-svg",
-        figure=render_acceptance_heatmap(patient_dailies_handlers),
-        config=dict(
-            displayModeBar=False
-        ),
-        responsive=True
-    ) if len(patient_dailies_handlers) > 0 else html.Div()
-
-    pie_chart = (create_acceptance_pie_chart([d.accepted for d in patient_dailies_handlers], patient_cofactors.shape[0])
-                 if len(patient_dailies_handlers) > 0
-                 else html.Div("No patients match this selection...", className="warning"))
+    callback_start = time.perf_counter()
+    if record_metrics:
+        callback_calls.labels(UPDATE_OUTPUT_DIV_CALLBACK).inc()
+
+    def time_stage(stage: str):
+        return callback_stage_seconds.labels(stage).time() if record_metrics else nullcontext()
 
+    # the store of the snapshot the caller keyed its computation by, if it took one
+    data_store = data_store if data_store is not None else data_store_holder.get()
+    with time_stage(CallbackStage.FILTERING):
+        filtered_ids = filter_patients(patient_cofactors=data_store.patient_cofactors,
+                                       ecog_values=ecog_values,
+                                       age_interval=age_interval,
+                                       gender_multi_select_values=gender_multi_select_values,
+                                       therapy_multi_select=therapy_multi_select,
+                                       therapy_regimen_multi_select=therapy_regimen_multi_select,
+                                       treatment_naive_multi_select=treatment_naive_multi_select,
+                                       prior_treatment_multi_select=prior_treatment_multi_select,
+                                       primary_tumor_multi_select=primary_tumor_multi_select,
+                                       tug_range_slider=tug_range_slider,
+                                       tug_include_nans=tug_nan_checkbox,
+                                       hgs_range_slider=hgs_range_slider,
+                                       hgs_include_nans=hgs_nan_checkbox)
+    set_progress((10,))
+
+    with time_stage(CallbackStage.HANDLER_CONSTRUCTION):
+        evaluation = evaluate_patients(
+            data_store,
+            patient_handler_cache,
+            AcceptanceCriteria(min_hours_per_day,
+                               min_days_input,
+                               min_consecutive_days_input,
+                               acceptance_window,
+                               qualifying_window_days),
+            filtered_ids,
+            lambda fraction: set_progress((10 + int(70 * fraction),)))
+        patient_dailies_handlers = evaluation.handlers
+
+    set_progress((80,))
+    with time_stage(CallbackStage.HEATMAP_PREPARATION):
+        patients_shown = len(patient_dailies_handlers) > 0
+        acceptances = [d.accepted for d in patient_dailies_handlers]
+        heatmap_signature = get_heatmap_signature(data_store, patient_dailies_handlers) if patients_shown else None
+        if not patients_shown:
+            # the figures are hidden and keep showing the patients of the signature
+            times_heatmap = acceptance_heatmap = pie_chart = no_update
+        elif heatmap_signature == figure_signature:
+            # same patients, only the values that depend on the criteria are sent
+            times_heatmap = patch_times_heatmap(patient_dailies_handlers, min_hours_per_day)
+            acceptance_heatmap = patch_acceptance_heatmap(patient_dailies_handlers)
+            pie_chart = patch_acceptance_pie_chart(acceptances, data_store.patient_cofactors.shape[0])
+        else:
+            times_heatmap = render_times_heatmap(patient_dailies_handlers, min_hours_per_day)
+            acceptance_heatmap = render_acceptance_heatmap(patient_dailies_handlers)
+            pie_chart = create_acceptance_pie_figure(acceptances, data_store.patient_cofactors.shape[0])
+
+        qualifying_windows_table = create_qualifying_windows_table(
+            evaluation.earliest_windows,
+            [handler.patient_id for handler in patient_dailies_handlers]
+        ) if patients_shown else html.Div()
+
+    set_progress((100,))
+    if record_metrics:
+        callback_seconds.labels(UPDATE_OUTPUT_DIV_CALLBACK).observe(time.perf_counter() - callback_start)
+    if has_request_context():
+        # background jobs answer the request that polls for their result
+        g.callback_seconds = time.perf_counter() - callback_start
     return (
-        heatmap_graph,
-        heatmap_acceptance_graph,
+        times_heatmap,
+        acceptance_heatmap,
         f"Minimum of {int(min_hours_per_day)} hours per day:",
-        pie_chart
+        pie_chart,
+        qualifying_windows_table,
+        not patients_shown,
+        patients_shown,
+        heatmap_signature if patients_shown and heatmap_signature != figure_signature else no_update
+    )
+
+
+# shows the progress and the cancel button while the outputs are computed
+UPDATE_OUTPUT_DIV_RUNNING = [
+    (Output(layout.out_computation_status, component_property="style"),
+     {"visibility": "visible"}, {"visibility": "hidden"}),
+    (Output(layout.in_cancel_computation_button, component_property="disabled"), False, True)
+]
+
+# besides the default view, the minimum hours per day that are picked most often
+WARM_UP_MIN_HOURS_PER_DAY = [6, 7, 9, 10]
+
+
+def get_default_update_inputs() -> List[Any]:
+    # the values the filter form starts with, i.e. the inputs of the first request of every page
+    components = {getattr(component, "id", None): component for component in layout.body._traverse()}
+    return [getattr(components[dependency.component_id], dependency.component_property, None)
+            for dependency in UPDATE_OUTPUT_DIV_DEPENDENCIES if isinstance(dependency, Input)]
+
+
+def warm_up_view(min_hours_per_day: Union[int, None] = None) -> None:
+    inputs = get_default_update_inputs()
+    if min_hours_per_day is not None:
+        inputs[0] = min_hours_per_day
+    # like a page that shows no figures yet, the synthetic calls are not recorded as callbacks
+    update_output_div(lambda _progress: None, *inputs, None, record_metrics=False)
+
+
+# fills the caches before the first request, run in the gunicorn master before the workers are forked
+warm_up = WarmUp(
+    [("default view", warm_up_view)] +
+    [(f"minimum of {min_hours} hours per day", functools.partial(warm_up_view, min_hours))
+     for min_hours in WARM_UP_MIN_HOURS_PER_DAY])
+# a new dataset version starts with cold caches for the trackers that changed, the watcher does not wait for the warm-up
+data_watcher.add_listener(lambda _old_store, _new_store: warm_up.run_in_background())
+
+app.clientside_callback(
+    "function(_id, session_id) { return session_id || Date.now().toString(36) + Math.random().toString(36).slice(2); }",
+    Output(layout.in_session_store, component_property="data"),
+    Input(layout.in_session_store, component_property="id"),
+    State(layout.in_session_store, component_property="data")
+)
+
+if background_callback_manager is not None:
+    # Runs in a job process, so the request threads stay free for cheap interactions. Requests
+    # with the same inputs share a job, and a job is terminated when its inputs change again
+    # before it finished or on cancel, unless other requests still wait on it.
+    @app.callback(
+        *UPDATE_OUTPUT_DIV_DEPENDENCIES,
+        background=True,
+        manager=background_callback_manager,
+        interval=BACKGROUND_POLL_INTERVAL_MS,
+        progress=[Output(layout.out_computation_progress, component_property="value")],
+        running=UPDATE_OUTPUT_DIV_RUNNING,
+        cancel=[Input(layout.in_cancel_computation_button, component_property="n_clicks")],
+        cache_args_to_ignore=[UPDATE_OUTPUT_DIV_SESSION_ARG]
     )
+    def update_output_div_in_job(set_progress: Callable[[Tuple[Any, ...]], None], *args: Any):
+        return update_output_div(set_progress, *args[:UPDATE_OUTPUT_DIV_SESSION_ARG])
+else:
+    @app.callback(*UPDATE_OUTPUT_DIV_DEPENDENCIES, running=UPDATE_OUTPUT_DIV_RUNNING)
+    def update_output_div_in_request(*args: Any):
+        inputs, session_id = args[:UPDATE_OUTPUT_DIV_SESSION_ARG], args[UPDATE_OUTPUT_DIV_SESSION_ARG]
+        request = latest_requests.start(session_id)
+        # the computation is keyed by the version of the store it runs on
+        data_store, version = data_store_holder.snapshot()
+        try:
+            # the progress checkpoints of the computation drop it once all its requests were superseded
+            outputs = single_flight.do((version, canonical_callback_key(inputs)),
+                                       lambda checkpoint: update_output_div(
+                                           lambda _progress: checkpoint(), *inputs, data_store=data_store),
+                                       lambda: latest_requests.is_superseded(request))
+            if latest_requests.drop_if_superseded(request):
+                raise PreventUpdate
+            return outputs
+        except SupersededError:
+            latest_requests.drop_if_superseded(request)
+            raise PreventUpdate
+        finally:
+            latest_requests.finish(request)
 
 
 server = app.server
 
+register_metrics_endpoint(server, patient_handler_cache)
+register_coalescing_metrics(single_flight, latest_requests, background_callback_manager)
+register_payload_size_reporting(server)
+register_readiness_endpoint(server, warm_up)
+server.before_request(data_watcher.ensure_started)
+server.before_request(warm_up.ensure_started)
+
 if __name__ == '__main__':
     app.run(debug=True, host="0.0.0.0",
                    port=int(os.environ.get("PORT", 8080)))
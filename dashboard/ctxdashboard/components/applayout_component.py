@@ -8,41 +8,130 @@ from ctxdashboard.components.filterform_component import FilterFormComponent
 @dataclass
 class AppLayoutComponent:
     body: html.Div
-    out_piechart: html.Div
-    out_acceptance_heatmap: html.Div
-    out_times_heatmap: html.Div
+    out_piechart: dcc.Graph
+    out_acceptance_heatmap: dcc.Graph
+    out_times_heatmap: dcc.Graph
+    out_patient_figures: html.Div
+    out_no_patients_warning: html.Div
+    out_qualifying_windows: html.Div
+    out_computation_status: html.Div
+    out_computation_progress: html.Progress
+    in_cancel_computation_button: html.Button
+    in_session_store: dcc.Store
+    in_figure_signature_store: dcc.Store
     filter_form: FilterFormComponent
 
     @classmethod
     def createComponent(cls, patient_cofactors: pd.DataFrame) -> "AppLayoutComponent":
+        # the graphs stay in the layout, so callbacks can patch parts of their figures
+        pie_chart = dcc.Graph(
+            id="acceptance-pie-figure",
+            className="acceptance-pie-figure",
+            config={
+                'displayModeBar': False
+            }
+        )
+
         pie_holder = html.Div(
             className="pie-holder",
-            id="pie-holder"
+            id="pie-holder",
+            children=pie_chart
+        )
+
+        acceptance_heatmap = dcc.Graph(
+            className="pat-heatmap-acceptance-svg",
+            config=dict(
+                displayModeBar=False
+            ),
+            responsive=True
         )
 
         patient_heatmap_acceptance = html.Div(
-            className="pat-heatmap-times"
+            className="pat-heatmap-times",
+            children=acceptance_heatmap
+        )
+
+        times_heatmap = dcc.Graph(
+            className="pat-heatmap-times-svg",
+            config=dict(
+                displayModeBar=False
+            ),
+            responsive=True
         )
 
         patient_heatmap_times = html.Div(
-            className="pat-heatmap-times"
+            className="pat-heatmap-times",
+            children=times_heatmap
+        )
+
+        # hidden until the first patients are shown
+        patient_figures = html.Div(
+            className="patient-figures",
+            hidden=True,
+            children=[
+                pie_holder,
+                html.Div(
+                    className="patient-heatmap-wrapper",
+                    children=[patient_heatmap_acceptance,
+                              patient_heatmap_times]
+                )
+            ]
+        )
+
+        no_patients_warning = html.Div(
+            "No patients match this selection...",
+            className="warning",
+            hidden=True
+        )
+
+        qualifying_windows = html.Div(
+            className="qualifying-windows"
+        )
+
+        # shown while a background computation of the outputs is running
+        computation_progress = html.Progress(
+            className="computation-progress",
+            value=0,
+            max=100
+        )
+
+        cancel_computation_button = html.Button(
+            "Cancel",
+            className="cancel-computation-button",
+            disabled=True
+        )
+
+        computation_status = html.Div(
+            className="computation-status",
+            style={"visibility": "hidden"},
+            children=[computation_progress, cancel_computation_button]
+        )
+
+        # identifies the browser tab, so requests superseded by a later one of the tab can be dropped
+        session_store = dcc.Store(
+            id="session-store",
+            storage_type="session"
+        )
+
+        # signature of the patients the heatmaps of the page currently show
+        figure_signature_store = dcc.Store(
+            id="figure-signature-store"
         )
 
         filter_form_component = FilterFormComponent.createComponent(
             patient_cofactors)
 
         right_children = [
-            pie_holder,
-            html.Div(
-                className="patient-heatmap-wrapper",
-                children=[patient_heatmap_acceptance,
-                          patient_heatmap_times]
-            )
+            no_patients_warning,
+            patient_figures,
+            qualifying_windows
         ]
 
         app_layout = html.Div(
             className="container",
             children=[
+                session_store,
+                figure_signature_store,
                 html.Div([
                     html.Img(src='/assets/meduni-logo.png'),
                     html.H1(children='CTx Activity Tracker', className="page-header"),
@@ -58,16 +147,27 @@ class AppLayoutComponent:
                             className="right",
                             children=html.Div(
                                 className="right-inner",
-                                children=dcc.Loading(
-                                    right_children
-                                )
+                                children=[
+                                    computation_status,
+                                    dcc.Loading(
+                                        right_children
+                                    )
+                                ]
                             )
                         )
                     ]
                 )]
         )
         return cls(app_layout,
-                   pie_holder,
-                   patient_heatmap_acceptance,
-                   patient_heatmap_times,
+                   pie_chart,
+                   acceptance_heatmap,
+                   times_heatmap,
+                   patient_figures,
+                   no_patients_warning,
+                   qualifying_windows,
+                   computation_status,
+                   computation_progress,
+                   cancel_computation_button,
+                   session_store,
+                   figure_signature_store,
                    filter_form_component)
@@ -3,7 +3,8 @@ from typing import Tuple
 from dash import html, dcc
 from ctxdashboard.components.series_dropdown import get_series_dropdown, InitialSelection, LabelingStrategy
 import pandas as pd
-from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc
+from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc, has_baseline_days
+from ctxdashboard.domain.acceptance_windows import ACCEPTANCE_WINDOWS, ENTIRE_WEAR_PERIOD, get_acceptance_window_label
 from math import ceil, floor
 
 
@@ -30,6 +31,8 @@ class FilterFormComponent:
     out_min_hours_per_day_display: html.Div
     in_min_days_input: dcc.Input
     in_min_consecutive_days_input: dcc.Input
+    in_acceptance_window_select: dcc.Dropdown
+    in_qualifying_window_days_input: dcc.Input
     in_ecog_multi_select: dcc.Dropdown
     in_min_hours_per_day_input: dcc.Slider
     in_age_slider: dcc.RangeSlider
@@ -63,6 +66,20 @@ class FilterFormComponent:
             value=6
         )
 
+        acceptance_window_select = dcc.Dropdown(
+            id="acceptance-window",
+            options=[{"label": get_acceptance_window_label(key, has_baseline_days(patient_cofactors)), "value": key}
+                     for key in ACCEPTANCE_WINDOWS],
+            value=ENTIRE_WEAR_PERIOD,
+            clearable=False
+        )
+
+        qualifying_window_days_input = dcc.Input(
+            id="qualifying-window-days-input",
+            type="number",
+            value=28
+        )
+
         ecog_multi_select = get_series_dropdown(
             "ecog",
             patient_cofactors[pmc.ECOG],
@@ -163,6 +180,16 @@ class FilterFormComponent:
                         className="field-label"
                     ),
                     min_consecutive_days_input,
+                    html.Div(
+                        children="Acceptance window:",
+                        className="field-label"
+                    ),
+                    acceptance_window_select,
+                    html.Div(
+                        children="Qualifying window length (days):",
+                        className="field-label"
+                    ),
+                    qualifying_window_days_input,
                 ], className="acceptance-criteria-wrapper"),
 
                 html.H3("Patient filters"),
@@ -196,6 +223,8 @@ class FilterFormComponent:
             out_min_hours_per_day_display=min_hours_per_day_display,
             in_min_days_input=min_days_input,
             in_min_consecutive_days_input=min_consecutive_days_input,
+            in_acceptance_window_select=acceptance_window_select,
+            in_qualifying_window_days_input=qualifying_window_days_input,
             in_ecog_multi_select=ecog_multi_select,
             in_min_hours_per_day_input=min_hours_per_day_input,
             in_age_slider=age_slider,
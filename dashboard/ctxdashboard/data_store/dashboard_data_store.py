@@ -0,0 +1,283 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Union
+import numpy as np
+import pandas as pd
+from ctxfitness.daily_wear import DailyWear
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+from ctxfitness.source_schema import SourceSchema, get_source_file_extensions, load_source
+from ctxdashboard.domain.patientmeta import get_baseline_days
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), "../../data")
+DAILIES_FILE_STEM = "dailies"
+PATIENT_META_FILE_STEM = "patient-meta"
+DAILIES_EXCEL_FILE = f"{DAILIES_FILE_STEM}.xlsx"
+PATIENT_META_EXCEL_FILE = f"{PATIENT_META_FILE_STEM}.xlsx"
+SNAPSHOT_DIR = "snapshot"
+SNAPSHOT_CURRENT_FILE = "CURRENT"
+SNAPSHOT_N_KEPT_VERSIONS = 2
+SNAPSHOT_MANIFEST_FILE = "manifest.json"
+SNAPSHOT_PATIENT_META_FILE = "patient-meta.pkl"
+SNAPSHOT_FORMAT_VERSION = 1
+
+# arrays written to the snapshot, one .npy file each
+SNAPSHOT_ARRAYS = [
+    "tracker_ids",
+    "tracker_offsets",
+    "tracker_total_durations",
+    "day_starts",
+    "day_ends",
+    "durations"
+]
+
+# the dashboard only needs the days worn per tracker of the preprocessed dailies
+DASHBOARD_DAILIES_SCHEMA = SourceSchema(
+    name="dashboard dailies",
+    columns=[pdc.USER_LAST_NAME.value, pdc.START_DT.value, pdc.END_DT.value, pdc.DAILY_DURATION_S.value],
+    timestamp_columns=[pdc.START_DT.value, pdc.END_DT.value])
+PATIENT_META_SCHEMA = SourceSchema(name="patient meta")
+
+
+def get_data_dir() -> str:
+    return os.environ.get("CTX_DATA_DIR", DEFAULT_DATA_DIR)
+
+
+def find_source_file(data_dir: str, file_stem: str) -> str:
+    # the formats are tried in the order of the registered readers, columnar formats first
+    for extension in get_source_file_extensions():
+        path = os.path.join(data_dir, f"{file_stem}{extension}")
+        if os.path.exists(path):
+            return path
+    raise Exception(
+        f"There is no '{file_stem}' file with one of the extensions {get_source_file_extensions()} in '{data_dir}'!")
+
+
+def get_source_files(data_dir: str) -> List[str]:
+    return [find_source_file(data_dir, file_stem) for file_stem in [DAILIES_FILE_STEM, PATIENT_META_FILE_STEM]]
+
+
+def read_only_view(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.setflags(write=False)
+    return view
+
+
+class DashboardDataStore:
+    """
+    Read-only, columnar view of the normalized dailies and the patient meta data.
+    The dailies are kept sorted by tracker so that the rows of a single tracker
+    are the slice tracker_offsets[i]:tracker_offsets[i+1] of the day arrays.
+    The arrays are never written to after construction, which keeps their pages
+    shared between forked gunicorn workers.
+    """
+
+    def __init__(self,
+                 patient_cofactors: pd.DataFrame,
+                 tracker_ids: np.ndarray,
+                 tracker_offsets: np.ndarray,
+                 tracker_total_durations: np.ndarray,
+                 day_starts: np.ndarray,
+                 day_ends: np.ndarray,
+                 durations: np.ndarray) -> None:
+        self.patient_cofactors = patient_cofactors
+        self.tracker_ids = read_only_view(tracker_ids)
+        self.tracker_offsets = read_only_view(tracker_offsets)
+        self.tracker_total_durations = read_only_view(tracker_total_durations)
+        self.day_starts = read_only_view(day_starts)
+        self.day_ends = read_only_view(day_ends)
+        self.durations = read_only_view(durations)
+        self._tracker_positions: Dict[Any, int] = {
+            tracker_id: i for i, tracker_id in enumerate(tracker_ids.tolist())}
+        self._tracker_fingerprints: Dict[Any, str] = {}
+        self._baseline_days: Union[pd.Series, None] = None
+        self._daily_wear: Dict[float, DailyWear] = {}
+
+    @classmethod
+    def from_frames(cls, normalized_dailies: pd.DataFrame, patient_cofactors: pd.DataFrame) -> "DashboardDataStore":
+        df = normalized_dailies.sort_values(pdc.USER_LAST_NAME, kind="stable")
+        tracker_column = df[pdc.USER_LAST_NAME].to_numpy()
+        if tracker_column.dtype == object:
+            tracker_column = tracker_column.astype(str)
+        tracker_ids, first_rows, counts = np.unique(
+            tracker_column, return_index=True, return_counts=True)
+        tracker_offsets = np.append(first_rows, first_rows[-1] + counts[-1]) \
+            if len(tracker_ids) > 0 else np.zeros(1, dtype=np.int64)
+        durations = df[pdc.DAILY_DURATION_S].to_numpy(dtype=np.int64)
+        tracker_total_durations = np.add.reduceat(durations, first_rows) \
+            if len(tracker_ids) > 0 else np.zeros(0, dtype=np.int64)
+        return cls(
+            patient_cofactors=patient_cofactors,
+            tracker_ids=tracker_ids,
+            tracker_offsets=tracker_offsets.astype(np.int64),
+            tracker_total_durations=tracker_total_durations,
+            day_starts=df[pdc.START_DT].to_numpy(dtype="datetime64[ns]"),
+            day_ends=df[pdc.END_DT].to_numpy(dtype="datetime64[ns]"),
+            durations=durations)
+
+    @classmethod
+    def from_source_files(cls, data_dir: str) -> "DashboardDataStore":
+        dailies_file, patient_meta_file = get_source_files(data_dir)
+        return cls.from_frames(
+            load_source(dailies_file, DASHBOARD_DAILIES_SCHEMA),
+            load_source(patient_meta_file, PATIENT_META_SCHEMA))
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir: str) -> "DashboardDataStore":
+        # the day arrays are memory-mapped, so pages are only read once they are accessed
+        with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST_FILE)) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest["format_version"] != SNAPSHOT_FORMAT_VERSION:
+            raise Exception(
+                f"The snapshot in '{snapshot_dir}' has the format version '{manifest['format_version']}' but '{SNAPSHOT_FORMAT_VERSION}' is required!")
+        arrays = {
+            name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r")
+            for name in SNAPSHOT_ARRAYS
+        }
+        return cls(
+            patient_cofactors=pd.read_pickle(
+                os.path.join(snapshot_dir, SNAPSHOT_PATIENT_META_FILE)),
+            **arrays)
+
+    def write_snapshot(self, snapshot_dir: str) -> None:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        for name in SNAPSHOT_ARRAYS:
+            np.save(os.path.join(snapshot_dir, f"{name}.npy"),
+                    np.ascontiguousarray(getattr(self, name)))
+        self.patient_cofactors.to_pickle(
+            os.path.join(snapshot_dir, SNAPSHOT_PATIENT_META_FILE))
+        # the manifest is written last and marks the snapshot as complete
+        with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST_FILE), "w") as manifest_file:
+            json.dump({
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "n_trackers": int(len(self.tracker_ids)),
+                "n_days": int(len(self.durations))
+            }, manifest_file)
+
+    def get_total_durations_sorted(self) -> "pd.Series[int]":
+        return pd.Series(self.tracker_total_durations, index=self.tracker_ids).sort_values(
+            ascending=True, kind="stable")
+
+    def has_tracker(self, tracker_id: Any) -> bool:
+        return tracker_id in self._tracker_positions
+
+    def get_tracker_ids(self) -> List[Any]:
+        return list(self._tracker_positions.keys())
+
+    def _tracker_rows(self, tracker_id: Any) -> slice:
+        position = self._tracker_positions[tracker_id]
+        return slice(self.tracker_offsets[position], self.tracker_offsets[position + 1])
+
+    def tracker_fingerprint(self, tracker_id: Any) -> str:
+        # identifies the dailies of a tracker across dataset versions, computed on first use
+        if tracker_id not in self._tracker_fingerprints:
+            rows = self._tracker_rows(tracker_id)
+            digest = hashlib.blake2b(digest_size=16)
+            for array in [self.day_starts, self.day_ends, self.durations]:
+                digest.update(np.ascontiguousarray(array[rows]).tobytes())
+            self._tracker_fingerprints[tracker_id] = digest.hexdigest()
+        return self._tracker_fingerprints[tracker_id]
+
+    def get_baseline_days(self) -> pd.Series:
+        # Date_BL of every tracker of the store in the order of tracker_ids, looked up on first use
+        if self._baseline_days is None:
+            self._baseline_days = get_baseline_days(self.patient_cofactors, self.tracker_ids.tolist())
+        return self._baseline_days
+
+    def tracker_baseline_day(self, tracker_id: Any) -> str:
+        # part of what the acceptance of a tracker in a baseline window is computed from, "NaT" if it has none
+        return str(self.get_baseline_days().iloc[self._tracker_positions[tracker_id]])
+
+    def patient_frame(self, tracker_id: Any) -> pd.DataFrame:
+        position = self._tracker_positions[tracker_id]
+        rows = self._tracker_rows(tracker_id)
+        n_rows = rows.stop - rows.start
+        return pd.DataFrame({
+            pdc.USER_LAST_NAME.value: np.repeat(self.tracker_ids[position], n_rows),
+            pdc.START_DT.value: self.day_starts[rows],
+            pdc.END_DT.value: self.day_ends[rows],
+            pdc.DAILY_DURATION_S.value: self.durations[rows]
+        })
+
+    def daily_wear(self, min_hours_per_day: float) -> DailyWear:
+        # built once per acceptance threshold, window queries on it take constant time
+        if min_hours_per_day not in self._daily_wear:
+            self._daily_wear[min_hours_per_day] = DailyWear.from_arrays(
+                np.repeat(self.tracker_ids, np.diff(self.tracker_offsets)),
+                self.day_starts,
+                self.durations,
+                min_hours_per_day)
+        return self._daily_wear[min_hours_per_day]
+
+
+def get_source_files_version(data_dir: str) -> str:
+    stats = [os.stat(path) for path in get_source_files(data_dir)]
+    return "source-" + "-".join(f"{stat.st_mtime_ns}.{stat.st_size}" for stat in stats)
+
+
+def get_current_snapshot_version(data_dir: str) -> Union[str, None]:
+    current_file = os.path.join(data_dir, SNAPSHOT_DIR, SNAPSHOT_CURRENT_FILE)
+    if not os.path.exists(current_file):
+        return None
+    with open(current_file) as current:
+        return current.read().strip()
+
+
+def get_dataset_version(data_dir: Union[str, None] = None) -> str:
+    data_dir = data_dir if data_dir is not None else get_data_dir()
+    snapshot_version = get_current_snapshot_version(data_dir)
+    return snapshot_version if snapshot_version is not None else get_source_files_version(data_dir)
+
+
+def prune_snapshots(snapshot_root: str, current_version: str) -> None:
+    # Removing a version another process still has memory-mapped is safe, the mapping
+    # keeps the file contents alive until it is closed.
+    versions = sorted(
+        (entry for entry in os.scandir(snapshot_root) if entry.is_dir() and entry.name != current_version),
+        key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[SNAPSHOT_N_KEPT_VERSIONS - 1:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def build_snapshot(data_dir: Union[str, None] = None) -> str:
+    """
+    Writes the snapshot into a new directory named after the content of the source
+    files and then points CURRENT at it, so snapshots that are in use are never
+    overwritten and readers only ever see complete snapshots.
+    """
+    data_dir = data_dir if data_dir is not None else get_data_dir()
+    snapshot_root = os.path.join(data_dir, SNAPSHOT_DIR)
+    digest = hashlib.blake2b(digest_size=8)
+    for path in get_source_files(data_dir):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    version = digest.hexdigest()
+    snapshot_dir = os.path.join(snapshot_root, version)
+    if not os.path.exists(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST_FILE)):
+        DashboardDataStore.from_source_files(data_dir).write_snapshot(snapshot_dir)
+    tmp_current_file = os.path.join(snapshot_root, f"{SNAPSHOT_CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_current_file, "w") as current:
+        current.write(version)
+    os.replace(tmp_current_file, os.path.join(snapshot_root, SNAPSHOT_CURRENT_FILE))
+    prune_snapshots(snapshot_root, version)
+    return snapshot_dir
+
+
+def load_data_store(data_dir: Union[str, None] = None) -> DashboardDataStore:
+    data_dir = data_dir if data_dir is not None else get_data_dir()
+    snapshot_version = get_current_snapshot_version(data_dir)
+    start = time.perf_counter()
+    if snapshot_version is not None:
+        store = DashboardDataStore.from_snapshot(
+            os.path.join(data_dir, SNAPSHOT_DIR, snapshot_version))
+        source = f"snapshot '{snapshot_version}'"
+    else:
+        store = DashboardDataStore.from_source_files(data_dir)
+        source = "source files"
+    logging.getLogger("DashboardDataStore").info(
+        f"Loaded dashboard data from {source} in {time.perf_counter() - start:.3f}s")
+    return store
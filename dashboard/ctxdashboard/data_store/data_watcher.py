@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+from typing import Callable, List, NamedTuple, Union
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore, get_data_dir, get_dataset_version, load_data_store
+
+DEFAULT_POLL_INTERVAL_S = 30.0
+
+
+class DataStoreSnapshot(NamedTuple):
+    store: DashboardDataStore
+    version: str
+
+
+class DataStoreHolder:
+    """
+    Holds the data store the callbacks work on and its dataset version. Callbacks take one
+    snapshot per call and keep using its store and version, a swap only affects later calls.
+    """
+
+    def __init__(self, store: DashboardDataStore, version: str) -> None:
+        self._snapshot = DataStoreSnapshot(store, version)
+
+    @classmethod
+    def load(cls, data_dir: Union[str, None] = None) -> "DataStoreHolder":
+        data_dir = data_dir if data_dir is not None else get_data_dir()
+        # the version is read before loading, so a concurrent update is picked up by the next poll
+        version = get_dataset_version(data_dir)
+        return cls(load_data_store(data_dir), version)
+
+    def snapshot(self) -> DataStoreSnapshot:
+        return self._snapshot
+
+    def get(self) -> DashboardDataStore:
+        return self._snapshot.store
+
+    @property
+    def version(self) -> str:
+        return self._snapshot.version
+
+    def swap(self, store: DashboardDataStore, version: str) -> None:
+        # the store and its version are replaced in a single reference assignment, so
+        # a snapshot never pairs the new version with the old store or the other way round
+        self._snapshot = DataStoreSnapshot(store, version)
+
+
+class DataWatcher:
+    """
+    Polls the data directory for a new dataset version, loads it in the background and
+    swaps it into the holder. Listeners are called with the old and the new store after
+    each swap, e.g. to evict cached results of trackers whose data changed.
+    """
+
+    def __init__(self,
+                 holder: DataStoreHolder,
+                 data_dir: Union[str, None] = None,
+                 poll_interval_s: Union[float, None] = None) -> None:
+        self.holder = holder
+        self.data_dir = data_dir if data_dir is not None else get_data_dir()
+        self.poll_interval_s = poll_interval_s if poll_interval_s is not None else float(
+            os.environ.get("CTX_DATA_POLL_INTERVAL_S", DEFAULT_POLL_INTERVAL_S))
+        self.listeners: List[Callable[[DashboardDataStore, DashboardDataStore], None]] = []
+        self._started_in_pid: Union[int, None] = None
+        self._start_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def add_listener(self, listener: Callable[[DashboardDataStore, DashboardDataStore], None]) -> None:
+        self.listeners.append(listener)
+
+    def poll_once(self) -> bool:
+        version = get_dataset_version(self.data_dir)
+        old_store, old_version = self.holder.snapshot()
+        if version == old_version:
+            return False
+        new_store = load_data_store(self.data_dir)
+        self.holder.swap(new_store, version)
+        for listener in self.listeners:
+            listener(old_store, new_store)
+        logging.getLogger("DataWatcher").info(
+            f"Swapped in dataset version '{version}'")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.poll_interval_s):
+            try:
+                self.poll_once()
+            except Exception as exception:
+                # e.g. a dataset that is still being written, the next poll retries
+                logging.getLogger("DataWatcher").error(
+                    f"Reloading the dashboard data failed: {exception}")
+
+    def ensure_started(self) -> None:
+        # Threads do not survive a fork, so every gunicorn worker starts its own watcher.
+        if self._started_in_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_in_pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="DataWatcher", daemon=True).start()
+            self._started_in_pid = os.getpid()
+
+    def stop(self) -> None:
+        self._stop_event.set()
@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+
+DEFAULT_MAX_ENTRIES = 20000
+
+
+class PatientHandlerCache:
+    """
+    LRU cache of dailies handlers and of the acceptance of trackers in baseline windows.
+    Entries are keyed by the tracker, the fingerprint of its dailies, its baseline day and the
+    acceptance criterion, so an entry is never served for data it was not built from, even
+    while a new dataset version is being swapped in.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, str, str, Hashable], CTxPatientDailiesHandler]" = OrderedDict()
+        self._window_acceptance: "OrderedDict[Tuple[Any, str, str, Hashable], bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self,
+                      store: DashboardDataStore,
+                      tracker_id: Any,
+                      criterion_key: Hashable,
+                      create_handler: Callable[[], CTxPatientDailiesHandler]) -> CTxPatientDailiesHandler:
+        key = self._key(store, tracker_id, criterion_key)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        handler = create_handler()
+        with self._lock:
+            self._entries[key] = handler
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return handler
+
+    def get_or_compute_window_acceptance(self,
+                                         store: DashboardDataStore,
+                                         tracker_id: Any,
+                                         criterion_key: Hashable,
+                                         compute_acceptance: Callable[[], Dict[Any, bool]]) -> bool:
+        # the acceptance is computed for all trackers of the store at once, so one miss fills the entries of all
+        key = self._key(store, tracker_id, criterion_key)
+        with self._lock:
+            if key in self._window_acceptance:
+                self._window_acceptance.move_to_end(key)
+                return self._window_acceptance[key]
+        acceptance = compute_acceptance()
+        entries = [(self._key(store, other_id, criterion_key), accepted) for other_id, accepted in acceptance.items()]
+        with self._lock:
+            self._window_acceptance.update(entries)
+            while len(self._window_acceptance) > self.max_entries:
+                self._window_acceptance.popitem(last=False)
+        return acceptance[tracker_id]
+
+    def invalidate_changed(self, old_store: DashboardDataStore, new_store: DashboardDataStore) -> int:
+        # only evicts trackers whose dailies or baseline day differ in the new store, all others stay cached
+        with self._lock:
+            stale_keys = [key for key in self._entries if self._is_stale(new_store, key)]
+            for key in stale_keys:
+                del self._entries[key]
+            for key in [key for key in self._window_acceptance if self._is_stale(new_store, key)]:
+                del self._window_acceptance[key]
+        return len(stale_keys)
+
+    @staticmethod
+    def _key(store: DashboardDataStore, tracker_id: Any, criterion_key: Hashable) -> Tuple[Any, str, str, Hashable]:
+        return (tracker_id, store.tracker_fingerprint(tracker_id), store.tracker_baseline_day(tracker_id), criterion_key)
+
+    @staticmethod
+    def _is_stale(new_store: DashboardDataStore, key: Tuple[Any, str, str, Hashable]) -> bool:
+        return (not new_store.has_tracker(key[0])
+                or new_store.tracker_fingerprint(key[0]) != key[1]
+                or new_store.tracker_baseline_day(key[0]) != key[2])
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,59 @@
+from typing import Any, Dict, Tuple, Union
+import numpy as np
+import pandas as pd
+from ctxfitness.daily_wear import EARLIEST_WINDOW_PATIENT, WINDOW_ACCEPTED, baseline_window_acceptance, earliest_qualifying_windows
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+
+ENTIRE_WEAR_PERIOD = "entire"
+
+# acceptance windows in days relative to the baseline visit, both days included
+ACCEPTANCE_WINDOWS: Dict[str, Union[Tuple[int, int], None]] = {
+    ENTIRE_WEAR_PERIOD: None,
+    "0-28": (0, 28),
+    "0-56": (0, 56),
+    "0-84": (0, 84),
+}
+
+
+def get_acceptance_window_label(window_key: str, has_baseline_days: bool = True) -> str:
+    window_days = ACCEPTANCE_WINDOWS[window_key]
+    if window_days is None:
+        return "Entire wear period"
+    # without Date_BL the windows start at the first worn day of every patient
+    return f"Days {window_days[0]}-{window_days[1]} after {'baseline' if has_baseline_days else 'first worn day'}"
+
+
+def get_window_acceptance(data_store: DashboardDataStore,
+                          window_key: str,
+                          min_hours_per_day: float,
+                          min_days: int,
+                          min_consecutive_days: int) -> Dict[Any, bool]:
+    """
+    Whether each tracker of the store is accepted within the window after its baseline visit,
+    patients without Date_BL are anchored at their first worn day.
+    """
+    window_days = ACCEPTANCE_WINDOWS[window_key]
+    if window_days is None:
+        raise Exception(f"The acceptance window '{window_key}' is not relative to the baseline!")
+    tracker_ids = data_store.tracker_ids
+    acceptance = baseline_window_acceptance(data_store.daily_wear(min_hours_per_day),
+                                            tracker_ids,
+                                            data_store.get_baseline_days().to_numpy(),
+                                            window_days,
+                                            min_days,
+                                            min_consecutive_days)
+    return dict(zip(tracker_ids.tolist(), np.asarray(acceptance[WINDOW_ACCEPTED]).tolist()))
+
+
+def get_earliest_qualifying_windows(data_store: DashboardDataStore,
+                                    min_hours_per_day: float,
+                                    min_days: int,
+                                    window_length: int,
+                                    min_consecutive_days: int) -> pd.DataFrame:
+    """
+    First qualifying window and first consecutive run of every tracker, indexed by tracker.
+    """
+    return earliest_qualifying_windows(data_store.daily_wear(min_hours_per_day),
+                                       min_days,
+                                       window_length,
+                                       min_consecutive_days).set_index(EARLIEST_WINDOW_PATIENT)
@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List
+import pandas as pd
+from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler, simple_min_hours_daily_acceptance_criterion, minimum_overall_and_consecutive_days_patient_acceptance_criterion
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+from ctxdashboard.data_store.patient_handler_cache import PatientHandlerCache
+from ctxdashboard.domain.acceptance_windows import ACCEPTANCE_WINDOWS, ENTIRE_WEAR_PERIOD, get_earliest_qualifying_windows, get_window_acceptance
+
+# number of progress updates while the dailies handlers are built
+HANDLER_PROGRESS_STEPS = 10
+
+
+@dataclass
+class AcceptanceCriteria:
+    min_hours_per_day: int
+    min_days: int
+    min_consecutive_days: int
+    acceptance_window: str
+    qualifying_window_days: int
+
+
+@dataclass
+class PatientEvaluation:
+    # in ascending order of the total wear duration
+    handlers: List[CTxPatientDailiesHandler]
+    # earliest qualifying window and consecutive run of the trackers of the handlers
+    earliest_windows: pd.DataFrame
+
+
+def evaluate_patients(data_store: DashboardDataStore,
+                      handler_cache: PatientHandlerCache,
+                      criteria: AcceptanceCriteria,
+                      filtered_ids: Iterable[str],
+                      report_progress: Callable[[float], None] = lambda _fraction: None) -> PatientEvaluation:
+    """
+    Builds the dailies handlers of the filtered trackers of the store and looks up their
+    earliest qualifying windows.
+    """
+    filtered_ids = set(filtered_ids)
+    acceptance_window = criteria.acceptance_window if criteria.acceptance_window in ACCEPTANCE_WINDOWS else ENTIRE_WEAR_PERIOD
+    # the qualifying window length does not change the handlers
+    handler_key = (criteria.min_hours_per_day, criteria.min_days, criteria.min_consecutive_days, acceptance_window)
+    window_acceptance: Dict[Any, bool] = {}
+
+    def compute_window_acceptance() -> Dict[Any, bool]:
+        # acceptance inside a baseline window is computed for all trackers at once, only if one is not cached
+        if len(window_acceptance) == 0:
+            window_acceptance.update(get_window_acceptance(
+                data_store, acceptance_window, criteria.min_hours_per_day, criteria.min_days, criteria.min_consecutive_days))
+        return window_acceptance
+
+    handlers: List[CTxPatientDailiesHandler] = []
+    tracker_order = data_store.get_total_durations_sorted().index
+    progress_step = max(len(tracker_order) // HANDLER_PROGRESS_STEPS, 1)
+    for i, user_id in enumerate(tracker_order):
+        if i % progress_step == 0:
+            report_progress(i / len(tracker_order))
+        if str(user_id) in filtered_ids:
+            handlers.append(handler_cache.get_or_create(
+                data_store,
+                user_id,
+                handler_key,
+                lambda: CTxPatientDailiesHandler.from_frame(
+                    user_id,
+                    data_store.patient_frame(user_id),
+                    simple_min_hours_daily_acceptance_criterion(criteria.min_hours_per_day),
+                    minimum_overall_and_consecutive_days_patient_acceptance_criterion(criteria.min_days, criteria.min_consecutive_days)
+                    if acceptance_window == ENTIRE_WEAR_PERIOD
+                    else lambda _days: handler_cache.get_or_compute_window_acceptance(
+                        data_store, user_id, handler_key, compute_window_acceptance))))
+
+    earliest_windows = get_earliest_qualifying_windows(
+        data_store,
+        criteria.min_hours_per_day,
+        criteria.min_days,
+        criteria.qualifying_window_days if criteria.qualifying_window_days else 1,
+        criteria.min_consecutive_days
+    ).loc[[handler.patient_id for handler in handlers]] if len(handlers) > 0 else pd.DataFrame()
+    return PatientEvaluation(handlers, earliest_windows)
@@ -0,0 +1,101 @@
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Tuple, Union
+import pandas as pd
+from ctxdashboard.domain.patient_events import PatientEventTypes
+from ctxdashboard.domain.patient_timesheets import RECIST_VALUES, read_timesheet
+from ctxfitness.daily_wear import DailyWear, event_aligned_windows
+from ctxfitness.source_schema import SourceSchema, load_source, write_source
+
+EVENT_TABLE_INDEX = ["tracker", "day", "event_type"]
+EVENT_TABLE_VALUE = "value"
+TIMESHEET_FILE_PATTERN = "timesheet_p*.xlsx"
+
+EVENT_TABLE_SCHEMA = SourceSchema(
+    name="patient events",
+    columns=EVENT_TABLE_INDEX + [EVENT_TABLE_VALUE],
+    dtypes={EVENT_TABLE_VALUE: "str"},
+    timestamp_columns=["day"])
+
+
+def format_event_value(value: Any) -> str:
+    # cells read from columns with gaps are floats, 1.0 was entered as 1
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_timesheet_events(path: str) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Returns the filled in events of a timesheet in long format and the invalid RECIST entries.
+    """
+    sheet = read_timesheet(path)
+    event_columns = [column for column in PatientEventTypes.values() if column in sheet.columns]
+    events = sheet.melt(id_vars=["tracker_id", "day"], value_vars=event_columns,
+                        var_name="event_type", value_name=EVENT_TABLE_VALUE).dropna(subset=[EVENT_TABLE_VALUE])
+    events = events.rename(columns={"tracker_id": "tracker"})
+    events[EVENT_TABLE_VALUE] = events[EVENT_TABLE_VALUE].map(format_event_value)
+
+    is_recist = events["event_type"] == PatientEventTypes.RECIST.value
+    upper_values = events[EVENT_TABLE_VALUE].str.upper()
+    is_invalid = is_recist & ~upper_values.isin(RECIST_VALUES)
+    invalid_entries = [f"'{path}' {row.day}: '{row.value}'" for row in events[is_invalid].itertuples()]
+    events.loc[is_recist, EVENT_TABLE_VALUE] = upper_values[is_recist]
+    return events[~is_invalid], invalid_entries
+
+
+def to_event_table(events: pd.DataFrame) -> pd.DataFrame:
+    events = events.assign(
+        day=pd.to_datetime(events["day"]),
+        event_type=pd.Categorical(events["event_type"], categories=PatientEventTypes.values()),
+        value=events[EVENT_TABLE_VALUE].astype("category"))
+    return events.set_index(EVENT_TABLE_INDEX)[[EVENT_TABLE_VALUE]].sort_index()
+
+
+def load_timesheet_events(timesheet_dir: str, max_workers: Union[int, None] = None) -> pd.DataFrame:
+    """
+    Reads all timesheets of the directory in parallel into one event table indexed by
+    (tracker, day, event type). Raises if any timesheet holds an invalid RECIST value.
+    """
+    paths = sorted(glob.glob(os.path.join(timesheet_dir, TIMESHEET_FILE_PATTERN)))
+    if max_workers == 1 or len(paths) <= 1:
+        results = [read_timesheet_events(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(read_timesheet_events, paths, chunksize=max(1, len(paths) // 64)))
+
+    invalid_entries = [entry for _events, entries in results for entry in entries]
+    if len(invalid_entries) > 0:
+        raise Exception(
+            f"The timesheets hold RECIST values other than {RECIST_VALUES}: {', '.join(invalid_entries)}")
+    logging.getLogger("PatientEventTable").info(f"Read the events of {len(paths)} timesheets")
+    if len(results) == 0:
+        return to_event_table(pd.DataFrame(columns=EVENT_TABLE_INDEX + [EVENT_TABLE_VALUE]))
+    return to_event_table(pd.concat([events for events, _entries in results], ignore_index=True))
+
+
+def write_event_table(events: pd.DataFrame, path: str) -> None:
+    write_source(events.reset_index(), path)
+
+
+def read_event_table(path: str) -> pd.DataFrame:
+    return to_event_table(load_source(path, EVENT_TABLE_SCHEMA))
+
+
+def event_wear_windows(events: pd.DataFrame,
+                       daily_wear: DailyWear,
+                       event_types: List[PatientEventTypes],
+                       days_before: int = 7,
+                       days_after: int = 7) -> pd.DataFrame:
+    """
+    Wear statistics before and after every event of the given types, indexed like the event table.
+    """
+    selected = events[events.index.get_level_values("event_type").isin([t.value for t in event_types])]
+    windows = event_aligned_windows(daily_wear,
+                                    selected.index.get_level_values("tracker"),
+                                    selected.index.get_level_values("day"),
+                                    days_before=days_before,
+                                    days_after=days_after)
+    return windows.iloc[:, 2:].set_axis(selected.index)
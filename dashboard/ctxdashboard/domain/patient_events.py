@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, Generator
+from typing import Generator
 from ctxdashboard.util.listable_string_enum import ListableStringEnum
 import pandas as pd
 from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
@@ -29,26 +29,35 @@ class PatientEventSheetBundle:
 
 
 def create_patient_events_sheets(dailies: pd.DataFrame) -> Generator[PatientEventSheetBundle, None, None]:
-    tracker_ids = dailies[pdc.USER_LAST_NAME].unique()
-    first_day_overall: pd.Timestamp = dailies[pdc.START_DT].min()
-    last_day_overall: pd.Timestamp = dailies[pdc.START_DT].max()
+    """
+    Builds the tracker x day table of all trackers at once, the yielded sheets are views into it.
+    """
+    tracker_codes, tracker_ids = pd.factorize(dailies[pdc.USER_LAST_NAME], sort=False)
+    first_day_overall: pd.Timestamp = dailies[pdc.START_DT].min().normalize()
+    last_day_overall: pd.Timestamp = dailies[pdc.START_DT].max().normalize()
 
     all_days = list(gen_days_in_interval(first_day_overall.to_pydatetime(
     ).date(), last_day_overall.to_pydatetime().date()))
-
-    for tracker_id in tracker_ids:
-        daily_durations: Dict[str, int] = {kv[0]: kv[1] for kv in
-                                           dailies[dailies[pdc.USER_LAST_NAME]
-                                                   == tracker_id]
-                                           .apply(lambda r: (r[pdc.START_DT].date(), r[pdc.DAILY_DURATION_S]), axis=1)}
-        df_track = pd.DataFrame(
-            data={
-                "tracker_id": np.repeat(tracker_id, len(all_days)),
-                "day": all_days,
-                "time_worn_s": [daily_durations[d] if d in daily_durations else 0 for d in all_days]
-            }
-        )
-        for event_type in PatientEventTypes.values():
-            df_track[event_type] = np.nan
-
-        yield PatientEventSheetBundle(tracker_id, df_track)
+    n_trackers, n_days = len(tracker_ids), len(all_days)
+
+    # like a pivot, the last duration of a tracker and day wins and missing days are 0
+    day_indices = (dailies[pdc.START_DT].dt.normalize() - first_day_overall).dt.days.to_numpy()
+    durations = dailies[pdc.DAILY_DURATION_S].to_numpy()
+    in_range = day_indices < n_days
+    cells = np.where(in_range, tracker_codes * n_days + day_indices, -1)
+    kept = in_range & ~pd.Series(cells).duplicated(keep="last").to_numpy()
+    time_worn_s = np.zeros(n_trackers * n_days, dtype=np.result_type(durations.dtype, np.int64))
+    time_worn_s[cells[kept]] = durations[kept]
+
+    df_all = pd.DataFrame(
+        data={
+            "tracker_id": np.asarray(tracker_ids).repeat(n_days),
+            "day": np.tile(np.array(all_days, dtype=object), n_trackers),
+            "time_worn_s": time_worn_s,
+            **{event_type: np.full(n_trackers * n_days, np.nan) for event_type in PatientEventTypes.values()}
+        },
+        index=np.tile(np.arange(n_days), n_trackers)
+    )
+
+    for tracker_code, tracker_id in enumerate(tracker_ids):
+        yield PatientEventSheetBundle(tracker_id, df_all.iloc[tracker_code * n_days:(tracker_code + 1) * n_days])
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Tuple, Union
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.datavalidation import DataValidation
+from ctxdashboard.domain.patient_events import PatientEventTypes, create_patient_events_sheets
+
+RECIST_VALUES = ["CR", "PR", "PD", "SD", "MR"]
+RECIST_FORMULA = ", ".join(RECIST_VALUES)
+# generated columns, all other columns of a timesheet hold clinician entries
+TIMESHEET_BASE_COLUMNS = ["tracker_id", "day", "time_worn_s"]
+TIMESHEET_MANIFEST_FILE = "timesheets.json"
+
+
+@dataclass
+class TimesheetExportResult:
+    tracker_id: Any
+    path: str
+    n_rows: int
+    seconds: float
+
+
+def get_timesheet_sheet_name(tracker_id: Any) -> str:
+    return f"p{tracker_id}"
+
+
+def get_timesheet_path(out_dir: str, tracker_id: Any) -> str:
+    return os.path.join(out_dir, f"timesheet_{get_timesheet_sheet_name(tracker_id)}.xlsx")
+
+
+def get_time_worn_fingerprint(sheet: pd.DataFrame) -> str:
+    # only worn days count, so a sheet is unchanged if the overall day range grows
+    worn = sheet[sheet["time_worn_s"] != 0]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.to_datetime(worn["day"]).to_numpy(dtype="datetime64[ns]").view(np.int64).tobytes())
+    digest.update(worn["time_worn_s"].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def read_timesheet_manifest(out_dir: str) -> Dict[str, str]:
+    manifest_path = os.path.join(out_dir, TIMESHEET_MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)["fingerprints"]
+
+
+def write_timesheet_manifest(out_dir: str, fingerprints: Dict[str, str]) -> None:
+    with open(os.path.join(out_dir, TIMESHEET_MANIFEST_FILE), "w") as manifest_file:
+        json.dump({"fingerprints": fingerprints}, manifest_file, indent=2, sort_keys=True)
+
+
+def read_timesheet(path: str) -> pd.DataFrame:
+    sheet = pd.read_excel(path)
+    sheet["day"] = pd.to_datetime(sheet["day"]).dt.date
+    return sheet
+
+
+def merge_timesheet(new_sheet: pd.DataFrame, existing_sheet: pd.DataFrame) -> pd.DataFrame:
+    """
+    Takes the generated columns from the new sheet and the clinician entries from the existing one.
+    Days missing from the new sheet are kept if they hold entries.
+    """
+    entry_columns = [column for column in existing_sheet.columns if column not in TIMESHEET_BASE_COLUMNS]
+    existing = existing_sheet.drop_duplicates("day", keep="last").set_index("day")
+    new = new_sheet.set_index("day")
+    kept_existing = existing[existing.index.isin(new.index) | existing[entry_columns].notna().any(axis=1)]
+
+    merged = new.drop(columns=[column for column in entry_columns if column in new.columns]).join(
+        kept_existing[entry_columns], how="outer")
+    for column in ["tracker_id", "time_worn_s"]:
+        merged[column] = merged[column].fillna(kept_existing[column]).astype(new[column].dtype)
+    columns = list(new_sheet.columns) + [column for column in entry_columns if column not in new_sheet.columns]
+    return merged.rename_axis("day").reset_index()[columns]
+
+
+def create_recist_validation(sheet: pd.DataFrame) -> DataValidation:
+    column_letter = get_column_letter(sheet.columns.get_loc(PatientEventTypes.RECIST.value) + 1)
+    validation = DataValidation(type="list", formula1=RECIST_FORMULA)
+    validation.add(f"{column_letter}1:{column_letter}{sheet.shape[0] + 1}")
+    return validation
+
+
+def to_cell_value(value: Any) -> Any:
+    # openpyxl only writes plain python values, empty cells are None
+    if pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def iter_cell_rows(sheet: pd.DataFrame) -> Iterator[List[Any]]:
+    # one row at a time, the sheet is never copied into python lists as a whole
+    for row in sheet.itertuples(index=False, name=None):
+        yield [to_cell_value(value) for value in row]
+
+
+def write_timesheet(tracker_id: Any, sheet: pd.DataFrame, path: str, merge: bool = False) -> TimesheetExportResult:
+    """
+    Streams the sheet into a write-only workbook, so memory does not grow with the sheet.
+    With merge, the entries of an existing timesheet at path are kept.
+    """
+    start = time.perf_counter()
+    if merge and os.path.exists(path):
+        sheet = merge_timesheet(sheet, read_timesheet(path))
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(get_timesheet_sheet_name(tracker_id))
+    worksheet.data_validations.append(create_recist_validation(sheet))
+    worksheet.append([str(column) for column in sheet.columns])
+    for row in iter_cell_rows(sheet):
+        worksheet.append(row)
+    workbook.save(path)
+    return TimesheetExportResult(tracker_id, path, sheet.shape[0], time.perf_counter() - start)
+
+
+def write_timesheet_job(job: Tuple[Any, pd.DataFrame, str, bool]) -> TimesheetExportResult:
+    return write_timesheet(*job)
+
+
+def export_timesheets(dailies: pd.DataFrame,
+                      out_dir: str,
+                      max_workers: Union[int, None] = None,
+                      incremental: bool = False) -> List[TimesheetExportResult]:
+    """
+    Writes one timesheet workbook per patient into out_dir, in parallel across processes.
+    With max_workers=1 the workbooks are written in this process.
+
+    Incremental exports only rewrite the timesheets whose worn time changed since the last
+    export and keep the clinician entries in them.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    fingerprints = read_timesheet_manifest(out_dir) if incremental else {}
+    jobs = []
+    n_unchanged = 0
+    for bundle in create_patient_events_sheets(dailies):
+        path = get_timesheet_path(out_dir, bundle.tracker_id)
+        fingerprint = get_time_worn_fingerprint(bundle.sheet)
+        if incremental and fingerprints.get(str(bundle.tracker_id)) == fingerprint and os.path.exists(path):
+            n_unchanged += 1
+            continue
+        fingerprints[str(bundle.tracker_id)] = fingerprint
+        jobs.append((bundle.tracker_id, bundle.sheet, path, incremental))
+
+    if max_workers == 1 or len(jobs) <= 1:
+        results = [write_timesheet_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(write_timesheet_job, jobs, chunksize=max(1, len(jobs) // 64)))
+    write_timesheet_manifest(out_dir, fingerprints)
+
+    for result in results:
+        logging.getLogger("PatientTimesheets").info(f"Wrote {result.n_rows} rows to '{result.path}' in {result.seconds:.3f}s")
+    if n_unchanged > 0:
+        logging.getLogger("PatientTimesheets").info(f"Kept {n_unchanged} unchanged timesheets")
+    return results
@@ -1,3 +1,6 @@
+import logging
+from typing import Any, List
+import pandas as pd
 from ctxdashboard.util.listable_string_enum import ListableStringEnum
 
 class PatientMetaColumn(ListableStringEnum):
@@ -15,4 +18,22 @@ class PatientMetaColumn(ListableStringEnum):
     PRIMARY_TUMOR = 'Primary Tumor',
     TUG = 'Fitness: TUG',
     HGS = 'Fitness: HGS',
-    MEMO = 'Fitness::Memo'
\ No newline at end of file
+    MEMO = 'Fitness::Memo'
+
+
+def has_baseline_days(patient_cofactors: pd.DataFrame) -> bool:
+    return PatientMetaColumn.DATE_BL.value in patient_cofactors.columns
+
+
+def get_baseline_days(patient_cofactors: pd.DataFrame, tracker_ids: List[Any]) -> pd.Series:
+    """
+    Date_BL of every tracker, NaT if the patient meta has none.
+    """
+    if not has_baseline_days(patient_cofactors):
+        logging.getLogger("PatientMeta").warning(
+            f"The patient meta has no '{PatientMetaColumn.DATE_BL.value}' column, baseline windows start at the first worn day!")
+        return pd.Series(pd.NaT, index=tracker_ids, dtype="datetime64[ns]")
+    baselines = pd.Series(pd.to_datetime(patient_cofactors[PatientMetaColumn.DATE_BL.value]).to_numpy(),
+                          index=patient_cofactors[PatientMetaColumn.TRACKER_ID.value].astype(str))
+    baselines = baselines[~baselines.index.duplicated(keep="first")]
+    return pd.Series(baselines.reindex([str(tracker_id) for tracker_id in tracker_ids]).to_numpy(), index=tracker_ids)
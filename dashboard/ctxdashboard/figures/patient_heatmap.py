@@ -1,65 +1,86 @@
+import hashlib
 from dataclasses import dataclass
-from math import log
-from typing import List, Tuple
+from typing import List
 import plotly.graph_objects as go
-from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler, CTxPatientDay
+from dash import Patch
+from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+from ctxdashboard.figures.typed_arrays import WEAR_FRACTION_LEVELS, encode_typed_array, quantize_wear_fractions
 import numpy as np
 
 
 @dataclass
 class PreparedHeatmap:
     durations_matrix: np.ndarray
-    hover_matrix: np.ndarray
+    hover_hms_matrix: np.ndarray
     y_ticks: List[str]
     x_ticks: List[str]
 
     @staticmethod
-    def prepare_hover_matrix(array_shape: Tuple[int, int]) -> np.ndarray:
-        hover_matrix = np.empty(array_shape, dtype="object")
-        for i in range(0, array_shape[0]):
-            for j in range(0, array_shape[1]):
-                hover_matrix[i,
-                             j] = f"Day {j+1}: {CTxPatientDay.ZERO_TIME_STRING}"
-        return hover_matrix
+    def split_daily_seconds(durations_s: np.ndarray) -> np.ndarray:
+        # hours, minutes and seconds along the last axis, mirrors CTxPatientDay.format_daily_seconds
+        hours = durations_s // 3600
+        minutes = durations_s // 60 - hours * 60
+        seconds = durations_s - hours * 60 * 60 - minutes * 60
+        return np.stack([hours, minutes, seconds], axis=-1).astype(np.uint8)
 
-    @classmethod
-    def prepare_heatmap(cls, patient_entries: List[CTxPatientDailiesHandler], accept_day_hours: int) -> "PreparedHeatmap":
+    @staticmethod
+    def stack_durations(patient_entries: List[CTxPatientDailiesHandler]) -> np.ndarray:
+        # one row per patient, padded with days that were not worn
         max_number_durations = max(
-            [len(pat_entry.get_durations()) for pat_entry in patient_entries])
-        array_shape = (len(patient_entries), max_number_durations)
-        durations_matrix = np.zeros(array_shape)
-        hover_matrix = cls.prepare_hover_matrix(array_shape)
+            [len(pat_entry.patient_days) for pat_entry in patient_entries])
+        durations_s = np.zeros((len(patient_entries), max_number_durations), dtype=np.int64)
         for i, pat_entry in enumerate(patient_entries):
-            for j, duration in enumerate(pat_entry.get_durations()):
-                durations_matrix[i, j] = min(
-                    duration / (accept_day_hours * 3600), 1)
-                hover_matrix[i,
-                             j] = f"Day {j+1}: {CTxPatientDay.format_daily_seconds(duration)}"
+            durations = pat_entry.patient_days.durations_s
+            durations_s[i, :len(durations)] = durations
+        return durations_s
+
+    @staticmethod
+    def to_wear_fractions(durations_s: np.ndarray, accept_day_hours: int) -> np.ndarray:
+        return np.minimum(durations_s / (accept_day_hours * 3600), 1)
+
+    @classmethod
+    def prepare_heatmap(cls, patient_entries: List[CTxPatientDailiesHandler], accept_day_hours: int) -> "PreparedHeatmap":
+        durations_s = cls.stack_durations(patient_entries)
         return cls(
-            durations_matrix=durations_matrix,
-            hover_matrix=hover_matrix,
-            x_ticks=[f"Day {i + 1}" for i in range(0, max_number_durations)],
+            durations_matrix=cls.to_wear_fractions(durations_s, accept_day_hours),
+            hover_hms_matrix=cls.split_daily_seconds(durations_s),
+            x_ticks=[f"Day {i + 1}" for i in range(0, durations_s.shape[1])],
             y_ticks=[f" {pat.patient_id} -" for pat in patient_entries]
         )
 
 
+def get_heatmap_signature(data_store: DashboardDataStore, patient_entries: List[CTxPatientDailiesHandler]) -> str:
+    """
+    Identifies the patients of the heatmaps, their dailies and their baseline days. Heatmaps with
+    the same signature only differ in the values that depend on the acceptance criteria.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for pat_entry in patient_entries:
+        digest.update(f"{pat_entry.patient_id}:{data_store.tracker_fingerprint(pat_entry.patient_id)}:"
+                      f"{data_store.tracker_baseline_day(pat_entry.patient_id)};".encode())
+    return digest.hexdigest()
+
+
 def render_times_heatmap(patient_entries: List[CTxPatientDailiesHandler], accept_day_hours: int) -> go.Figure:
     prepared_heatmap = PreparedHeatmap.prepare_heatmap(
         patient_entries, accept_day_hours)
+    # z and customdata are sent as base64 typed arrays instead of nested JSON lists
     fig = go.Figure(
         data=go.Heatmap(
-            z=prepared_heatmap.durations_matrix,
+            z=encode_typed_array(quantize_wear_fractions(
+                prepared_heatmap.durations_matrix)),
+            x0=1,
+            dx=1,
             coloraxis=None,
-            hovertemplate="%{customdata}<extra></extra>",
-            customdata=prepared_heatmap.hover_matrix,
-            zmax=1,
+            hovertemplate="Day %{x}: %{customdata[0]:02d}:%{customdata[1]:02d}:%{customdata[2]:02d}<extra></extra>",
+            customdata=encode_typed_array(prepared_heatmap.hover_hms_matrix),
+            zmax=WEAR_FRACTION_LEVELS,
             zmin=0,
-            colorscale=[(0, "#000000"), (0.9999, "#e3fc03"),
+            colorscale=[(0, "#000000"), ((WEAR_FRACTION_LEVELS - 1) / WEAR_FRACTION_LEVELS, "#e3fc03"),
                         (1, "#5afc03")]
         )
     )
-    selected_x_ticks = [i for i in range(0, len(
-        prepared_heatmap.x_ticks), 1 + int(log(len(prepared_heatmap.x_ticks), 2)))]
     fig.update_layout(dict(
         xaxis={
             'showgrid': False,
@@ -84,6 +105,14 @@ def render_times_heatmap(patient_entries: List[CTxPatientDailiesHandler], accept
     return fig
 
 
+def patch_times_heatmap(patient_entries: List[CTxPatientDailiesHandler], accept_day_hours: int) -> Patch:
+    # the ticks and the hover times only depend on the dailies, the colors on the hours per day
+    patch = Patch()
+    patch["data"][0]["z"] = encode_typed_array(quantize_wear_fractions(PreparedHeatmap.to_wear_fractions(
+        PreparedHeatmap.stack_durations(patient_entries), accept_day_hours)))
+    return patch
+
+
 @dataclass
 class PreparedAcceptanceHeatMap:
     acceptance_values: np.ndarray
@@ -93,7 +122,7 @@ class PreparedAcceptanceHeatMap:
     @classmethod
     def create_prepared_acceptance_matrix(cls, patient_entries: List[CTxPatientDailiesHandler]) -> "PreparedAcceptanceHeatMap":
         return cls(
-            np.array([1 if p.accepted else 0 for p in patient_entries])
+            np.array([1 if p.accepted else 0 for p in patient_entries], dtype=np.uint8)
             .reshape((len(patient_entries), 1)),
             np.array(
                 [f"{p.patient_id} accepted" if p.accepted else f"{p.patient_id} not accepted" for p in patient_entries])
@@ -109,7 +138,7 @@ def render_acceptance_heatmap(patient_entries: List[CTxPatientDailiesHandler]) -
         patient_entries)
     fig = go.Figure(
         data=go.Heatmap(
-            z=prepared_heatmap.acceptance_values,
+            z=encode_typed_array(prepared_heatmap.acceptance_values),
             text=prepared_heatmap.text_matrix,
             texttemplate="%{text}",
             textfont={"size": 10},
@@ -143,3 +172,12 @@ def render_acceptance_heatmap(patient_entries: List[CTxPatientDailiesHandler]) -
     fig.update_coloraxes(showscale=False)
     fig.update_traces(showscale=False)
     return fig
+
+
+def patch_acceptance_heatmap(patient_entries: List[CTxPatientDailiesHandler]) -> Patch:
+    prepared_heatmap = PreparedAcceptanceHeatMap.create_prepared_acceptance_matrix(
+        patient_entries)
+    patch = Patch()
+    patch["data"][0]["z"] = encode_typed_array(prepared_heatmap.acceptance_values)
+    patch["data"][0]["text"] = prepared_heatmap.text_matrix.tolist()
+    return patch
@@ -1,29 +1,34 @@
 from typing import List
 import plotly.graph_objects as go
-from dash import dcc
+from dash import Patch
 
-def create_acceptance_pie_chart(acceptances: List[bool], n_total_patients):
+
+def get_acceptance_pie_values(acceptances: List[bool], n_total_patients) -> List[int]:
     n_patients_after_filters = len(acceptances)
-    n_accept = sum(acceptances)
+    n_accept = int(sum(acceptances))
+    return [
+        n_accept,
+        n_patients_after_filters - n_accept,
+        n_total_patients - n_patients_after_filters
+    ]
+
+
+def create_acceptance_pie_figure(acceptances: List[bool], n_total_patients) -> go.Figure:
     figure = go.Figure(
         data=go.Pie(
             labels=["accepted", "not accepted", "filtered or no activity"],
-            values=[
-                n_accept,
-                n_patients_after_filters - n_accept,
-                n_total_patients - n_patients_after_filters
-            ],
+            values=get_acceptance_pie_values(acceptances, n_total_patients),
             marker={
                 "colors": ["green", "red", "#b8b8b8"]
             }
         )
     )
     figure.update_traces(textinfo='value+percent')
-    return dcc.Graph(
-        id=f"acceptance-pie-figure",
-        className="acceptance-pie-figure",
-        figure=figure,
-        config={
-            'displayModeBar': False
-        }
-    )
+    return figure
+
+
+def patch_acceptance_pie_chart(acceptances: List[bool], n_total_patients) -> Patch:
+    # the labels and colors never change
+    patch = Patch()
+    patch["data"][0]["values"] = get_acceptance_pie_values(acceptances, n_total_patients)
+    return patch
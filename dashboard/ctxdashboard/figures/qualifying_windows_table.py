@@ -0,0 +1,27 @@
+from typing import Any, List
+import pandas as pd
+from dash import html
+from ctxfitness.daily_wear import EARLIEST_CONSECUTIVE_END, EARLIEST_CONSECUTIVE_START, EARLIEST_WINDOW_END, EARLIEST_WINDOW_START
+
+
+def format_day_range(start: pd.Timestamp, end: pd.Timestamp) -> str:
+    if pd.isna(end):
+        return "-"
+    return f"{start:%Y-%m-%d} - {end:%Y-%m-%d}"
+
+
+def create_qualifying_windows_table(earliest_windows: pd.DataFrame, tracker_ids: List[Any]) -> html.Table:
+    header = html.Tr([html.Th("Tracker"), html.Th("First qualifying window"), html.Th("First consecutive run")])
+    windows = earliest_windows.loc[tracker_ids]
+    rows = [
+        html.Tr([
+            html.Td(str(tracker_id)),
+            html.Td(format_day_range(window_start, window_end)),
+            html.Td(format_day_range(run_start, run_end))
+        ])
+        for tracker_id, window_start, window_end, run_start, run_end in zip(
+            tracker_ids,
+            windows[EARLIEST_WINDOW_START], windows[EARLIEST_WINDOW_END],
+            windows[EARLIEST_CONSECUTIVE_START], windows[EARLIEST_CONSECUTIVE_END])
+    ]
+    return html.Table(className="qualifying-windows-table", children=[html.Thead(header), html.Tbody(rows)])
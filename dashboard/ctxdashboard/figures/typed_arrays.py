@@ -0,0 +1,37 @@
+import base64
+from typing import Dict
+import numpy as np
+
+# numpy dtypes that plotly.js can decode from a typed array spec
+PLOTLY_TYPED_ARRAY_DTYPES: Dict[str, str] = {
+    "int8": "i1",
+    "uint8": "u1",
+    "int16": "i2",
+    "uint16": "u2",
+    "int32": "i4",
+    "uint32": "u4",
+    "float32": "f4",
+    "float64": "f8"
+}
+
+# wear fractions are quantized to 0..255, the top level is reserved for fully met days
+WEAR_FRACTION_LEVELS = 255
+
+
+def encode_typed_array(array: np.ndarray) -> Dict[str, str]:
+    # arrays of more than one dimension, e.g. the 3-D hover customdata, need the plotly.js bundled with dash>=3.0
+    if array.dtype.name not in PLOTLY_TYPED_ARRAY_DTYPES:
+        raise Exception(
+            f"The dtype '{array.dtype.name}' cannot be encoded as a plotly typed array!")
+    return {
+        "dtype": PLOTLY_TYPED_ARRAY_DTYPES[array.dtype.name],
+        "bdata": base64.b64encode(
+            np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).tobytes()).decode("ascii"),
+        "shape": ", ".join(str(dim) for dim in array.shape)
+    }
+
+
+def quantize_wear_fractions(fractions: np.ndarray) -> np.ndarray:
+    # fractions below 1 never round up into the top level, so a day only shows as met if it is
+    levels = np.minimum(np.floor(fractions * WEAR_FRACTION_LEVELS), WEAR_FRACTION_LEVELS - 1)
+    return np.where(fractions >= 1, WEAR_FRACTION_LEVELS, levels).astype(np.uint8)
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Union
+from flask import Flask, Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from ctxdashboard.data_store.patient_handler_cache import PatientHandlerCache
+from ctxdashboard.util.background_callbacks import CoalescingDiskcacheManager
+from ctxdashboard.util.single_flight import LatestRequests, SingleFlight
+from ctxdashboard.util.payload_size import DASH_UPDATE_COMPONENT_PATH
+
+METRICS_PATH = "/metrics"
+# gunicorn.conf.py points this at a directory all workers write their values to
+PROMETHEUS_MULTIPROC_DIR = "PROMETHEUS_MULTIPROC_DIR"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CallbackStage:
+    FILTERING = "filtering"
+    HANDLER_CONSTRUCTION = "handler_construction"
+    HEATMAP_PREPARATION = "heatmap_preparation"
+    SERIALIZATION = "serialization"
+
+
+callback_calls = Counter(
+    "ctx_callback_calls_total",
+    "Number of dashboard callback invocations.",
+    ["callback"])
+
+callback_seconds = Histogram(
+    "ctx_callback_seconds",
+    "Duration of dashboard callbacks in seconds, serialization excluded.",
+    ["callback"],
+    buckets=LATENCY_BUCKETS)
+
+callback_stage_seconds = Histogram(
+    "ctx_callback_stage_seconds",
+    "Duration of the stages of update_output_div in seconds.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS)
+
+callback_payload_bytes = Histogram(
+    "ctx_callback_payload_bytes",
+    "Uncompressed size of callback responses in bytes.",
+    buckets=(1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7))
+
+requests_in_flight = Gauge(
+    "ctx_callback_requests_in_flight",
+    "Number of callback requests currently being processed.",
+    multiprocess_mode="livesum")
+
+handler_cache_hits = Counter(
+    "ctx_handler_cache_hits_total",
+    "Number of dailies handlers served from the cache.")
+
+handler_cache_misses = Counter(
+    "ctx_handler_cache_misses_total",
+    "Number of dailies handlers that had to be built.")
+
+handler_cache_entries = Gauge(
+    "ctx_handler_cache_entries",
+    "Number of dailies handlers currently cached.",
+    multiprocess_mode="livesum")
+
+callback_coalesced = Counter(
+    "ctx_callback_coalesced_total",
+    "Number of callback requests that shared a computation in flight for the same inputs.")
+
+callback_superseded = Counter(
+    "ctx_callback_superseded_total",
+    "Number of callback requests dropped because a later request of the same session arrived.")
+
+
+@dataclass
+class SyncedCount:
+    count: Callable[[], float]
+    last_count: float = 0.0
+
+
+class SyncedCounts:
+    """
+    The handler cache and the coalescing count in plain attributes of the worker.
+    The counts are copied into metrics after every callback request and before every scrape,
+    so the multiprocess collector adds them up across workers like all other metrics.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[Counter, SyncedCount] = {}
+        self._gauges: Dict[Gauge, Callable[[], float]] = {}
+
+    def add_counter(self, counter: Counter, count: Callable[[], float]) -> None:
+        with self._lock:
+            self._counters[counter] = SyncedCount(count)
+
+    def add_gauge(self, gauge: Gauge, value: Callable[[], float]) -> None:
+        with self._lock:
+            self._gauges[gauge] = value
+
+    def exclude_current(self) -> None:
+        # e.g. the counts of the warm-up in the gunicorn master, which every forked worker inherits
+        with self._lock:
+            for synced_count in self._counters.values():
+                synced_count.last_count = synced_count.count()
+
+    def sync(self) -> None:
+        with self._lock:
+            for counter, synced_count in self._counters.items():
+                count = synced_count.count()
+                # a count that restarted from 0 continues from its new value
+                if count > synced_count.last_count:
+                    counter.inc(count - synced_count.last_count)
+                synced_count.last_count = count
+            for gauge, value in self._gauges.items():
+                gauge.set(value())
+
+
+synced_counts = SyncedCounts()
+
+
+def register_coalescing_metrics(single_flight: SingleFlight,
+                                latest_requests: LatestRequests,
+                                background_callback_manager: Union[CoalescingDiskcacheManager, None]) -> None:
+    synced_counts.add_counter(callback_coalesced, lambda: single_flight.shared + (
+        background_callback_manager.shared_jobs if background_callback_manager is not None else 0))
+    synced_counts.add_counter(callback_superseded, lambda: latest_requests.superseded + (
+        background_callback_manager.dropped_requests if background_callback_manager is not None else 0))
+
+
+def render_metrics() -> bytes:
+    if os.environ.get(PROMETHEUS_MULTIPROC_DIR):
+        # sums the values every worker wrote to the shared directory, not only the ones of this worker
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def register_metrics_endpoint(server: Flask, patient_handler_cache: PatientHandlerCache) -> None:
+    synced_counts.add_counter(handler_cache_hits, lambda: patient_handler_cache.hits)
+    synced_counts.add_counter(handler_cache_misses, lambda: patient_handler_cache.misses)
+    synced_counts.add_gauge(handler_cache_entries, lambda: len(patient_handler_cache))
+
+    @server.before_request
+    def track_request_start() -> None:
+        if request.path.endswith(DASH_UPDATE_COMPONENT_PATH):
+            g.callback_request_start = time.perf_counter()
+            requests_in_flight.inc()
+
+    @server.after_request
+    def track_response(response: Response) -> Response:
+        # Runs before the response is compressed. Everything after the callback returned
+        # is attributed to serialization, which is mostly the JSON encoding of its outputs.
+        if "callback_request_start" in g and not response.direct_passthrough:
+            callback_payload_bytes.observe(response.calculate_content_length() or 0)
+            if "callback_seconds" in g:
+                request_seconds = time.perf_counter() - g.callback_request_start
+                callback_stage_seconds.labels(CallbackStage.SERIALIZATION).observe(
+                    max(request_seconds - g.callback_seconds, 0))
+            synced_counts.sync()
+        return response
+
+    @server.teardown_request
+    def track_request_end(_exception) -> None:
+        if "callback_request_start" in g:
+            requests_in_flight.dec()
+
+    @server.route(METRICS_PATH)
+    def metrics() -> Response:
+        synced_counts.sync()
+        return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,166 @@
+import os
+import tempfile
+import threading
+from typing import Any, Union
+from dash import DiskcacheManager
+from ctxdashboard.util.single_flight import canonical_callback_arg
+
+BACKGROUND_CALLBACKS_ENV = "CTX_BACKGROUND_CALLBACKS"
+BACKGROUND_CACHE_DIR_ENV = "CTX_BACKGROUND_CACHE_DIR"
+DEFAULT_BACKGROUND_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ctx-background-callbacks")
+# results are fetched by the next poll of the page, older ones were abandoned
+BACKGROUND_RESULT_EXPIRE_S = 10 * 60
+BACKGROUND_POLL_INTERVAL_MS = 250
+
+
+def background_callbacks_enabled() -> bool:
+    # opt-in, a job costs a forked process, the SQLite queue and polls, which is slower than the callback itself
+    return os.environ.get(BACKGROUND_CALLBACKS_ENV, "0").lower() in ["1", "true", "yes"]
+
+
+class SerializedDiskcacheManager(DiskcacheManager):
+    """
+    Job processes are forked from the threaded web worker. A fork while another thread is
+    inside a SQLite transaction of the queue leaves the child with lock state it can never
+    release, so the queue is accessed by one thread of the worker at a time.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # reentrant, get_result terminates finished jobs
+        self._queue_lock = threading.RLock()
+
+    def call_job_fn(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().call_job_fn(*args, **kwargs)
+
+    def terminate_job(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().terminate_job(*args, **kwargs)
+
+    def clear_cache_entry(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().clear_cache_entry(*args, **kwargs)
+
+    def get_or_create_signing_secret(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().get_or_create_signing_secret(*args, **kwargs)
+
+    def result_ready(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().result_ready(*args, **kwargs)
+
+    def get_progress(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().get_progress(*args, **kwargs)
+
+    def get_result(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().get_result(*args, **kwargs)
+
+    def get_updated_props(self, *args: Any, **kwargs: Any) -> Any:
+        with self._queue_lock:
+            return super().get_updated_props(*args, **kwargs)
+
+
+class CoalescingDiskcacheManager(SerializedDiskcacheManager):
+    """
+    Requests with the same canonical inputs share the job in flight for them. The result is
+    kept until every request waiting on the job fetched it, at most for the expiry time. A
+    superseded or cancelled request only terminates the job if no other request waits on it.
+    The bookkeeping lives in the queue, so requests are coalesced across gunicorn workers.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.shared_jobs = 0
+        # requests that left their job because they were superseded or cancelled
+        self.dropped_requests = 0
+
+    @staticmethod
+    def _job_key(key: str) -> str:
+        return f"{key}-job"
+
+    @staticmethod
+    def _waiters_key(key: str) -> str:
+        return f"{key}-waiters"
+
+    @staticmethod
+    def _result_key(job: Any) -> str:
+        return f"job-{job}-key"
+
+    def _forget_job(self, key: str, job: Any) -> None:
+        self.handle.delete(self._job_key(key))
+        self.handle.delete(self._waiters_key(key))
+        self.handle.delete(self._result_key(job))
+
+    def build_cache_key(self, fn: Any, args: Any, cache_args_to_ignore: Any, triggered: Any) -> str:
+        if isinstance(args, (list, tuple)):
+            args = [canonical_callback_arg(arg) for arg in args]
+        return super().build_cache_key(fn, args, cache_args_to_ignore, triggered)
+
+    def call_job_fn(self, key: str, job_fn: Any, args: Any, context: Any) -> Any:
+        with self._queue_lock:
+            job = self.handle.get(self._job_key(key))
+            if job is not None and (self.job_running(job) or self.result_ready(key)):
+                self.handle.incr(self._waiters_key(key))
+                self.shared_jobs += 1
+                return job
+            # forked outside of a transaction, see SerializedDiskcacheManager
+            job = super().call_job_fn(key, job_fn, args, context)
+            with self.handle.transact():
+                self.handle.set(self._job_key(key), job, expire=self.expire)
+                self.handle.set(self._waiters_key(key), 1, expire=self.expire)
+                self.handle.set(self._result_key(job), key, expire=self.expire)
+            return job
+
+    def get_result(self, key: str, job: Any) -> Any:
+        with self._queue_lock:
+            if not self.result_ready(key):
+                return self.UNDEFINED
+            with self.handle.transact():
+                waiters = self.handle.decr(self._waiters_key(key), default=1)
+                if waiters <= 0:
+                    self._forget_job(key, self.handle.get(self._job_key(key), job))
+            if waiters > 0:
+                # the other requests fetch it with their next poll
+                self.handle.touch(key, expire=self.expire)
+                return self.handle.get(key, self.UNDEFINED)
+            return super().get_result(key, job)
+
+    def terminate_job(self, job: Any) -> Any:
+        if job is None:
+            return super().terminate_job(job)
+        with self._queue_lock:
+            key = self.handle.get(self._result_key(job))
+            if key is not None:
+                if self.result_ready(key):
+                    # finished, the result is kept for the requests still waiting on it
+                    return None
+                with self.handle.transact():
+                    waiters = self.handle.decr(self._waiters_key(key), default=1)
+                    if waiters <= 0:
+                        self._forget_job(key, job)
+                self.dropped_requests += 1
+                if waiters > 0:
+                    return None
+            return super().terminate_job(job)
+
+
+def create_background_callback_manager() -> Union[DiskcacheManager, None]:
+    """
+    Disk queue manager that runs background callbacks in job processes forked from the web
+    worker, so they share its memory-mapped data. The queue directory is shared by all gunicorn
+    workers. Returns None unless background callbacks are enabled with CTX_BACKGROUND_CALLBACKS=1.
+    """
+    if not background_callbacks_enabled():
+        return None
+    try:
+        import diskcache
+        import multiprocess  # noqa: F401
+        import psutil  # noqa: F401
+    except ImportError:
+        raise Exception(
+            f"Background callbacks require 'dash[diskcache]' to be installed, unset {BACKGROUND_CALLBACKS_ENV} to run callbacks in the request threads!")
+    cache = diskcache.Cache(os.environ.get(BACKGROUND_CACHE_DIR_ENV, DEFAULT_BACKGROUND_CACHE_DIR))
+    return CoalescingDiskcacheManager(cache, expire=BACKGROUND_RESULT_EXPIRE_S)
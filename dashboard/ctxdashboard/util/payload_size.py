@@ -0,0 +1,18 @@
+import logging
+from flask import Flask, Response, request
+
+DASH_UPDATE_COMPONENT_PATH = "/_dash-update-component"
+PAYLOAD_BYTES_HEADER = "X-Payload-Bytes"
+
+
+def register_payload_size_reporting(server: Flask) -> None:
+    # Registered after Dash set up response compression, so this hook runs first and
+    # sees the uncompressed payload. The compressed size is the Content-Length.
+    @server.after_request
+    def report_payload_size(response: Response) -> Response:
+        if request.path.endswith(DASH_UPDATE_COMPONENT_PATH) and not response.direct_passthrough:
+            payload_bytes = response.calculate_content_length()
+            response.headers[PAYLOAD_BYTES_HEADER] = str(payload_bytes)
+            logging.getLogger("PayloadSize").info(
+                f"Callback response payload: {payload_bytes} bytes")
+        return response
@@ -0,0 +1,138 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple, Union
+
+
+class SupersededError(Exception):
+    pass
+
+
+def canonical_callback_arg(arg: Any) -> Any:
+    # the selected values of multi selects are sets, their order does not change the outputs
+    if isinstance(arg, list) and all(isinstance(value, str) for value in arg):
+        return sorted(arg)
+    return arg
+
+
+def canonical_callback_key(args: Sequence[Any]) -> str:
+    return json.dumps([canonical_callback_arg(arg) for arg in args], sort_keys=True, default=str)
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Union[BaseException, None] = None
+        self.waiters: List[Callable[[], bool]] = []
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key wait on one computation and share its result.
+    The computation is dropped once every caller waiting on it was superseded, and
+    nothing is kept after it finished.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.shared = 0
+        self.abandoned = 0
+
+    def do(self,
+           key: Hashable,
+           compute: Callable[[Callable[[], None]], Any],
+           is_superseded: Callable[[], bool] = lambda: False) -> Any:
+        """
+        Runs compute(checkpoint) unless a call with the same key is in flight. compute should call
+        checkpoint() between its stages, it raises SupersededError once all callers were superseded.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+                self.computed += 1
+            else:
+                self.shared += 1
+            call.waiters.append(is_superseded)
+
+        if not is_leader:
+            call.done.wait()
+        else:
+            def checkpoint() -> None:
+                with self._lock:
+                    if not all(waiter() for waiter in call.waiters):
+                        return
+                    # later callers with this key start a new computation
+                    del self._calls[key]
+                    self.abandoned += 1
+                raise SupersededError(f"All {len(call.waiters)} callers of the computation were superseded")
+
+            try:
+                call.result = compute(checkpoint)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class LatestRequests:
+    """
+    Numbers the requests of every session, a request is superseded once a later one of its
+    session arrived. Sessions are forgotten when none of their requests is in flight.
+    Requests without a session are never superseded.
+    """
+
+    def __init__(self) -> None:
+        # session -> [latest generation, requests in flight]
+        self._sessions: Dict[Hashable, List[int]] = {}
+        self._lock = threading.Lock()
+        self.superseded = 0
+
+    def start(self, session_id: Hashable) -> Tuple[Hashable, int]:
+        if session_id is None:
+            return None, 0
+        with self._lock:
+            session = self._sessions.setdefault(session_id, [0, 0])
+            session[0] += 1
+            session[1] += 1
+            return session_id, session[0]
+
+    def is_superseded(self, request: Tuple[Hashable, int]) -> bool:
+        session_id, generation = request
+        if session_id is None:
+            return False
+        with self._lock:
+            return self._sessions[session_id][0] != generation
+
+    def drop_if_superseded(self, request: Tuple[Hashable, int]) -> bool:
+        if not self.is_superseded(request):
+            return False
+        with self._lock:
+            self.superseded += 1
+        return True
+
+    def finish(self, request: Tuple[Hashable, int]) -> None:
+        session_id, _generation = request
+        if session_id is None:
+            return
+        with self._lock:
+            session = self._sessions[session_id]
+            session[1] -= 1
+            if session[1] == 0:
+                del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Tuple, Union
+from flask import Flask, Response
+
+READY_PATH = "/ready"
+
+
+class WarmUp:
+    """
+    Runs the warm-up tasks, e.g. the default view of the dashboard, so the caches are filled
+    before the first user arrives. ready is set once all tasks ran. A failing task is logged
+    and skipped, cold caches are still correct.
+    """
+
+    def __init__(self, tasks: List[Tuple[str, Callable[[], None]]]) -> None:
+        self.tasks = tasks
+        self.ready = threading.Event()
+        self._started_in_pid: Union[int, None] = None
+        self._start_lock = threading.Lock()
+        self._running_in_background = False
+        self._rerun_in_background = False
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        for name, task in self.tasks:
+            try:
+                task()
+            except Exception as exception:
+                logging.getLogger("WarmUp").error(f"The warm-up task '{name}' failed: {exception}")
+        self.ready.set()
+        logging.getLogger("WarmUp").info(
+            f"Ran {len(self.tasks)} warm-up tasks in {time.perf_counter() - start:.3f}s")
+
+    def ensure_started(self) -> None:
+        # Under gunicorn the master warms up before forking, so the workers start with warm caches
+        # and ready set. Without it, the first request starts the warm-up in a background thread.
+        if self.ready.is_set() or self._started_in_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self.ready.is_set() or self._started_in_pid == os.getpid():
+                return
+            threading.Thread(target=self.run, name="WarmUp", daemon=True).start()
+            self._started_in_pid = os.getpid()
+
+    def run_in_background(self) -> None:
+        # e.g. after a new dataset version was swapped in, so the caller does not wait for it,
+        # a run requested while one is in progress runs once more after it
+        with self._start_lock:
+            if self._running_in_background:
+                self._rerun_in_background = True
+                return
+            self._running_in_background = True
+        threading.Thread(target=self._run_until_no_rerun, name="WarmUp", daemon=True).start()
+
+    def _run_until_no_rerun(self) -> None:
+        while True:
+            self.run()
+            with self._start_lock:
+                if not self._rerun_in_background:
+                    self._running_in_background = False
+                    return
+                self._rerun_in_background = False
+
+
+def register_readiness_endpoint(server: Flask, warm_up: WarmUp) -> None:
+    # for startup or readiness probes, traffic should only be routed to the instance once it answers 200
+    @server.route(READY_PATH)
+    def ready() -> Response:
+        if warm_up.ready.is_set():
+            return Response("ready", mimetype="text/plain")
+        return Response("warming up", status=503, mimetype="text/plain")
@@ -0,0 +1,11 @@
+# %%
+import sys
+from ctxdashboard.data_store.dashboard_data_store import build_snapshot
+
+# Writes the memory-mappable snapshot the dashboard loads at startup.
+# Defaults to the dashboard data directory, or CTX_DATA_DIR if it is set.
+data_dir = sys.argv[1] if len(sys.argv) > 1 else None
+
+print(f"Snapshot written to '{build_snapshot(data_dir)}'")
+
+# %%
@@ -1,32 +1,25 @@
 # %%
-
-import pandas as pd
-import string
-
-from ctxdashboard.domain.patient_events import create_patient_events_sheets, PatientEventTypes
-from openpyxl.worksheet.datavalidation import DataValidation
-
-ALPHABET = string.ascii_uppercase
+import argparse
+import time
+from ctxdashboard.domain.patient_timesheets import export_timesheets
+from ctxdashboard.data_store.dashboard_data_store import DAILIES_FILE_STEM, DASHBOARD_DAILIES_SCHEMA, find_source_file
+from ctxfitness.source_schema import load_source
+
+# Writes one timesheet per patient in parallel. With --incremental only the timesheets whose
+# worn time changed are rewritten and the entries clinicians made in them are kept.
+parser = argparse.ArgumentParser(description="Writes the patient event timesheets.")
+parser.add_argument("--workers", type=int, default=None, help="worker processes, one per core by default")
+parser.add_argument("--incremental", action="store_true")
+args = parser.parse_args()
 
 # %%
-dailies = pd.read_excel("../data/dailies.xlsx")
+dailies = load_source(find_source_file("../data", DAILIES_FILE_STEM), DASHBOARD_DAILIES_SCHEMA)
 
 # %%
-
-for event_sheet_tuple in create_patient_events_sheets(dailies):
-    tracker_id = event_sheet_tuple.tracker_id
-    df_track = event_sheet_tuple.sheet
-    with pd.ExcelWriter(f"./patient_timesheets/timesheet_p{tracker_id}.xlsx") as writer:
-        sheet_name = f'p{tracker_id}'
-        df_track.to_excel(writer, index=False, sheet_name=sheet_name)
-        worksheet = writer.sheets[sheet_name]
-        validation = pd.DataFrame(
-            {'RECIST_TYPES': []})
-        recist_idx = df_track.columns.get_loc(str(PatientEventTypes.RECIST.value))
-        column_letter = ALPHABET[recist_idx]
-
-        dv_recist = DataValidation(type='list', formula1="CR, PR, PD, SD, MR")
-        dv_recist.add(f'{column_letter}1:{column_letter}{df_track.shape[0]+1}')
-        worksheet.add_data_validation(dv_recist)
+start = time.perf_counter()
+results = export_timesheets(dailies, "./patient_timesheets", max_workers=args.workers, incremental=args.incremental)
+for result in sorted(results, key=lambda r: r.seconds, reverse=True):
+    print(f"{result.path}: {result.n_rows} rows in {result.seconds:.3f}s")
+print(f"Wrote {len(results)} timesheets in {time.perf_counter() - start:.2f}s")
 
 # %%
@@ -1,6 +1,9 @@
 # %%
 from typing import Any, List
 from ctxdashboard.domain.patientmeta import PatientMetaColumn
+from ctxdashboard.data_store.dashboard_data_store import DAILIES_FILE_STEM, DASHBOARD_DAILIES_SCHEMA, find_source_file
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+from ctxfitness.source_schema import load_source
 import pandas as pd
 import numpy as np
 import math
@@ -19,6 +22,15 @@ df_baseline = pd.read_csv("./dashboard/scripts/patient_meta_baseline.csv")
 
 n_pats = df_baseline.shape[0]
 
+# the baseline visit is up to a week before the tracker was first worn,
+# patients without dailies have no baseline date
+dailies = load_source(find_source_file("./dashboard/data", DAILIES_FILE_STEM), DASHBOARD_DAILIES_SCHEMA)
+first_worn_days = dailies.groupby(pdc.USER_LAST_NAME.value)[pdc.START_DT.value].min().dt.normalize()
+df_baseline[f"{PatientMetaColumn.DATE_BL.value}"] = (
+    df_baseline["User Last Name"].map(first_worn_days)
+    - pd.to_timedelta(np.random.randint(0, 8, n_pats), unit="D")
+)
+
 df_baseline[f"{PatientMetaColumn.ECOG}"] = [
     round(np.random.uniform(0, 5)) for i in range(n_pats)
 ]
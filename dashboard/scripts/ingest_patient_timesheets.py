@@ -0,0 +1,17 @@
+# %%
+import os
+import sys
+import time
+from ctxdashboard.domain.patient_event_table import load_timesheet_events, write_event_table
+
+# Reads the filled in timesheets into one event table next to the dashboard data.
+# The table is written as CSV by default, pass another extension (feather, parquet) to change it.
+extension: str = sys.argv[1] if len(sys.argv) > 1 else "csv"
+
+# %%
+start = time.perf_counter()
+events = load_timesheet_events("./patient_timesheets")
+write_event_table(events, os.path.join("../data", f"patient-events.{extension}"))
+print(f"Read {events.shape[0]} events in {time.perf_counter() - start:.2f}s")
+
+# %%
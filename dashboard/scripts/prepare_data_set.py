@@ -1,7 +1,15 @@
+import os
+import sys
 from ctxfitness.preprocessing_pipeline import PreprocessingPipeline
+from ctxfitness.source_schema import write_source
+from ctxdashboard.data_store.dashboard_data_store import DAILIES_FILE_STEM, build_snapshot
 import pandas as pd
 
+# The dailies are written as Excel by default, pass another extension (csv, feather,
+# parquet) to write them in that format. Feather and parquet require pyarrow.
 path_all_dailies: str = "../../SampleData/generated_dailies.xlsx"
+extension: str = sys.argv[1] if len(sys.argv) > 1 else "xlsx"
 
 normalized_dailies: pd.DataFrame = PreprocessingPipeline.run_pipeline(path_all_dailies)
-normalized_dailies.to_excel("../data/dailies.xlsx")
\ No newline at end of file
+write_source(normalized_dailies, os.path.join("../data", f"{DAILIES_FILE_STEM}.{extension}"))
+build_snapshot("../data")
@@ -13,6 +13,7 @@ setup(
         "pandas>=1.5.2",
         "seaborn>=0.12.1",
         "flask",
+        "prometheus-client>=0.16.0",
         "ctxfitness",
         "pyxtension==1.13.16"
     ]
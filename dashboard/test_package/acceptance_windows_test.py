@@ -0,0 +1,64 @@
+import unittest
+import pandas as pd
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+from ctxdashboard.domain.acceptance_windows import ACCEPTANCE_WINDOWS, ENTIRE_WEAR_PERIOD, get_acceptance_window_label, get_earliest_qualifying_windows, get_window_acceptance
+from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc, get_baseline_days
+from ctxfitness.daily_wear import EARLIEST_CONSECUTIVE_START, EARLIEST_WINDOW_END, EARLIEST_WINDOW_START
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+import datetime as dt
+
+
+class AcceptanceWindowsTest(unittest.TestCase):
+    # tracker 1 wears the tracker 10 hours on days 0-2 and 30-39 after 2022-06-01, tracker 2 on days 0-39
+    example_dailies = pd.DataFrame(
+        data={
+            f"{pdc.USER_LAST_NAME.value}": [1] * 13 + [2] * 40,
+            f"{pdc.START_DT.value}": [dt.datetime(2022, 6, 1) + dt.timedelta(days=d)
+                                      for d in list(range(3)) + list(range(30, 40)) + list(range(40))],
+            f"{pdc.END_DT.value}": [dt.datetime(2022, 6, 1, 10) + dt.timedelta(days=d)
+                                    for d in list(range(3)) + list(range(30, 40)) + list(range(40))],
+            f"{pdc.DAILY_DURATION_S.value}": [10 * 3600] * 53
+        }
+    )
+    example_meta = pd.DataFrame(
+        data={
+            f"{pmc.TRACKER_ID.value}": [1, 2],
+            f"{pmc.DATE_BL.value}": [pd.Timestamp(2022, 6, 25), pd.NaT]
+        }
+    )
+
+    def test_get_window_acceptance(self):
+        store = DashboardDataStore.from_frames(AcceptanceWindowsTest.example_dailies, AcceptanceWindowsTest.example_meta)
+        self.assertEqual(get_window_acceptance(store, "0-28", 8, 10, 10), {1: True, 2: True})
+        self.assertEqual(get_window_acceptance(store, "0-28", 8, 11, 10), {1: False, 2: True})
+        self.assertEqual(get_window_acceptance(store, "0-28", 11, 1, 1), {1: False, 2: False})
+
+    def test_get_window_acceptance_without_baseline_column(self):
+        store = DashboardDataStore.from_frames(
+            AcceptanceWindowsTest.example_dailies, AcceptanceWindowsTest.example_meta.drop(columns=[pmc.DATE_BL.value]))
+        self.assertEqual(get_window_acceptance(store, "0-28", 8, 4, 3), {1: False, 2: True})
+
+    def test_get_window_acceptance_entire_wear_period(self):
+        store = DashboardDataStore.from_frames(AcceptanceWindowsTest.example_dailies, AcceptanceWindowsTest.example_meta)
+        self.assertIsNone(ACCEPTANCE_WINDOWS[ENTIRE_WEAR_PERIOD])
+        with self.assertRaises(Exception):
+            get_window_acceptance(store, ENTIRE_WEAR_PERIOD, 8, 1, 1)
+
+    def test_get_baseline_days(self):
+        baselines = get_baseline_days(AcceptanceWindowsTest.example_meta, [2, 1, 3])
+        self.assertTrue(pd.isna(baselines[2]))
+        self.assertEqual(baselines[1], pd.Timestamp(2022, 6, 25))
+        self.assertTrue(pd.isna(baselines[3]))
+
+    def test_get_acceptance_window_label(self):
+        self.assertEqual(get_acceptance_window_label("0-28"), "Days 0-28 after baseline")
+        self.assertEqual(get_acceptance_window_label("0-28", False), "Days 0-28 after first worn day")
+        self.assertEqual(get_acceptance_window_label(ENTIRE_WEAR_PERIOD, False), "Entire wear period")
+
+    def test_get_earliest_qualifying_windows(self):
+        store = DashboardDataStore.from_frames(AcceptanceWindowsTest.example_dailies, AcceptanceWindowsTest.example_meta)
+        windows = get_earliest_qualifying_windows(store, 8, 11, 28, 3)
+        self.assertTrue(pd.isna(windows.loc[1, EARLIEST_WINDOW_START]))
+        self.assertEqual(windows.loc[1, EARLIEST_CONSECUTIVE_START], pd.Timestamp(2022, 6, 1))
+        self.assertEqual(windows.loc[2, EARLIEST_WINDOW_START], pd.Timestamp(2022, 6, 1))
+        self.assertEqual(windows.loc[2, EARLIEST_WINDOW_END], pd.Timestamp(2022, 6, 11))
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from ctxdashboard.util.background_callbacks import BACKGROUND_CACHE_DIR_ENV, BACKGROUND_CALLBACKS_ENV, CoalescingDiskcacheManager, SerializedDiskcacheManager, background_callbacks_enabled, create_background_callback_manager
+
+try:
+    import diskcache  # noqa: F401
+    import multiprocess  # noqa: F401
+    import psutil  # noqa: F401
+    DISKCACHE_INSTALLED = True
+except ImportError:
+    DISKCACHE_INSTALLED = False
+
+
+def slow_outputs(seconds: float) -> str:
+    time.sleep(seconds)
+    return "outputs"
+
+
+def wait_for_result(manager, key: str) -> None:
+    deadline = time.time() + 10
+    while not manager.result_ready(key) and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class BackgroundCallbacksTest(unittest.TestCase):
+    def test_background_callbacks_enabled(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop(BACKGROUND_CALLBACKS_ENV, None)
+            self.assertFalse(background_callbacks_enabled())
+        with mock.patch.dict(os.environ, {BACKGROUND_CALLBACKS_ENV: "0"}):
+            self.assertFalse(background_callbacks_enabled())
+            self.assertIsNone(create_background_callback_manager())
+        with mock.patch.dict(os.environ, {BACKGROUND_CALLBACKS_ENV: "1"}):
+            self.assertTrue(background_callbacks_enabled())
+
+    @unittest.skipUnless(DISKCACHE_INSTALLED, "requires dash[diskcache]")
+    def test_create_background_callback_manager(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.dict(os.environ, {BACKGROUND_CALLBACKS_ENV: "1", BACKGROUND_CACHE_DIR_ENV: cache_dir}):
+                manager = create_background_callback_manager()
+            self.assertIsInstance(manager, SerializedDiskcacheManager)
+            self.assertEqual(manager.handle.directory, cache_dir)
+            self.assertIs(manager.get_result("unknown", None), manager.UNDEFINED)
+            self.assertFalse(manager.result_ready("unknown"))
+            # get_result clears the entry and terminates the finished job while holding the queue lock
+            manager.handle.set("key", "result")
+            self.assertTrue(manager.result_ready("key"))
+            self.assertEqual(manager.get_result("key", str(2 ** 22 + 1)), "result")
+            self.assertFalse(manager.result_ready("key"))
+            manager.handle.close()
+
+    @unittest.skipUnless(DISKCACHE_INSTALLED, "requires dash[diskcache]")
+    def test_coalescing_manager_shares_jobs(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager = CoalescingDiskcacheManager(diskcache.Cache(cache_dir), expire=60)
+            job_fn = manager.make_job_fn(slow_outputs, progress=False)
+            key = manager.build_cache_key(slow_outputs, [0.2, ["b", "a"]], [], None)
+            self.assertEqual(key, manager.build_cache_key(slow_outputs, [0.2, ["a", "b"]], [], None))
+
+            job = manager.call_job_fn(key, job_fn, [0.2], {})
+            self.assertEqual(manager.call_job_fn(key, job_fn, [0.2], {}), job)
+            self.assertEqual(manager.shared_jobs, 1)
+            wait_for_result(manager, key)
+            # the result stays until both requests fetched it
+            self.assertEqual(manager.get_result(key, job), "outputs")
+            manager.terminate_job(job)
+            self.assertEqual(manager.get_result(key, job), "outputs")
+            self.assertFalse(manager.result_ready(key))
+            self.assertIsNone(manager.handle.get(f"{key}-job"))
+            manager.handle.close()
+
+    @unittest.skipUnless(DISKCACHE_INSTALLED, "requires dash[diskcache]")
+    def test_coalescing_manager_terminates_job_without_waiters(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager = CoalescingDiskcacheManager(diskcache.Cache(cache_dir), expire=60)
+            job_fn = manager.make_job_fn(slow_outputs, progress=False)
+            key = manager.build_cache_key(slow_outputs, [30], [], None)
+            job = manager.call_job_fn(key, job_fn, [30], {})
+            manager.call_job_fn(key, job_fn, [30], {})
+
+            # the first superseded request leaves the job to the other one
+            manager.terminate_job(job)
+            self.assertTrue(manager.job_running(job))
+            manager.terminate_job(job)
+            self.assertFalse(manager.job_running(job))
+            self.assertEqual(manager.dropped_requests, 2)
+            manager.handle.close()
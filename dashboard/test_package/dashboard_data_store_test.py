@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+import numpy as np
+import datetime as dt
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore, find_source_file
+from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+
+
+class DashboardDataStoreTest(unittest.TestCase):
+    example_dailies = pd.DataFrame(
+        data={
+            f"{pdc.USER_LAST_NAME.value}": [2, 1, 2, 3],
+            f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 11), dt.datetime(2020, 11, 11),
+                                      dt.datetime(2020, 11, 12), dt.datetime(2020, 11, 13)],
+            f"{pdc.END_DT.value}": [dt.datetime(2020, 11, 12), dt.datetime(2020, 11, 12),
+                                    dt.datetime(2020, 11, 13), dt.datetime(2020, 11, 14)],
+            f"{pdc.DAILY_DURATION_S.value}": [50, 200, 10, 100]
+        }
+    )
+    example_meta = pd.DataFrame(
+        data={
+            f"{pmc.TRACKER_ID.value}": [1, 2, 3],
+            f"{pmc.AGE.value}": [50, 60, 70]
+        }
+    )
+
+    def test_total_durations_sorted(self):
+        store = DashboardDataStore.from_frames(self.example_dailies, self.example_meta)
+        total_durations = store.get_total_durations_sorted()
+        self.assertSequenceEqual(list(total_durations.index), [2, 3, 1])
+        self.assertSequenceEqual(list(total_durations.values), [60, 100, 200])
+
+    def test_patient_frame(self):
+        store = DashboardDataStore.from_frames(self.example_dailies, self.example_meta)
+        patient_frame = store.patient_frame(2)
+        self.assertSequenceEqual(list(patient_frame[pdc.DAILY_DURATION_S]), [50, 10])
+        self.assertSequenceEqual(list(patient_frame[pdc.USER_LAST_NAME]), [2, 2])
+        self.assertEqual(patient_frame[pdc.START_DT].min(), pd.Timestamp(2020, 11, 11))
+
+    def test_has_tracker(self):
+        store = DashboardDataStore.from_frames(self.example_dailies, self.example_meta)
+        self.assertTrue(store.has_tracker(3))
+        self.assertFalse(store.has_tracker(4))
+
+    def test_arrays_are_read_only(self):
+        store = DashboardDataStore.from_frames(self.example_dailies, self.example_meta)
+        self.assertFalse(store.durations.flags.writeable)
+        self.assertFalse(store.day_starts.flags.writeable)
+
+    def test_snapshot_round_trip(self):
+        store = DashboardDataStore.from_frames(self.example_dailies, self.example_meta)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_dir = os.path.join(tmp_dir, "snapshot")
+            store.write_snapshot(snapshot_dir)
+            loaded_store = DashboardDataStore.from_snapshot(snapshot_dir)
+            self.assertIsInstance(loaded_store.durations, np.memmap)
+            self.assertTrue(loaded_store.patient_frame(2).equals(store.patient_frame(2)))
+            self.assertTrue(loaded_store.patient_cofactors.equals(self.example_meta))
+            del loaded_store
+
+    def test_from_source_files(self):
+        store = DashboardDataStore.from_frames(self.example_dailies, self.example_meta)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.example_dailies.to_csv(os.path.join(tmp_dir, "dailies.csv"))
+            self.example_meta.to_excel(os.path.join(tmp_dir, "patient-meta.xlsx"), index=False)
+            loaded_store = DashboardDataStore.from_source_files(tmp_dir)
+            self.assertTrue(loaded_store.patient_frame(2).equals(store.patient_frame(2)))
+            self.assertTrue(loaded_store.patient_cofactors.equals(self.example_meta))
+
+    def test_find_source_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(Exception):
+                find_source_file(tmp_dir, "dailies")
+            self.example_dailies.to_excel(os.path.join(tmp_dir, "dailies.xlsx"))
+            self.assertEqual(find_source_file(tmp_dir, "dailies"), os.path.join(tmp_dir, "dailies.xlsx"))
+            self.example_dailies.to_csv(os.path.join(tmp_dir, "dailies.csv"))
+            self.assertEqual(find_source_file(tmp_dir, "dailies"), os.path.join(tmp_dir, "dailies.xlsx"))
+            os.remove(os.path.join(tmp_dir, "dailies.xlsx"))
+            self.assertEqual(find_source_file(tmp_dir, "dailies"), os.path.join(tmp_dir, "dailies.csv"))
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+import datetime as dt
+from ctxdashboard.data_store.dashboard_data_store import DAILIES_EXCEL_FILE, PATIENT_META_EXCEL_FILE, build_snapshot, get_dataset_version
+from ctxdashboard.data_store.data_watcher import DataStoreHolder, DataWatcher
+from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+
+
+def write_dataset(data_dir: str, durations):
+    pd.DataFrame(
+        data={
+            f"{pdc.USER_LAST_NAME.value}": [1, 2],
+            f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 11), dt.datetime(2020, 11, 11)],
+            f"{pdc.END_DT.value}": [dt.datetime(2020, 11, 12), dt.datetime(2020, 11, 12)],
+            f"{pdc.DAILY_DURATION_S.value}": durations
+        }
+    ).to_excel(os.path.join(data_dir, DAILIES_EXCEL_FILE))
+    pd.DataFrame(
+        data={f"{pmc.TRACKER_ID.value}": [1, 2]}
+    ).to_excel(os.path.join(data_dir, PATIENT_META_EXCEL_FILE))
+    return build_snapshot(data_dir)
+
+
+class DataWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_poll_once_without_new_version(self):
+        write_dataset(self.data_dir, [10, 20])
+        watcher = DataWatcher(DataStoreHolder.load(self.data_dir), self.data_dir)
+        self.assertFalse(watcher.poll_once())
+
+    def test_poll_once_swaps_new_version(self):
+        write_dataset(self.data_dir, [10, 20])
+        holder = DataStoreHolder.load(self.data_dir)
+        watcher = DataWatcher(holder, self.data_dir)
+        swaps = []
+        watcher.add_listener(lambda old_store, new_store: swaps.append((old_store, new_store)))
+        old_store = holder.get()
+
+        write_dataset(self.data_dir, [10, 30])
+
+        self.assertTrue(watcher.poll_once())
+        self.assertEqual(holder.version, get_dataset_version(self.data_dir))
+        self.assertSequenceEqual(list(holder.get().patient_frame(2)[pdc.DAILY_DURATION_S]), [30])
+        self.assertSequenceEqual(list(old_store.patient_frame(2)[pdc.DAILY_DURATION_S]), [20])
+        self.assertEqual(swaps, [(old_store, holder.get())])
+
+    def test_snapshot_pairs_store_and_version(self):
+        write_dataset(self.data_dir, [10, 20])
+        holder = DataStoreHolder.load(self.data_dir)
+        old_store, old_version = holder.snapshot()
+        write_dataset(self.data_dir, [10, 30])
+
+        DataWatcher(holder, self.data_dir).poll_once()
+
+        new_store, new_version = holder.snapshot()
+        self.assertIsNot(new_store, old_store)
+        self.assertNotEqual(new_version, old_version)
+        self.assertEqual(new_version, get_dataset_version(self.data_dir))
+        self.assertSequenceEqual(list(old_store.patient_frame(2)[pdc.DAILY_DURATION_S]), [20])
+
+    def test_build_snapshot_keeps_previous_version(self):
+        first_snapshot = write_dataset(self.data_dir, [10, 20])
+        second_snapshot = write_dataset(self.data_dir, [10, 30])
+        third_snapshot = write_dataset(self.data_dir, [10, 40])
+        self.assertFalse(os.path.exists(first_snapshot))
+        self.assertTrue(os.path.exists(second_snapshot))
+        self.assertTrue(os.path.exists(third_snapshot))
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from flask import Flask
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge
+from ctxdashboard.data_store.patient_handler_cache import PatientHandlerCache
+from ctxdashboard.metrics.dashboard_metrics import METRICS_PATH, PROMETHEUS_MULTIPROC_DIR, SyncedCounts, register_metrics_endpoint
+
+WORKER_SCRIPT = """
+from ctxdashboard.metrics.dashboard_metrics import callback_calls, requests_in_flight
+callback_calls.labels("update_output_div").inc(2)
+requests_in_flight.inc()
+"""
+
+SCRAPE_SCRIPT = """
+import sys
+from ctxdashboard.metrics.dashboard_metrics import render_metrics
+sys.stdout.write(render_metrics().decode())
+"""
+
+
+class MetricsTest(unittest.TestCase):
+    def test_synced_counts(self):
+        registry = CollectorRegistry()
+        counter = Counter("some_total", "Some counter.", registry=registry)
+        gauge = Gauge("some_entries", "Some gauge.", registry=registry)
+        counts = {"count": 3, "entries": 5}
+        synced_counts = SyncedCounts()
+        synced_counts.add_counter(counter, lambda: counts["count"])
+        synced_counts.add_gauge(gauge, lambda: counts["entries"])
+
+        synced_counts.sync()
+        counts["count"] = 4
+        synced_counts.sync()
+        self.assertEqual(registry.get_sample_value("some_total"), 4)
+        self.assertEqual(registry.get_sample_value("some_entries"), 5)
+
+        # a restarted count continues from its new value
+        counts["count"] = 1
+        synced_counts.sync()
+        counts["count"] = 2
+        synced_counts.sync()
+        self.assertEqual(registry.get_sample_value("some_total"), 5)
+
+        counts["count"] = 10
+        synced_counts.exclude_current()
+        counts["count"] = 11
+        synced_counts.sync()
+        self.assertEqual(registry.get_sample_value("some_total"), 6)
+
+    def test_metrics_endpoint(self):
+        server = Flask(__name__)
+        cache = PatientHandlerCache()
+        cache.hits = 3
+        cache.misses = 1
+        hits_before = REGISTRY.get_sample_value("ctx_handler_cache_hits_total") or 0
+        register_metrics_endpoint(server, cache)
+        response = server.test_client().get(METRICS_PATH)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        self.assertIn("ctx_callback_requests_in_flight", response.data.decode())
+        self.assertEqual(REGISTRY.get_sample_value("ctx_handler_cache_hits_total") - hits_before, 3)
+
+    def test_multiprocess_metrics_are_summed_across_workers(self):
+        with tempfile.TemporaryDirectory() as multiproc_dir:
+            env = dict(os.environ, **{PROMETHEUS_MULTIPROC_DIR: multiproc_dir})
+            for _ in range(2):
+                subprocess.run([sys.executable, "-c", WORKER_SCRIPT], env=env, check=True)
+            text = subprocess.run([sys.executable, "-c", SCRAPE_SCRIPT], env=env, check=True,
+                                  capture_output=True, text=True).stdout
+        self.assertIn('ctx_callback_calls_total{callback="update_output_div"} 4.0', text)
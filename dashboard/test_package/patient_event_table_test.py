@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+from ctxdashboard.domain.patient_event_table import event_wear_windows, load_timesheet_events, read_event_table, write_event_table
+from ctxdashboard.domain.patient_events import PatientEventTypes
+from ctxdashboard.domain.patient_timesheets import export_timesheets, get_timesheet_path, read_timesheet
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+import datetime as dt
+
+
+class PatientEventTableTest(unittest.TestCase):
+    example_dailies = pd.DataFrame(
+        data={
+            f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 11, 12, 00), dt.datetime(2020, 11, 14, 12, 00)],
+            f"{pdc.USER_LAST_NAME.value}": [1, 2],
+            f"{pdc.DAILY_DURATION_S.value}": [50, 10]
+        }
+    )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        export_timesheets(PatientEventTableTest.example_dailies, self.tmp_dir.name, max_workers=1)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def fill_in(self, tracker_id, day_position: int, event_type: PatientEventTypes, value) -> None:
+        path = get_timesheet_path(self.tmp_dir.name, tracker_id)
+        sheet = read_timesheet(path)
+        sheet.loc[day_position, event_type.value] = value
+        sheet.to_excel(path, index=False, sheet_name=f"p{tracker_id}")
+
+    def test_load_timesheet_events(self):
+        self.fill_in(1, 0, PatientEventTypes.RECIST, "pd ")
+        self.fill_in(1, 2, PatientEventTypes.HOPSPITALIZED, 1)
+        self.fill_in(2, 1, PatientEventTypes.DEATH, "x")
+        for max_workers in [1, 2]:
+            events = load_timesheet_events(self.tmp_dir.name, max_workers=max_workers)
+            self.assertEqual(list(events.index.names), ["tracker", "day", "event_type"])
+            self.assertEqual(events.shape[0], 3)
+            self.assertEqual(events.loc[(1, pd.Timestamp(2020, 11, 11), PatientEventTypes.RECIST.value), "value"], "PD")
+            self.assertEqual(events.loc[(1, pd.Timestamp(2020, 11, 13), PatientEventTypes.HOPSPITALIZED.value), "value"], "1")
+            self.assertEqual(list(events.xs(PatientEventTypes.DEATH.value, level="event_type").index),
+                             [(2, pd.Timestamp(2020, 11, 12))])
+
+    def test_load_timesheet_events_invalid_recist(self):
+        self.fill_in(2, 0, PatientEventTypes.RECIST, "progressive")
+        with self.assertRaises(Exception) as context:
+            load_timesheet_events(self.tmp_dir.name, max_workers=1)
+        self.assertIn("progressive", str(context.exception))
+
+    def test_load_timesheet_events_empty(self):
+        events = load_timesheet_events(self.tmp_dir.name, max_workers=1)
+        self.assertEqual(events.shape[0], 0)
+        self.assertEqual(list(events.index.names), ["tracker", "day", "event_type"])
+
+    def test_event_table_round_trip(self):
+        self.fill_in(1, 0, PatientEventTypes.RECIST, "SD")
+        self.fill_in(2, 1, PatientEventTypes.DEATH, 1)
+        events = load_timesheet_events(self.tmp_dir.name, max_workers=1)
+        path = os.path.join(self.tmp_dir.name, "patient-events.csv")
+        write_event_table(events, path)
+        pd.testing.assert_frame_equal(read_event_table(path), events)
+
+    def test_event_wear_windows(self):
+        self.fill_in(1, 2, PatientEventTypes.SCHEDULED_THERAPY_RECEIVED, 1)
+        self.fill_in(2, 0, PatientEventTypes.DEATH, 1)
+        events = load_timesheet_events(self.tmp_dir.name, max_workers=1)
+        dailies = PatientEventTableTest.example_dailies.assign(
+            **{f"{pdc.END_DT.value}": PatientEventTableTest.example_dailies[pdc.START_DT.value]})
+        daily_wear = DashboardDataStore.from_frames(dailies, pd.DataFrame()).daily_wear(min_hours_per_day=0)
+        windows = event_wear_windows(events, daily_wear, [PatientEventTypes.SCHEDULED_THERAPY_RECEIVED], days_before=3)
+        self.assertEqual(list(windows.index), [(1, pd.Timestamp(2020, 11, 13), PatientEventTypes.SCHEDULED_THERAPY_RECEIVED.value)])
+        self.assertEqual(windows["Pre wear (s)"].iloc[0], 50)
+        self.assertEqual(windows["Pre accepted days"].iloc[0], 1)
+        self.assertEqual(windows["Post observed days"].iloc[0], 0)
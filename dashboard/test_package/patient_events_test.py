@@ -28,3 +28,18 @@ class PatientEventsTest(unittest.TestCase):
         t_ids = [t.tracker_id for t in create_patient_events_sheets(
             PatientEventsTest.example_dailies)]
         self.assertCountEqual(t_ids, ["1", "2"])
+
+    def test_create_patient_events_sheets_time_worn(self):
+        dailies = pd.DataFrame(
+            data={
+                f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 11, 8), dt.datetime(2020, 11, 11, 9),
+                                          dt.datetime(2020, 11, 12, 12), dt.datetime(2020, 11, 14, 12)],
+                f"{pdc.USER_LAST_NAME.value}": ["1", "1", "2", "1"],
+                f"{pdc.DAILY_DURATION_S.value}": [50, 60, 10, 20]
+            }
+        )
+        sheets = {t.tracker_id: t.sheet for t in create_patient_events_sheets(dailies)}
+        self.assertSequenceEqual(list(sheets["1"]["time_worn_s"]), [60, 0, 0])
+        self.assertSequenceEqual(list(sheets["2"]["time_worn_s"]), [0, 10, 0])
+        self.assertSequenceEqual(list(sheets["2"]["day"]),
+                                 [dt.date(2020, 11, 11), dt.date(2020, 11, 12), dt.date(2020, 11, 13)])
@@ -0,0 +1,95 @@
+import unittest
+import pandas as pd
+from ctxdashboard.data_store.patient_handler_cache import PatientHandlerCache
+from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler
+from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc
+from test_package.store_fixtures import create_store
+
+
+def create_meta(second_baseline_day: pd.Timestamp) -> pd.DataFrame:
+    return pd.DataFrame(
+        data={
+            f"{pmc.TRACKER_ID.value}": [1, 2],
+            f"{pmc.DATE_BL.value}": [pd.Timestamp(2020, 11, 1), second_baseline_day]
+        }
+    )
+
+
+def create_handler(tracker_id) -> CTxPatientDailiesHandler:
+    return CTxPatientDailiesHandler(tracker_id, [], False)
+
+
+class PatientHandlerCacheTest(unittest.TestCase):
+    def test_get_or_create_hit(self):
+        cache = PatientHandlerCache()
+        store = create_store([10, 20])
+        first = cache.get_or_create(store, 1, (8, 6, 6), lambda: create_handler(1))
+        second = cache.get_or_create(store, 1, (8, 6, 6), lambda: create_handler(1))
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_get_or_create_other_criterion(self):
+        cache = PatientHandlerCache()
+        store = create_store([10, 20])
+        cache.get_or_create(store, 1, (8, 6, 6), lambda: create_handler(1))
+        cache.get_or_create(store, 1, (9, 6, 6), lambda: create_handler(1))
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_changed_tracker_is_not_served(self):
+        cache = PatientHandlerCache()
+        cache.get_or_create(create_store([10, 20]), 2, (8, 6, 6), lambda: create_handler(2))
+        cache.get_or_create(create_store([10, 30]), 2, (8, 6, 6), lambda: create_handler(2))
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_invalidate_changed_is_selective(self):
+        cache = PatientHandlerCache()
+        old_store = create_store([10, 20])
+        new_store = create_store([10, 30])
+        cache.get_or_create(old_store, 1, (8, 6, 6), lambda: create_handler(1))
+        cache.get_or_create(old_store, 2, (8, 6, 6), lambda: create_handler(2))
+        self.assertEqual(cache.invalidate_changed(old_store, new_store), 1)
+        self.assertEqual(len(cache), 1)
+        cache.get_or_create(new_store, 1, (8, 6, 6), lambda: create_handler(1))
+        self.assertEqual(cache.hits, 1)
+
+    def test_changed_baseline_day_is_not_served(self):
+        cache = PatientHandlerCache()
+        old_store = create_store([10, 20], patient_cofactors=create_meta(pd.Timestamp(2020, 11, 1)))
+        new_store = create_store([10, 20], patient_cofactors=create_meta(pd.Timestamp(2020, 11, 8)))
+        cache.get_or_create(old_store, 1, (8, 6, 6), lambda: create_handler(1))
+        cache.get_or_create(old_store, 2, (8, 6, 6), lambda: create_handler(2))
+        self.assertEqual(cache.invalidate_changed(old_store, new_store), 1)
+        cache.get_or_create(new_store, 1, (8, 6, 6), lambda: create_handler(1))
+        cache.get_or_create(new_store, 2, (8, 6, 6), lambda: create_handler(2))
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_max_entries(self):
+        cache = PatientHandlerCache(max_entries=1)
+        store = create_store([10, 20])
+        cache.get_or_create(store, 1, (8, 6, 6), lambda: create_handler(1))
+        cache.get_or_create(store, 2, (8, 6, 6), lambda: create_handler(2))
+        self.assertEqual(len(cache), 1)
+
+    def test_get_or_compute_window_acceptance(self):
+        cache = PatientHandlerCache()
+        store = create_store([10, 20])
+        computations = []
+
+        def compute_acceptance():
+            computations.append(1)
+            return {1: True, 2: False}
+
+        self.assertTrue(cache.get_or_compute_window_acceptance(store, 1, (8, 6, 6, "0-28"), compute_acceptance))
+        self.assertFalse(cache.get_or_compute_window_acceptance(store, 2, (8, 6, 6, "0-28"), compute_acceptance))
+        self.assertEqual(len(computations), 1)
+        cache.get_or_compute_window_acceptance(store, 1, (8, 6, 6, "0-56"), compute_acceptance)
+        self.assertEqual(len(computations), 2)
+
+    def test_window_acceptance_of_changed_tracker_is_invalidated(self):
+        cache = PatientHandlerCache()
+        old_store = create_store([10, 20])
+        new_store = create_store([10, 30])
+        cache.get_or_compute_window_acceptance(old_store, 1, (8, 6, 6, "0-28"), lambda: {1: True, 2: True})
+        cache.invalidate_changed(old_store, new_store)
+        self.assertTrue(cache.get_or_compute_window_acceptance(new_store, 1, (8, 6, 6, "0-28"), lambda: {}))
+        self.assertFalse(cache.get_or_compute_window_acceptance(new_store, 2, (8, 6, 6, "0-28"), lambda: {1: True, 2: False}))
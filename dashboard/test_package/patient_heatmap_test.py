@@ -1,9 +1,12 @@
 from typing import List
 import unittest
-from ctxdashboard.figures.patient_heatmap import PreparedAcceptanceHeatMap, PreparedHeatmap
+from ctxdashboard.figures.patient_heatmap import PreparedAcceptanceHeatMap, PreparedHeatmap, get_heatmap_signature, patch_acceptance_heatmap, patch_times_heatmap, render_acceptance_heatmap, render_times_heatmap
 from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler, CTxPatientDay
 import datetime as dt
 import numpy as np
+import pandas as pd
+from ctxdashboard.domain.patientmeta import PatientMetaColumn as pmc
+from test_package.store_fixtures import create_store
 
 FIRST_PAT_ID = "FIRST_PAT_ID"
 SECOND_PAT_ID = "SECOND_PAT_ID"
@@ -56,9 +59,15 @@ class PatientHeatmapTest(unittest.TestCase):
         prepared_heatmap: PreparedHeatmap = PreparedHeatmap.prepare_heatmap(
             dailies_handlers, 8)
         self.assertTrue(np.array_equal(
-            prepared_heatmap.hover_matrix, np.array([
-                ["Day 1: 24:00:00", "Day 2: 24:00:00"],
-                ["Day 1: 00:00:00", "Day 2: 00:00:00"]])))
+            prepared_heatmap.hover_hms_matrix, np.array([
+                [[24, 0, 0], [24, 0, 0]],
+                [[0, 0, 0], [0, 0, 0]]])))
+
+    def test_split_daily_seconds(self):
+        self.assertTrue(np.array_equal(
+            PreparedHeatmap.split_daily_seconds(
+                np.array([60 * 60 * 12 + 30 * 60 + 15, 12])),
+            np.array([[12, 30, 15], [0, 0, 12]])))
 
     def test_prepare_heatmap_y_ticks(self):
         prepared_heatmap: PreparedHeatmap = PreparedHeatmap.prepare_heatmap(
@@ -99,3 +108,40 @@ class PreparedAcceptanceHeatMapTest(unittest.TestCase):
                 [["FIRST_PAT_ID accepted"], ["SECOND_PAT_ID not accepted"]]
             )
         )
+
+
+def get_patch_values(patch) -> dict:
+    return {tuple(operation["location"]): operation["params"]["value"]
+            for operation in patch.to_plotly_json()["operations"]}
+
+
+class HeatmapPatchTest(unittest.TestCase):
+    def test_patch_times_heatmap(self):
+        self.assertEqual(
+            get_patch_values(patch_times_heatmap(dailies_handlers, 4)),
+            {("data", 0, "z"): render_times_heatmap(dailies_handlers, 4).to_plotly_json()["data"][0]["z"]})
+
+    def test_patch_acceptance_heatmap(self):
+        figure = render_acceptance_heatmap(dailies_handlers).to_plotly_json()
+        patch_values = get_patch_values(patch_acceptance_heatmap(dailies_handlers))
+        self.assertEqual(patch_values[("data", 0, "z")], figure["data"][0]["z"])
+        self.assertEqual(patch_values[("data", 0, "text")], figure["data"][0]["text"].tolist())
+
+    def test_heatmap_signature(self):
+        store = create_store([10, 20], [FIRST_PAT_ID, SECOND_PAT_ID])
+        signature = get_heatmap_signature(store, dailies_handlers)
+        self.assertEqual(signature, get_heatmap_signature(create_store([10, 20], [FIRST_PAT_ID, SECOND_PAT_ID]), dailies_handlers))
+        self.assertNotEqual(signature, get_heatmap_signature(store, dailies_handlers[::-1]))
+        self.assertNotEqual(signature, get_heatmap_signature(store, dailies_handlers[:1]))
+        # the dailies of the same patients changed with a new dataset version
+        self.assertNotEqual(signature, get_heatmap_signature(create_store([10, 30], [FIRST_PAT_ID, SECOND_PAT_ID]), dailies_handlers))
+        # the baseline day of a patient changed with a new dataset version
+        patient_cofactors = pd.DataFrame(
+            data={
+                f"{pmc.TRACKER_ID.value}": [FIRST_PAT_ID, SECOND_PAT_ID],
+                f"{pmc.DATE_BL.value}": [pd.NaT, pd.Timestamp(2020, 11, 1)]
+            }
+        )
+        self.assertNotEqual(
+            signature,
+            get_heatmap_signature(create_store([10, 20], [FIRST_PAT_ID, SECOND_PAT_ID], patient_cofactors), dailies_handlers))
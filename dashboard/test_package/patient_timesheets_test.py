@@ -0,0 +1,107 @@
+import os
+import tempfile
+import types
+import unittest
+import numpy as np
+import pandas as pd
+import openpyxl
+from ctxdashboard.domain.patient_events import PatientEventTypes
+from ctxdashboard.domain.patient_timesheets import RECIST_FORMULA, export_timesheets, get_timesheet_path, iter_cell_rows, read_timesheet
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+import datetime as dt
+
+
+class PatientTimesheetsTest(unittest.TestCase):
+    example_dailies = pd.DataFrame(
+        data={
+            f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 11, 12, 00), dt.datetime(2020, 11, 13, 12, 00)],
+            f"{pdc.USER_LAST_NAME.value}": [1, 2],
+            f"{pdc.DAILY_DURATION_S.value}": [50, 10]
+        }
+    )
+
+    def test_export_timesheets(self):
+        for max_workers in [1, 2]:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                results = export_timesheets(PatientTimesheetsTest.example_dailies, tmp_dir, max_workers=max_workers)
+                self.assertCountEqual([r.tracker_id for r in results], [1, 2])
+                self.assertTrue(all(r.seconds >= 0 for r in results))
+
+                sheet = pd.read_excel(get_timesheet_path(tmp_dir, 1), sheet_name="p1")
+                self.assertEqual(sheet.shape, (2, 15))
+                self.assertSequenceEqual(list(sheet["time_worn_s"]), [50, 0])
+                self.assertTrue(sheet[PatientEventTypes.RECIST.value].isna().all())
+
+    def test_iter_cell_rows(self):
+        sheet = pd.DataFrame({
+            "tracker_id": np.array([1, 2], dtype=np.int64),
+            "day": [dt.date(2020, 11, 11), dt.date(2020, 11, 12)],
+            "time_worn_s": [50.0, np.nan],
+            PatientEventTypes.RECIST.value: [None, "PR"]
+        })
+        rows = iter_cell_rows(sheet)
+        self.assertIsInstance(rows, types.GeneratorType)
+        rows = list(rows)
+        self.assertEqual(rows, [[1, dt.date(2020, 11, 11), 50.0, None], [2, dt.date(2020, 11, 12), None, "PR"]])
+        self.assertIs(type(rows[0][0]), int)
+
+    def test_export_timesheets_recist_validation(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_timesheets(PatientTimesheetsTest.example_dailies, tmp_dir, max_workers=1)
+            worksheet = openpyxl.load_workbook(get_timesheet_path(tmp_dir, 2))["p2"]
+            validations = worksheet.data_validations.dataValidation
+            self.assertEqual(len(validations), 1)
+            self.assertEqual(validations[0].formula1, RECIST_FORMULA)
+            recist_column = openpyxl.utils.get_column_letter(
+                list(worksheet.iter_rows(max_row=1, values_only=True))[0].index(PatientEventTypes.RECIST.value) + 1)
+            self.assertEqual(str(validations[0].sqref), f"{recist_column}1:{recist_column}3")
+
+    def test_export_timesheets_incremental(self):
+        # the last day is not part of the sheets, it stays with tracker 1 so tracker 2 is unchanged
+        dailies = pd.DataFrame({
+            f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 11, 12), dt.datetime(2020, 11, 12, 12), dt.datetime(2020, 11, 14, 12)],
+            f"{pdc.USER_LAST_NAME.value}": [1, 2, 1],
+            f"{pdc.DAILY_DURATION_S.value}": [50, 10, 20]
+        })
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_timesheets(dailies, tmp_dir, max_workers=1)
+            path = get_timesheet_path(tmp_dir, 1)
+            sheet = read_timesheet(path)
+            sheet.loc[0, PatientEventTypes.RECIST.value] = "PD"
+            sheet.loc[1, PatientEventTypes.DEATH.value] = 1
+            sheet["comment"] = ["first", None, None]
+            sheet.to_excel(path, index=False, sheet_name="p1")
+
+            new_dailies = pd.concat([dailies, pd.DataFrame({
+                f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 12, 12), dt.datetime(2020, 11, 16, 12)],
+                f"{pdc.USER_LAST_NAME.value}": [1, 1],
+                f"{pdc.DAILY_DURATION_S.value}": [30, 40]
+            })], ignore_index=True)
+            results = export_timesheets(new_dailies, tmp_dir, max_workers=1, incremental=True)
+            self.assertEqual([r.tracker_id for r in results], [1])
+
+            merged = read_timesheet(path)
+            self.assertSequenceEqual(list(merged["day"]), [dt.date(2020, 11, d) for d in [11, 12, 13, 14, 15]])
+            self.assertSequenceEqual(list(merged["time_worn_s"]), [50, 30, 0, 20, 0])
+            self.assertEqual(merged.loc[0, PatientEventTypes.RECIST.value], "PD")
+            self.assertEqual(merged.loc[1, PatientEventTypes.DEATH.value], 1)
+            self.assertEqual(merged.loc[0, "comment"], "first")
+            self.assertEqual(list(merged.columns[-1:]), ["comment"])
+
+            self.assertEqual(export_timesheets(new_dailies, tmp_dir, max_workers=1, incremental=True), [])
+
+    def test_export_timesheets_incremental_keeps_days_with_entries(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_timesheets(PatientTimesheetsTest.example_dailies, tmp_dir, max_workers=1)
+            path = get_timesheet_path(tmp_dir, 2)
+            sheet = read_timesheet(path)
+            sheet.loc[0, PatientEventTypes.HOPSPITALIZED.value] = 1
+            sheet.to_excel(path, index=False, sheet_name="p2")
+
+            new_dailies = PatientTimesheetsTest.example_dailies.assign(**{
+                f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 14, 12, 00), dt.datetime(2020, 11, 12, 12, 00)]})
+            export_timesheets(new_dailies, tmp_dir, max_workers=1, incremental=True)
+
+            merged = read_timesheet(path)
+            self.assertSequenceEqual(list(merged["day"]), [dt.date(2020, 11, d) for d in [11, 12, 13]])
+            self.assertSequenceEqual(list(merged[PatientEventTypes.HOPSPITALIZED.value].fillna(0)), [1, 0, 0])
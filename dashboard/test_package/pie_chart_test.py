@@ -0,0 +1,17 @@
+import unittest
+from ctxdashboard.figures.pie_chart import create_acceptance_pie_figure, get_acceptance_pie_values, patch_acceptance_pie_chart
+
+
+class PieChartTest(unittest.TestCase):
+    def test_get_acceptance_pie_values(self):
+        self.assertEqual(get_acceptance_pie_values([True, False, True], 5), [2, 1, 2])
+
+    def test_create_acceptance_pie_figure(self):
+        figure = create_acceptance_pie_figure([True, False], 4)
+        self.assertEqual(list(figure.data[0].values), [1, 1, 2])
+
+    def test_patch_acceptance_pie_chart(self):
+        operations = patch_acceptance_pie_chart([False, False], 3).to_plotly_json()["operations"]
+        self.assertEqual(len(operations), 1)
+        self.assertEqual(operations[0]["location"], ["data", 0, "values"])
+        self.assertEqual(operations[0]["params"]["value"], [0, 2, 1])
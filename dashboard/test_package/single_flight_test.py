@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+from ctxdashboard.util.single_flight import LatestRequests, SingleFlight, SupersededError, canonical_callback_key
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_calls_share_one_computation(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        n_computations = []
+
+        def compute(_checkpoint):
+            n_computations.append(1)
+            started.set()
+            release.wait()
+            return "outputs"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight.do("key", compute))) for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while single_flight.shared < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["outputs"] * 4)
+        self.assertEqual(len(n_computations), 1)
+        self.assertEqual(len(single_flight), 0)
+        # nothing is kept once the computation finished
+        self.assertEqual(single_flight.do("key", lambda _checkpoint: "new outputs"), "new outputs")
+
+    def test_errors_are_shared(self):
+        single_flight = SingleFlight()
+
+        def compute(_checkpoint):
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            single_flight.do("key", compute)
+        self.assertEqual(len(single_flight), 0)
+
+    def test_abandoned_once_all_callers_are_superseded(self):
+        single_flight = SingleFlight()
+        superseded = [False]
+        stages = []
+
+        def compute(checkpoint):
+            for stage in range(3):
+                checkpoint()
+                stages.append(stage)
+                superseded[0] = stage == 1
+            return "outputs"
+
+        with self.assertRaises(SupersededError):
+            single_flight.do("key", compute, lambda: superseded[0])
+        self.assertEqual(stages, [0, 1])
+        self.assertEqual(single_flight.abandoned, 1)
+        self.assertEqual(len(single_flight), 0)
+
+    def test_canonical_callback_key(self):
+        self.assertEqual(canonical_callback_key([8, ["b", "a"], [1, 20]]), canonical_callback_key([8, ["a", "b"], [1, 20]]))
+        self.assertNotEqual(canonical_callback_key([8, [20, 1]]), canonical_callback_key([8, [1, 20]]))
+
+
+class LatestRequestsTest(unittest.TestCase):
+    def test_superseded_by_later_request_of_session(self):
+        latest_requests = LatestRequests()
+        first = latest_requests.start("session")
+        other_session = latest_requests.start("other")
+        self.assertFalse(latest_requests.is_superseded(first))
+        second = latest_requests.start("session")
+        self.assertTrue(latest_requests.is_superseded(first))
+        self.assertFalse(latest_requests.is_superseded(second))
+        self.assertFalse(latest_requests.is_superseded(other_session))
+
+        # still superseded after the later request finished
+        latest_requests.finish(second)
+        self.assertTrue(latest_requests.drop_if_superseded(first))
+        self.assertEqual(latest_requests.superseded, 1)
+        latest_requests.finish(first)
+        latest_requests.finish(other_session)
+        self.assertEqual(len(latest_requests), 0)
+
+    def test_requests_without_session(self):
+        latest_requests = LatestRequests()
+        request = latest_requests.start(None)
+        latest_requests.start(None)
+        self.assertFalse(latest_requests.is_superseded(request))
+        latest_requests.finish(request)
+        self.assertEqual(len(latest_requests), 0)
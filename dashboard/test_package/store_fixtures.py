@@ -0,0 +1,22 @@
+from typing import Any, List, Optional
+import pandas as pd
+import datetime as dt
+from ctxdashboard.data_store.dashboard_data_store import DashboardDataStore
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+
+
+def create_store(durations: List[int],
+                 tracker_ids: Optional[List[Any]] = None,
+                 patient_cofactors: Optional[pd.DataFrame] = None) -> DashboardDataStore:
+    # one worn day per tracker, shared by the tests of everything keyed by the dailies of a tracker
+    tracker_ids = tracker_ids if tracker_ids is not None else [1, 2]
+    return DashboardDataStore.from_frames(
+        pd.DataFrame(
+            data={
+                f"{pdc.USER_LAST_NAME.value}": tracker_ids,
+                f"{pdc.START_DT.value}": [dt.datetime(2020, 11, 11)] * len(tracker_ids),
+                f"{pdc.END_DT.value}": [dt.datetime(2020, 11, 12)] * len(tracker_ids),
+                f"{pdc.DAILY_DURATION_S.value}": durations
+            }
+        ),
+        patient_cofactors if patient_cofactors is not None else pd.DataFrame())
@@ -0,0 +1,29 @@
+import base64
+import unittest
+import numpy as np
+from ctxdashboard.figures.typed_arrays import WEAR_FRACTION_LEVELS, encode_typed_array, quantize_wear_fractions
+
+
+class TypedArraysTest(unittest.TestCase):
+    def test_encode_typed_array_uint8(self):
+        encoded = encode_typed_array(np.array([[1, 2], [3, 4]], dtype=np.uint8))
+        self.assertEqual(encoded["dtype"], "u1")
+        self.assertEqual(encoded["shape"], "2, 2")
+        self.assertEqual(base64.b64decode(encoded["bdata"]), bytes([1, 2, 3, 4]))
+
+    def test_encode_typed_array_float32_round_trip(self):
+        array = np.array([0.5, 1.25, -3.0], dtype=np.float32)
+        encoded = encode_typed_array(array)
+        self.assertEqual(encoded["dtype"], "f4")
+        self.assertTrue(np.array_equal(
+            np.frombuffer(base64.b64decode(encoded["bdata"]), dtype="<f4"), array))
+
+    def test_encode_typed_array_unsupported_dtype(self):
+        with self.assertRaises(Exception):
+            encode_typed_array(np.array(["a", "b"]))
+
+    def test_quantize_wear_fractions(self):
+        quantized = quantize_wear_fractions(np.array([0, 0.5, 0.99999, 1]))
+        self.assertEqual(quantized.dtype, np.uint8)
+        self.assertSequenceEqual(
+            list(quantized), [0, 127, WEAR_FRACTION_LEVELS - 1, WEAR_FRACTION_LEVELS])
@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+from flask import Flask
+from ctxdashboard.util.warm_up import READY_PATH, WarmUp, register_readiness_endpoint
+
+
+class WarmUpTest(unittest.TestCase):
+    def test_run(self):
+        calls = []
+        warm_up = WarmUp([("first", lambda: calls.append("first")), ("second", lambda: calls.append("second"))])
+        self.assertFalse(warm_up.ready.is_set())
+        warm_up.run()
+        self.assertEqual(calls, ["first", "second"])
+        self.assertTrue(warm_up.ready.is_set())
+
+    def test_failing_task_is_skipped(self):
+        calls = []
+
+        def fail():
+            raise Exception("no data")
+        warm_up = WarmUp([("failing", fail), ("second", lambda: calls.append("second"))])
+        with self.assertLogs("WarmUp", level="ERROR"):
+            warm_up.run()
+        self.assertEqual(calls, ["second"])
+        self.assertTrue(warm_up.ready.is_set())
+
+    def test_ensure_started_runs_once(self):
+        calls = []
+        warm_up = WarmUp([("task", lambda: calls.append("task"))])
+        warm_up.ensure_started()
+        warm_up.ensure_started()
+        self.assertTrue(warm_up.ready.wait(10))
+        self.assertEqual(calls, ["task"])
+
+    def test_readiness_endpoint(self):
+        server = Flask(__name__)
+        warm_up = WarmUp([])
+        register_readiness_endpoint(server, warm_up)
+        client = server.test_client()
+        self.assertEqual(client.get(READY_PATH).status_code, 503)
+        warm_up.run()
+        self.assertEqual(client.get(READY_PATH).status_code, 200)
+
+    def test_ensure_started_after_run_in_parent(self):
+        calls = []
+        warm_up = WarmUp([("task", lambda: calls.append("task"))])
+        warm_up.run()
+        # e.g. a worker forked after the master warmed up
+        warm_up.ensure_started()
+        self.assertEqual(calls, ["task"])
+
+    def test_run_in_background_reruns_once(self):
+        calls = []
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def task():
+            calls.append("task")
+            started.set()
+            proceed.wait(10)
+        warm_up = WarmUp([("task", task)])
+        warm_up.run_in_background()
+        self.assertTrue(started.wait(10))
+        # requested while the first run is in progress, the two only run once more
+        warm_up.run_in_background()
+        warm_up.run_in_background()
+        proceed.set()
+        for _ in range(100):
+            if not warm_up._running_in_background:
+                break
+            time.sleep(0.05)
+        self.assertFalse(warm_up._running_in_background)
+        self.assertEqual(calls, ["task", "task"])
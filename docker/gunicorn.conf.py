@@ -0,0 +1,44 @@
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# The dashboard data is loaded once in the master process (preload_app) and is
+# memory-mapped read-only from the snapshot, so forked workers share its pages
+# instead of holding a copy each.
+bind = f":{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 2))
+timeout = 0
+preload_app = True
+
+# Every worker writes its metric values to files in this directory and /metrics adds
+# them up, whichever worker answers the scrape. It is set before the app is preloaded,
+# prometheus_client picks the multiprocess mode on import.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "ctx-prometheus"))
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir)
+
+
+def pre_fork(server, worker):
+    # Move all objects created while preloading and warming up into the permanent generation, so
+    # garbage collection in the workers does not touch (and copy) their pages.
+    gc.freeze()
+
+
+def when_ready(server):
+    # Runs in the master before the workers are forked, so the caches are filled once and
+    # every worker starts warm and answers /ready with 200. Workers are only forked afterwards.
+    from ctxdashboard.app import warm_up
+    from ctxdashboard.metrics.dashboard_metrics import synced_counts
+    warm_up.run()
+    # the handler cache misses of the warm-up are no requests, the workers only export their own
+    synced_counts.exclude_current()
+
+
+def child_exit(server, worker):
+    # the live gauges, e.g. the requests in flight, no longer count the exited worker
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
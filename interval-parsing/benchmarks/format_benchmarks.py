@@ -0,0 +1,88 @@
+"""
+Load time of the raw dailies per input format.
+
+Run from the interval-parsing directory:
+
+    python -m benchmarks.format_benchmarks --patients 20 200
+
+The same synthetic raw dailies are written in every supported format and read back with
+the raw dailies schema and with a projection onto the interval times, which is all a
+wear time analysis needs. Feather and parquet are skipped if pyarrow is not installed.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import List
+from ctxfitness.preprocessing_pipeline import RAW_DAILIES_SCHEMA, RAW_DATA_INTERVAL_END_TIME, RAW_DATA_INTERVAL_START_TIME
+from ctxfitness.source_schema import SourceSchema, load_source, write_source
+from ctxfitness.synthetic_dailies import SyntheticDailiesConfig, generate_dailies
+from benchmarks.pipeline_benchmarks import DEFAULT_REPEAT, measure
+
+FORMAT_EXTENSIONS = ["xlsx", "csv", "feather", "parquet"]
+
+INTERVAL_TIMES_SCHEMA = SourceSchema(
+    name="interval times",
+    columns=["User Id", RAW_DATA_INTERVAL_START_TIME, RAW_DATA_INTERVAL_END_TIME],
+    dtypes={"User Id": "str"},
+    timestamp_columns=[RAW_DATA_INTERVAL_START_TIME, RAW_DATA_INTERVAL_END_TIME])
+
+
+@dataclass
+class FormatResult:
+    extension: str
+    n_rows: int
+    file_bytes: int
+    write_seconds: float
+    read_seconds: float
+    projected_read_seconds: float
+
+
+def is_pyarrow_installed() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run_format_benchmarks(n_patients: int, repeat: int, tmp_dir: str) -> List[FormatResult]:
+    df_raw, _patient_meta = generate_dailies(SyntheticDailiesConfig(n_patients=n_patients, seed=0))
+    results: List[FormatResult] = []
+    for extension in FORMAT_EXTENSIONS:
+        if extension in ["feather", "parquet"] and not is_pyarrow_installed():
+            print(f"Skipping {extension}, pyarrow is not installed")
+            continue
+        path = os.path.join(tmp_dir, f"dailies-{n_patients}.{extension}")
+        write_seconds, _ = measure(lambda: write_source(df_raw, path), 1)
+        read_seconds, _ = measure(lambda: load_source(path, RAW_DAILIES_SCHEMA, parse_timestamps=False), repeat)
+        projected_read_seconds, _ = measure(lambda: load_source(path, INTERVAL_TIMES_SCHEMA), repeat)
+        result = FormatResult(extension, df_raw.shape[0], os.path.getsize(path),
+                              write_seconds, read_seconds, projected_read_seconds)
+        results.append(result)
+        print(f"{extension:<8} {result.n_rows:>9} rows {result.file_bytes / 2**20:9.2f}MiB "
+              f"write {write_seconds:8.3f}s read {read_seconds:8.3f}s projected read {projected_read_seconds:8.3f}s")
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Load time of the raw dailies per input format.")
+    parser.add_argument("--patients", type=int, nargs="+", default=[20])
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="path of the JSON file the results are written to")
+    args = parser.parse_args(argv)
+
+    results: List[FormatResult] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_patients in args.patients:
+            results.extend(run_format_benchmarks(n_patients, args.repeat, tmp_dir))
+    if args.output is not None:
+        with open(args.output, "w") as output:
+            json.dump({"results": [asdict(result) for result in results]}, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
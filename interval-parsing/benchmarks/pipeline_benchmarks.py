@@ -0,0 +1,260 @@
+"""
+Scaling benchmarks for the ctxfitness preprocessing pipeline.
+
+Run from the interval-parsing directory. Timings only compare on the same machine, so record
+the baseline on the reference commit before checking a change against it:
+
+    python -m benchmarks.pipeline_benchmarks --output baseline.json
+    python -m benchmarks.pipeline_benchmarks --output bench.json --baseline baseline.json
+
+Every benchmark is run on synthetic raw dailies for each combination of patients,
+days, intervals per day and overlap rate of the selected preset. The median time of
+several repetitions and the peak traced memory of one extra run are reported.
+"""
+import argparse
+import itertools
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import ctxfitness.interval_parser as ip
+from ctxfitness.column_aggregators import aggregate_dailies_fractions, column_aggregation_strategy
+from ctxfitness.preprocessing_pipeline import RAW_DAILIES_EXCEL_COLUMN_FILTER, PreprocessingPipeline
+from ctxfitness.synthetic_dailies import SyntheticDailiesConfig, generate_dailies
+
+BENCHMARK_PRESETS: Dict[str, Dict[str, List[Any]]] = {
+    "quick": {
+        "n_patients": [2],
+        "n_days": [14, 56],
+        "intervals_per_day": [1, 4],
+        "overlap_rate": [0.0, 0.2]
+    },
+    "full": {
+        "n_patients": [2, 8, 32],
+        "n_days": [28, 112, 365],
+        "intervals_per_day": [1, 4, 12],
+        "overlap_rate": [0.0, 0.1, 0.3]
+    }
+}
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+# slowdowns below this many seconds are timer and scheduler noise, not regressions
+DEFAULT_MIN_DELTA_SECONDS = 0.005
+DEFAULT_REPEAT = 9
+DEFAULT_CONFIRM_ROUNDS = 2
+
+
+@dataclass
+class BenchmarkParams:
+    n_patients: int
+    n_days: int
+    intervals_per_day: int
+    overlap_rate: float
+
+    def key(self) -> str:
+        return f"p{self.n_patients}-d{self.n_days}-i{self.intervals_per_day}-o{self.overlap_rate}"
+
+
+@dataclass
+class BenchmarkResult:
+    benchmark: str
+    params: BenchmarkParams
+    seconds: float
+    peak_memory_bytes: int
+
+    def key(self) -> str:
+        return f"{self.benchmark}[{self.params.key()}]"
+
+
+def create_raw_dailies(params: BenchmarkParams, seed: int = 0) -> pd.DataFrame:
+    """
+    Raw dailies with intervals_per_day wear intervals on every study day. A share of
+    overlap_rate intervals is stretched into the following interval.
+    """
+    config = SyntheticDailiesConfig(
+        n_patients=params.n_patients,
+        n_study_days=params.n_days,
+        p_stay_active=1.0,
+        p_become_active=1.0,
+        p_stay_active_spread=0.0,
+        intervals_per_active_day=params.intervals_per_day,
+        overlap_rate=params.overlap_rate,
+        multi_day_rate=0.0,
+        seed=seed)
+    df_raw, _patient_meta = generate_dailies(config)
+    return df_raw[RAW_DAILIES_EXCEL_COLUMN_FILTER]
+
+
+def measure_seconds(run: Callable[[], Any], repeat: int) -> float:
+    seconds: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds)
+
+
+def measure(run: Callable[[], Any], repeat: int) -> Tuple[float, int]:
+    seconds = measure_seconds(run, repeat)
+    tracemalloc.start()
+    try:
+        run()
+        _current, peak_memory_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_memory_bytes
+
+
+def first_patient_intervals(df_raw: pd.DataFrame) -> List[ip.Interval]:
+    df_patient = df_raw[df_raw["User Id"] == df_raw["User Id"].iloc[0]]
+    return [PreprocessingPipeline.interval_from_dailies_row(row) for _label, row in df_patient.iterrows()]
+
+
+def collect_daily_fractions(intervals: List[ip.Interval]) -> List[List[ip.IntervalFraction]]:
+    daily_fractions: List[List[ip.IntervalFraction]] = []
+
+    def collect(fractions: List[ip.IntervalFraction]) -> "pd.Series[Any]":
+        daily_fractions.append(fractions)
+        return pd.Series(dtype=object)
+
+    ip.IntervalNormalizer(intervals).normalize_by_day(collect)
+    return daily_fractions
+
+
+def create_benchmarks(df_raw: pd.DataFrame) -> Dict[str, Callable[[], Any]]:
+    # the per-day benchmarks work on the intervals of the first patient
+    intervals = first_patient_intervals(df_raw)
+    daily_fractions = collect_daily_fractions(intervals)
+    aggregator_inputs = [(
+        [fraction.interval.end - fraction.interval.start for fraction in fractions],
+        [fraction.fraction for fraction in fractions],
+        pd.concat([fraction.interval.data for fraction in fractions], axis=1).transpose()
+    ) for fractions in daily_fractions]
+
+    def aggregator_benchmark(column: str, aggregator: Callable) -> Callable[[], Any]:
+        return lambda: [aggregator(totals, fractions, df[column]) for totals, fractions, df in aggregator_inputs]
+
+    benchmarks: Dict[str, Callable[[], Any]] = {
+        "normalize_by_day": lambda: ip.IntervalNormalizer(intervals).normalize_by_day(lambda fractions: pd.Series(dtype=object)),
+        "aggregate_dailies_fractions": lambda: [aggregate_dailies_fractions(fractions) for fractions in daily_fractions],
+        "run_pipeline": lambda: PreprocessingPipeline.run_pipeline_on_frame(df_raw)
+    }
+    for column, aggregator in column_aggregation_strategy.items():
+        benchmarks[f"column_aggregator[{column}]"] = aggregator_benchmark(column, aggregator)
+    return benchmarks
+
+
+def run_benchmarks(preset: str, repeat: int) -> List[BenchmarkResult]:
+    results: List[BenchmarkResult] = []
+    grid = BENCHMARK_PRESETS[preset]
+    for values in itertools.product(*grid.values()):
+        params = BenchmarkParams(**dict(zip(grid.keys(), values)))
+        df_raw = create_raw_dailies(params)
+        for benchmark, run in create_benchmarks(df_raw).items():
+            seconds, peak_memory_bytes = measure(run, repeat)
+            results.append(BenchmarkResult(benchmark, params, seconds, peak_memory_bytes))
+            print(f"{benchmark:<60} {params.key():<24} {seconds:10.4f}s {peak_memory_bytes / 2**20:10.2f}MiB")
+    return results
+
+
+def get_environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "node": platform.node()
+    }
+
+
+def get_baseline_seconds(baseline: Dict[str, Any]) -> Dict[str, float]:
+    return {f"{entry['benchmark']}[{BenchmarkParams(**entry['params']).key()}]": entry["seconds"]
+            for entry in baseline["results"]}
+
+
+def is_regression(seconds: float, baseline_seconds: float, threshold: float, min_delta_seconds: float) -> bool:
+    # sub-millisecond benchmarks swing by more than the threshold, so both limits have to be exceeded
+    return seconds > baseline_seconds * (1 + threshold) and seconds - baseline_seconds > min_delta_seconds
+
+
+def remeasure_regressions(results: List[BenchmarkResult], baseline: Dict[str, Any], threshold: float,
+                          min_delta_seconds: float, repeat: int, rounds: int) -> List[BenchmarkResult]:
+    """
+    Measures the results that regress up to rounds more times and keeps the fastest median,
+    so a slow phase of the machine during the first measurement is not reported.
+    """
+    baseline_seconds = get_baseline_seconds(baseline)
+    remeasured: List[BenchmarkResult] = []
+    for result in results:
+        for _ in range(rounds):
+            if result.key() not in baseline_seconds or not is_regression(
+                    result.seconds, baseline_seconds[result.key()], threshold, min_delta_seconds):
+                break
+            run = create_benchmarks(create_raw_dailies(result.params))[result.benchmark]
+            result = replace(result, seconds=min(result.seconds, measure_seconds(run, repeat)))
+        remeasured.append(result)
+    return remeasured
+
+
+def compare_to_baseline(results: List[BenchmarkResult], baseline: Dict[str, Any], threshold: float,
+                        min_delta_seconds: float = DEFAULT_MIN_DELTA_SECONDS) -> List[str]:
+    baseline_seconds = get_baseline_seconds(baseline)
+    regressions: List[str] = []
+    for result in results:
+        if result.key() not in baseline_seconds:
+            continue
+        if is_regression(result.seconds, baseline_seconds[result.key()], threshold, min_delta_seconds):
+            ratio = result.seconds / max(baseline_seconds[result.key()], 1e-9)
+            regressions.append(
+                f"{result.key()}: {result.seconds:.4f}s vs. baseline {baseline_seconds[result.key()]:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for the ctxfitness pipeline.")
+    parser.add_argument("--preset", choices=BENCHMARK_PRESETS.keys(), default="quick")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="path of the JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA_SECONDS,
+                        help="absolute slowdown in seconds below which no regression is reported")
+    parser.add_argument("--confirm", type=int, default=DEFAULT_CONFIRM_ROUNDS,
+                        help="number of times a regression is measured again before it is reported")
+    args = parser.parse_args(argv)
+
+    # overlapping intervals are logged as errors by the IntervalNormalizer
+    logging.getLogger("IntervalNormalizer").setLevel(logging.CRITICAL)
+    results = run_benchmarks(args.preset, args.repeat)
+    report = {
+        "environment": get_environment(),
+        "preset": args.preset,
+        "results": [asdict(result) for result in results]
+    }
+    if args.output is not None:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("environment") != report["environment"]:
+            print(f"WARNING the baseline was recorded in another environment: {baseline.get('environment')}")
+        results = remeasure_regressions(results, baseline, args.threshold, args.min_delta, args.repeat, args.confirm)
+        regressions = compare_to_baseline(results, baseline, args.threshold, args.min_delta)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
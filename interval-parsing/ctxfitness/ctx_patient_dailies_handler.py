@@ -1,15 +1,15 @@
-from dataclasses import dataclass
 import datetime as dt
-from typing import Callable, List
-from ctxfitness.time_utils import gen_days_in_interval
+from typing import Any, Callable, Iterator, List, Sequence, Union
+import numpy as np
 import pandas as pd
-from pyxtension.streams import stream
 from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
 
 SECONDS_IN_A_DAY = 60 * 60 * 24
 
 
 class CTxPatientDay:
+    __slots__ = ("day_date", "duration_s", "accepted", "formatted_duration")
+
     ZERO_TIME_STRING = "00:00:00"
 
     def __init__(self, day_date: dt.date,
@@ -53,11 +53,79 @@ class CTxPatientDay:
             return False
 
 
+class CTxPatientDays(Sequence[CTxPatientDay]):
+    """
+    The days of a patient as columns. Behaves like a list of CTxPatientDay,
+    the day objects are only created when they are accessed.
+    """
+    __slots__ = ("day_dates", "durations_s", "accepted", "_formatted_durations")
+
+    def __init__(self,
+                 day_dates: np.ndarray,
+                 durations_s: np.ndarray,
+                 accepted: np.ndarray,
+                 formatted_durations: Union[List[str], None] = None) -> None:
+        self.day_dates = day_dates
+        self.durations_s = durations_s
+        self.accepted = accepted
+        # only kept if given, otherwise formatted from the durations on demand
+        self._formatted_durations = formatted_durations
+
+    @classmethod
+    def from_days(cls, patient_days: Sequence[CTxPatientDay]) -> "CTxPatientDays":
+        if isinstance(patient_days, CTxPatientDays):
+            return patient_days
+        return cls(
+            np.array([d.day_date for d in patient_days], dtype="datetime64[D]"),
+            np.array([d.duration_s for d in patient_days], dtype=np.int64),
+            np.array([d.accepted for d in patient_days], dtype=bool),
+            [d.formatted_duration for d in patient_days])
+
+    def get_formatted_durations(self) -> List[str]:
+        if self._formatted_durations is not None:
+            return list(self._formatted_durations)
+        return [CTxPatientDay.format_daily_seconds(duration_s) for duration_s in self.durations_s.tolist()]
+
+    def __len__(self) -> int:
+        return len(self.durations_s)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return CTxPatientDays(self.day_dates[index],
+                                  self.durations_s[index],
+                                  self.accepted[index],
+                                  None if self._formatted_durations is None else self._formatted_durations[index])
+        duration_s = int(self.durations_s[index])
+        return CTxPatientDay(
+            self.day_dates[index].item(),
+            duration_s,
+            bool(self.accepted[index]),
+            CTxPatientDay.format_daily_seconds(duration_s)
+            if self._formatted_durations is None else self._formatted_durations[index])
+
+    def __iter__(self) -> Iterator[CTxPatientDay]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, __o: object) -> bool:
+        if isinstance(__o, list):
+            __o = CTxPatientDays.from_days(__o)
+        if isinstance(__o, CTxPatientDays):
+            return (
+                np.array_equal(self.day_dates, __o.day_dates) and
+                np.array_equal(self.durations_s, __o.durations_s) and
+                np.array_equal(self.accepted, __o.accepted) and
+                self.get_formatted_durations() == __o.get_formatted_durations()
+            )
+        return False
+
+
 class CTxPatientDailiesHandler():
+    __slots__ = ("patient_id", "patient_days", "accepted")
 
-    def __init__(self, patient_id: str, patient_days: List[CTxPatientDay], accepted: bool) -> None:
+    def __init__(self, patient_id: str, patient_days: Sequence[CTxPatientDay], accepted: bool) -> None:
         self.patient_id = patient_id
-        self.patient_days = patient_days
+        self.patient_days = CTxPatientDays.from_days(patient_days)
         self.accepted = accepted
 
     @classmethod
@@ -66,34 +134,41 @@ class CTxPatientDailiesHandler():
         patient_id: str,
         df: pd.DataFrame,
         daily_criterion: Callable[[dt.date, int], bool],
-        patient_acceptance_criterion: Callable[[List[CTxPatientDay]], bool]
+        patient_acceptance_criterion: Callable[[Sequence[CTxPatientDay]], bool]
     ):
-        start_date = df[pdc.START_DT].min().to_pydatetime().date()
-        end_date = df[pdc.END_DT].max().to_pydatetime().date()
-        existing_durations = dict([
-            (r[pdc.START_DT].to_pydatetime().date(), r[pdc.DAILY_DURATION_S]) for l, r in df.iterrows()
-        ])
-        patient_days: List[CTxPatientDay] = []
-        for day in gen_days_in_interval(start_date, end_date):
-            duration: float = 0 if day not in existing_durations else existing_durations[day]
-            patient_days.append(CTxPatientDay.create_patient_day(
-                day_date=day,
-                duration_s=int(duration),
-                daily_criterion=daily_criterion
-            ))
+        start_date = df[pdc.START_DT].min().normalize()
+        end_date = df[pdc.END_DT].max().normalize()
+        # every day from the first start up to, but excluding, the last end day
+        n_days = max((end_date - start_date).days, 0)
+        day_indices = (df[pdc.START_DT].dt.normalize() - start_date).dt.days.to_numpy()
+        durations = np.asarray(df[pdc.DAILY_DURATION_S], dtype=np.float64)
+
+        # the last entry of a day wins, days without an entry were not worn
+        reversed_unique, reversed_first = np.unique(day_indices[::-1], return_index=True)
+        last_entries = len(day_indices) - 1 - reversed_first
+        in_range = reversed_unique < n_days
+        day_durations = durations[last_entries[in_range]]
+        if np.isnan(day_durations).any():
+            raise Exception(f"The dailies of patient '{patient_id}' have worn days without a duration!")
+        durations_s = np.zeros(n_days, dtype=np.int64)
+        durations_s[reversed_unique[in_range]] = day_durations.astype(np.int64)
+
+        day_dates = np.datetime64(start_date.date(), "D") + np.arange(n_days)
+        patient_days = CTxPatientDays(day_dates, durations_s, accept_days(daily_criterion, day_dates, durations_s))
         return cls(patient_id, patient_days, patient_acceptance_criterion(patient_days))
 
+    # the getters return lists like before the days were stored as columns, the arrays are in patient_days
     def get_days(self) -> List[dt.date]:
-        return [d.day_date for d in self.patient_days]
+        return self.patient_days.day_dates.tolist()
 
     def get_durations(self) -> List[int]:
-        return [d.duration_s for d in self.patient_days]
+        return self.patient_days.durations_s.tolist()
 
     def get_accepted(self) -> List[bool]:
-        return [d.accepted for d in self.patient_days]
+        return self.patient_days.accepted.tolist()
 
     def get_formatted_durations(self) -> List[str]:
-        return [d.formatted_duration for d in self.patient_days]
+        return self.patient_days.get_formatted_durations()
 
     def __eq__(self, __o: object) -> bool:
         if isinstance(__o, CTxPatientDailiesHandler):
@@ -103,45 +178,57 @@ class CTxPatientDailiesHandler():
         return False
 
     def get_sum_accepted_days(self) -> int:
-        return sum(self.get_accepted())
+        return int(np.count_nonzero(self.patient_days.accepted))
 
 
 N_SECS_HOUR = 60 * 60
 
 
-def simple_min_hours_daily_acceptance_criterion(min_hours: int) -> Callable[[dt.date, int], bool]:
-    def accept_day(_day: dt.date, sec: int) -> bool:
-        return sec >= min_hours * N_SECS_HOUR
+class MinHoursDailyCriterion:
+    __slots__ = ("min_hours",)
+
+    def __init__(self, min_hours: int) -> None:
+        self.min_hours = min_hours
+
+    def __call__(self, _day: dt.date, sec: int) -> bool:
+        return sec >= self.min_hours * N_SECS_HOUR
+
+    def accept_days(self, _day_dates: np.ndarray, durations_s: np.ndarray) -> np.ndarray:
+        return durations_s >= self.min_hours * N_SECS_HOUR
 
-    return accept_day
+
+def accept_days(daily_criterion: Callable[[dt.date, int], bool], day_dates: np.ndarray, durations_s: np.ndarray) -> np.ndarray:
+    # criteria with an accept_days method judge all days at once, others day by day
+    if hasattr(daily_criterion, "accept_days"):
+        return np.asarray(daily_criterion.accept_days(day_dates, durations_s), dtype=bool)  # type: ignore
+    return np.array([daily_criterion(day, duration_s)
+                     for day, duration_s in zip(day_dates.tolist(), durations_s.tolist())], dtype=bool)
+
+
+def get_max_consecutive_days(accepted: np.ndarray) -> int:
+    if not accepted.any():
+        return 0
+    padded = np.concatenate([[False], accepted, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def simple_min_hours_daily_acceptance_criterion(min_hours: int) -> Callable[[dt.date, int], bool]:
+    return MinHoursDailyCriterion(min_hours)
 
 
-def simple_min_days_patient_acceptance_criterion(min_days: int) -> Callable[[List[CTxPatientDay]], bool]:
-    def accept_patient(days: List[CTxPatientDay]) -> bool:
-        return len(stream(days)  # type: ignore
-                   .filter(lambda day: day.accepted)
-                   .toList()) >= min_days
+def simple_min_days_patient_acceptance_criterion(min_days: int) -> Callable[[Sequence[CTxPatientDay]], bool]:
+    def accept_patient(days: Sequence[CTxPatientDay]) -> bool:
+        return int(np.count_nonzero(CTxPatientDays.from_days(days).accepted)) >= min_days
 
     return accept_patient
 
 
-def minimum_overall_and_consecutive_days_patient_acceptance_criterion(min_days: int, min_consecutive_days: int) -> Callable[[List[CTxPatientDay]], bool]:
-    def accept_patient(days: List[CTxPatientDay]) -> bool:
-        min_days_criterion = len(stream(days)  # type: ignore
-                                 .filter(lambda day: day.accepted)
-                                 .toList()) >= min_days
-
-        sequences = []
-        prev = None
-        for day in days:
-            if day.accepted:
-                if prev is None or prev.accepted is False:
-                    sequences.append(1)
-                else:
-                    sequences[-1] = sequences[-1] + 1
-            prev = day
-        consecutive_days_criterion = len(sequences) > 0 and max(
-            sequences) >= min_consecutive_days
-        return min_days_criterion and consecutive_days_criterion
+def minimum_overall_and_consecutive_days_patient_acceptance_criterion(min_days: int, min_consecutive_days: int) -> Callable[[Sequence[CTxPatientDay]], bool]:
+    def accept_patient(days: Sequence[CTxPatientDay]) -> bool:
+        accepted = CTxPatientDays.from_days(days).accepted
+        min_days_criterion = int(np.count_nonzero(accepted)) >= min_days
+        consecutive_days_criterion = accepted.any() and get_max_consecutive_days(accepted) >= min_consecutive_days
+        return bool(min_days_criterion and consecutive_days_criterion)
 
     return accept_patient
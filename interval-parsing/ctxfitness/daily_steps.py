@@ -1,13 +1,17 @@
 import pandas as pd
+from ctxfitness.source_schema import SourceSchema, load_source
+
+DAILY_STEPS_SCHEMA = SourceSchema(
+    name="daily steps",
+    excluded_columns=[
+        "User First Name",
+        "User Last Name",
+        "User Email",
+        "Team Names",
+        "Group Names"
+    ],
+    dtypes={"User Id": "str"})
 
 
 def load_and_process_daily_steps(path: str) -> pd.DataFrame:
-    df = pd.read_excel(path)
-    return (
-        df
-        .drop("User First Name", axis=1)
-        .drop("User Last Name", axis=1)
-        .drop("User Email", axis=1)
-        .drop("Team Names", axis=1)
-        .drop("Group Names", axis=1)
-    )
+    return load_source(path, DAILY_STEPS_SCHEMA)
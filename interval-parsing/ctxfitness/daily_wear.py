@@ -0,0 +1,294 @@
+from typing import Any, Tuple, Union
+import numpy as np
+import pandas as pd
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+
+N_SECS_HOUR = 60 * 60
+
+EVENT_WINDOW_PATIENT = "Patient"
+EVENT_WINDOW_DAY = "Day"
+EVENT_WINDOW_PRE_WEAR_S = "Pre wear (s)"
+EVENT_WINDOW_PRE_MEAN_WEAR_S = "Pre mean wear (s)"
+EVENT_WINDOW_PRE_ACCEPTED_DAYS = "Pre accepted days"
+EVENT_WINDOW_PRE_OBSERVED_DAYS = "Pre observed days"
+EVENT_WINDOW_POST_WEAR_S = "Post wear (s)"
+EVENT_WINDOW_POST_MEAN_WEAR_S = "Post mean wear (s)"
+EVENT_WINDOW_POST_ACCEPTED_DAYS = "Post accepted days"
+EVENT_WINDOW_POST_OBSERVED_DAYS = "Post observed days"
+
+WINDOW_PATIENT = "Patient"
+WINDOW_BASELINE_DAY = "Baseline day"
+WINDOW_WEAR_S = "Window wear (s)"
+WINDOW_ACCEPTED_DAYS = "Window accepted days"
+WINDOW_MAX_CONSECUTIVE_DAYS = "Window max consecutive days"
+WINDOW_ACCEPTED = "Window accepted"
+
+EARLIEST_WINDOW_PATIENT = "Patient"
+EARLIEST_WINDOW_START = "First qualifying window start"
+EARLIEST_WINDOW_END = "First qualifying window end"
+EARLIEST_CONSECUTIVE_START = "First consecutive run start"
+EARLIEST_CONSECUTIVE_END = "First consecutive run end"
+
+
+def to_day_numbers(days: Any) -> np.ndarray:
+    return np.asarray(days, dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+
+
+class DailyWear:
+    """
+    Daily wear seconds and accepted days of all patients, one entry per day from the first
+    to the last worn day of a patient (days without dailies are 0). The days of the patient
+    at position i are the slice offsets[i]:offsets[i+1] of the flat arrays.
+
+    The cumulative arrays start with 0, so the sum over the flat positions [a, b) is
+    cumulative[b] - cumulative[a] and every window query costs constant time.
+    """
+
+    def __init__(self,
+                 patient_ids: np.ndarray,
+                 offsets: np.ndarray,
+                 first_days: np.ndarray,
+                 wear_s: np.ndarray,
+                 accepted: np.ndarray) -> None:
+        self.patient_ids = patient_ids
+        self.offsets = offsets
+        self.first_days = first_days
+        self.wear_s = wear_s
+        self.accepted = accepted
+        self.cumulative_wear_s = np.concatenate([[0], np.cumsum(wear_s, dtype=np.float64)])
+        self.cumulative_accepted = np.concatenate([[0], np.cumsum(accepted, dtype=np.int64)])
+        self._forward_runs: Union[np.ndarray, None] = None
+        self._run_length_table: Union[np.ndarray, None] = None
+
+    @classmethod
+    def from_arrays(cls,
+                    patient_ids: np.ndarray,
+                    days: np.ndarray,
+                    durations_s: np.ndarray,
+                    min_hours_per_day: float) -> "DailyWear":
+        """
+        Builds the daily arrays from one entry per patient and day, a day is accepted
+        if it is worn at least min_hours_per_day.
+        """
+        codes, unique_ids = pd.factorize(np.asarray(patient_ids), sort=True)
+        day_numbers = to_day_numbers(days)
+        n_patients = len(unique_ids)
+        first_days = np.full(n_patients, np.iinfo(np.int64).max, dtype=np.int64)
+        last_days = np.full(n_patients, np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(first_days, codes, day_numbers)
+        np.maximum.at(last_days, codes, day_numbers)
+        offsets = np.concatenate([[0], np.cumsum(last_days - first_days + 1)]).astype(np.int64)
+
+        positions = offsets[codes] + day_numbers - first_days[codes]
+        wear_s = np.bincount(positions, weights=np.asarray(durations_s, dtype=np.float64), minlength=offsets[-1])
+        return cls(np.asarray(unique_ids), offsets, first_days, wear_s, wear_s >= min_hours_per_day * N_SECS_HOUR)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, min_hours_per_day: float) -> "DailyWear":
+        return cls.from_arrays(df[pdc.USER_LAST_NAME].to_numpy(),
+                               df[pdc.START_DT].to_numpy(),
+                               df[pdc.DAILY_DURATION_S].to_numpy(),
+                               min_hours_per_day)
+
+    def get_n_days(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def find_patients(self, patient_ids: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the positions of the patients and whether each of them was found.
+        """
+        patient_ids = np.asarray(patient_ids)
+        if len(self.patient_ids) == 0:
+            raise Exception("There are no dailies to look up patients in!")
+        positions = np.searchsorted(self.patient_ids, patient_ids)
+        clipped = np.minimum(positions, len(self.patient_ids) - 1)
+        return clipped, (positions < len(self.patient_ids)) & (self.patient_ids[clipped] == patient_ids)
+
+    def window_bounds(self,
+                      positions: np.ndarray,
+                      starts: np.ndarray,
+                      ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Flat positions [lower, upper) of the windows [start, end) of day numbers, for the patients
+        at the given positions. Window parts outside the observed days of a patient are cut off.
+        """
+        n_days = self.get_n_days()[positions]
+        local_starts = np.clip(starts - self.first_days[positions], 0, n_days)
+        local_ends = np.clip(ends - self.first_days[positions], local_starts, n_days)
+        return self.offsets[positions] + local_starts, self.offsets[positions] + local_ends
+
+    def window_sums(self,
+                    positions: np.ndarray,
+                    starts: np.ndarray,
+                    ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Wear seconds, accepted days and observed days in the windows [start, end) of day numbers.
+        """
+        lower, upper = self.window_bounds(positions, starts, ends)
+        return (self.cumulative_wear_s[upper] - self.cumulative_wear_s[lower],
+                self.cumulative_accepted[upper] - self.cumulative_accepted[lower],
+                upper - lower)
+
+    def _build_run_tables(self) -> None:
+        # runs of accepted days are cut at patient boundaries, every patient has at least one day
+        n = len(self.accepted)
+        indices = np.arange(n)
+        previous_breaks = np.where(self.accepted, -1, indices)
+        previous_breaks[self.offsets[:-1]] = np.maximum(previous_breaks[self.offsets[:-1]], self.offsets[:-1] - 1)
+        run_ends = indices - np.maximum.accumulate(previous_breaks)
+        next_breaks = np.where(self.accepted, n, indices)
+        next_breaks[self.offsets[1:] - 1] = np.minimum(next_breaks[self.offsets[1:] - 1], self.offsets[1:])
+        self._forward_runs = np.append(np.minimum.accumulate(next_breaks[::-1])[::-1] - indices, 0)
+
+        # sparse table of the run lengths ending at each position, row k holds the maximum of
+        # the 2^k positions from each position on
+        n_levels = int(np.log2(max(self.get_n_days().max(initial=1), 1))) + 1
+        table = np.zeros((n_levels, n + 1), dtype=np.int32)
+        table[0, :n] = run_ends
+        for level in range(1, n_levels):
+            width = 1 << (level - 1)
+            table[level, :n + 1 - width] = np.maximum(table[level - 1, :n + 1 - width], table[level - 1, width:])
+        self._run_length_table = table
+
+    def get_run_length_table(self) -> np.ndarray:
+        if self._run_length_table is None:
+            self._build_run_tables()
+        return self._run_length_table
+
+    def get_run_lengths(self) -> np.ndarray:
+        """
+        Number of consecutive accepted days ending at every flat position.
+        """
+        return self.get_run_length_table()[0, :len(self.accepted)]
+
+    def first_positions(self, qualifies: np.ndarray) -> np.ndarray:
+        """
+        First flat position of every patient where qualifies holds, -1 if there is none.
+        """
+        qualifying = np.flatnonzero(qualifies)
+        patients = np.searchsorted(self.offsets, qualifying, side="right") - 1
+        first = np.full(len(self.patient_ids), -1, dtype=np.int64)
+        # qualifying positions are sorted, so the first one per patient is where the patient changes
+        is_first = np.concatenate([[True], patients[1:] != patients[:-1]]) if len(patients) > 0 else np.zeros(0, dtype=bool)
+        first[patients[is_first]] = qualifying[is_first]
+        return first
+
+    def max_consecutive_accepted(self, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+        """
+        Longest run of accepted days within the flat positions [lower, upper) of single patients.
+        The run the window starts in is cut at the window start, all later runs start inside the
+        window and their run ends are looked up in the sparse table in constant time.
+        """
+        table, forward_runs = self.get_run_length_table(), self._forward_runs
+        lengths = upper - lower
+        first_run = np.minimum(forward_runs[lower], lengths)
+        rest_lower = lower + first_run
+        rest_lengths = upper - rest_lower
+        levels = np.floor(np.log2(np.maximum(rest_lengths, 1))).astype(np.int64)
+        rest_max = np.maximum(table[levels, rest_lower], table[levels, np.maximum(upper - (1 << levels), 0)])
+        return np.maximum(first_run, np.where(rest_lengths > 0, rest_max, 0))
+
+
+def event_aligned_windows(daily_wear: DailyWear,
+                          patient_ids: Any,
+                          days: Any,
+                          days_before: int = 7,
+                          days_after: int = 7) -> pd.DataFrame:
+    """
+    Wear statistics of the days_before days before and the days_after days from each event day on,
+    for all events at once. The mean is taken over the observed days of the window, events of
+    unknown patients get NaN.
+    """
+    patient_ids = np.asarray(patient_ids)
+    day_numbers = to_day_numbers(days)
+    positions, found = daily_wear.find_patients(patient_ids)
+
+    df = pd.DataFrame({
+        EVENT_WINDOW_PATIENT: patient_ids,
+        EVENT_WINDOW_DAY: day_numbers.astype("datetime64[D]").astype("datetime64[ns]")
+    })
+    windows = [
+        (EVENT_WINDOW_PRE_WEAR_S, EVENT_WINDOW_PRE_MEAN_WEAR_S, EVENT_WINDOW_PRE_ACCEPTED_DAYS,
+         EVENT_WINDOW_PRE_OBSERVED_DAYS, day_numbers - days_before, day_numbers),
+        (EVENT_WINDOW_POST_WEAR_S, EVENT_WINDOW_POST_MEAN_WEAR_S, EVENT_WINDOW_POST_ACCEPTED_DAYS,
+         EVENT_WINDOW_POST_OBSERVED_DAYS, day_numbers, day_numbers + days_after)
+    ]
+    for wear_column, mean_column, accepted_column, observed_column, starts, ends in windows:
+        wear_s, accepted_days, observed_days = daily_wear.window_sums(positions, starts, ends)
+        df[wear_column] = np.where(found, wear_s, np.nan)
+        df[mean_column] = np.where(found & (observed_days > 0), wear_s / np.maximum(observed_days, 1), np.nan)
+        df[accepted_column] = np.where(found, accepted_days, np.nan)
+        df[observed_column] = np.where(found, observed_days, np.nan)
+    return df
+
+
+def baseline_window_acceptance(daily_wear: DailyWear,
+                               patient_ids: Any,
+                               baseline_days: Any,
+                               window_days: Tuple[int, int],
+                               min_days: int,
+                               min_consecutive_days: int) -> pd.DataFrame:
+    """
+    Acceptance within the days window_days[0] to window_days[1] (both included) relative to the
+    baseline of each patient. Patients without a baseline day (NaT) are anchored at their first
+    worn day. A patient is accepted with at least min_days accepted days and a run of at least
+    min_consecutive_days accepted days in the window.
+    """
+    patient_ids = np.asarray(patient_ids)
+    positions, found = daily_wear.find_patients(patient_ids)
+    baselines = pd.to_datetime(pd.Series(np.asarray(baseline_days, dtype=object)))
+    baseline_numbers = np.where(baselines.isna(),
+                                daily_wear.first_days[positions],
+                                to_day_numbers(baselines.fillna(pd.Timestamp(0))))
+
+    lower, upper = daily_wear.window_bounds(positions,
+                                            baseline_numbers + window_days[0],
+                                            baseline_numbers + window_days[1] + 1)
+    wear_s = daily_wear.cumulative_wear_s[upper] - daily_wear.cumulative_wear_s[lower]
+    accepted_days = daily_wear.cumulative_accepted[upper] - daily_wear.cumulative_accepted[lower]
+    max_consecutive_days = daily_wear.max_consecutive_accepted(lower, upper)
+    return pd.DataFrame({
+        WINDOW_PATIENT: patient_ids,
+        WINDOW_BASELINE_DAY: pd.to_datetime(baseline_numbers.astype("datetime64[D]")).where(found),
+        WINDOW_WEAR_S: np.where(found, wear_s, 0),
+        WINDOW_ACCEPTED_DAYS: np.where(found, accepted_days, 0),
+        WINDOW_MAX_CONSECUTIVE_DAYS: np.where(found, max_consecutive_days, 0),
+        WINDOW_ACCEPTED: found & (accepted_days >= min_days) & (max_consecutive_days >= min_consecutive_days)
+    })
+
+
+def earliest_qualifying_windows(daily_wear: DailyWear,
+                                min_days: int,
+                                window_length: int,
+                                min_consecutive_days: int) -> pd.DataFrame:
+    """
+    For every patient, the first window of window_length days holding at least min_days accepted
+    days and the first run of min_consecutive_days accepted days, NaT if there is none. A window
+    is reported when it is completed, so its end is the day the criterion was first met. One pass
+    over all days of all patients.
+    """
+    n = len(daily_wear.accepted)
+    positions = np.arange(n)
+    patient_starts = np.repeat(daily_wear.offsets[:-1], daily_wear.get_n_days())
+    window_starts = np.maximum(positions + 1 - window_length, patient_starts)
+    accepted_in_window = daily_wear.cumulative_accepted[positions + 1] - daily_wear.cumulative_accepted[window_starts]
+
+    window_ends = daily_wear.first_positions(accepted_in_window >= max(min_days, 1))
+    run_ends = daily_wear.first_positions(daily_wear.get_run_lengths() >= max(min_consecutive_days, 1))
+
+    def to_days(flat_positions: np.ndarray) -> pd.Series:
+        patient_positions = np.arange(len(daily_wear.patient_ids))
+        # patients without a window have no position, their day number would fall before the first day of all days
+        day_numbers = np.where(flat_positions >= 0,
+                               daily_wear.first_days + flat_positions - daily_wear.offsets[patient_positions],
+                               daily_wear.first_days)
+        return pd.Series(pd.to_datetime(day_numbers.astype("datetime64[D]"))).where(flat_positions >= 0)
+
+    return pd.DataFrame({
+        EARLIEST_WINDOW_PATIENT: daily_wear.patient_ids,
+        EARLIEST_WINDOW_START: to_days(np.where(window_ends >= 0, np.maximum(
+            window_ends + 1 - window_length, daily_wear.offsets[:-1]), -1)),
+        EARLIEST_WINDOW_END: to_days(window_ends),
+        EARLIEST_CONSECUTIVE_START: to_days(np.where(run_ends >= 0, run_ends + 1 - max(min_consecutive_days, 1), -1)),
+        EARLIEST_CONSECUTIVE_END: to_days(run_ends),
+    })
@@ -1,37 +1,187 @@
+import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
-from typing import Callable
+from typing import Callable, Dict, Iterator, Union
+from ctxfitness.interval_join import NO_INTERVAL, assign_to_intervals
+from ctxfitness.preprocessing_pipeline import RAW_DATA_INTERVAL_END_TIME, RAW_DATA_INTERVAL_START_TIME
+from ctxfitness.source_schema import SourceSchema, iter_source_chunks, load_source, to_timestamps
+
+HEART_RATE_USER_ID = "User Id"
+HEART_RATE_START_TIME_LOCAL = "Start Time (Local)"
+HEART_RATE_START_TIME_UTC = "Start Time (UTC)"
+HEART_RATE_VALUE = "Heart Rate (bpm)"
+HEART_RATE_TIMESTAMP_LOCAL = "Timestamp (Local)"
+HEART_RATE_DATE = "Date"
+
+# a sample is identified by its patient and time, repeated exports of the same sample are dropped
+HEART_RATE_KEY_COLUMNS = [HEART_RATE_USER_ID, HEART_RATE_TIMESTAMP_LOCAL]
+DEFAULT_HEART_RATE_CHUNK_SIZE = 500_000
+
+# the raw export, identity and redundant time columns are not read
+HEART_RATE_EXPORT_SCHEMA = SourceSchema(
+    name="heart rate export",
+    excluded_columns=[
+        "User First Name",
+        "User Last Name",
+        "User Email",
+        "Team Names",
+        "Group Names",
+        "Calendar Date (Local)",
+        "Time Zone (Local)",
+        "Calendar Date (UTC)",
+        "Start Time (s)",
+        "Time Zone (s)",
+        "Status",
+        "Source"
+    ])
+
+RESAMPLING_FREQUENCIES: Dict[str, str] = {
+    "minute": "min",
+    "hour": "h",
+    "day": "D"
+}
+RESAMPLED_HEART_RATE_MIN = "Heart Rate (min bpm)"
+RESAMPLED_HEART_RATE_AVG = "Heart Rate (avg bpm)"
+RESAMPLED_HEART_RATE_MAX = "Heart Rate (max bpm)"
+RESAMPLED_HEART_RATE_SAMPLES = "Samples"
+
+HEART_RATE_WEAR_INTERVAL = "Wear interval"
+HEART_RATE_WORN = "Worn"
+
+
+def heart_rate_samples_schema(value_column: str = HEART_RATE_VALUE) -> SourceSchema:
+    return SourceSchema(
+        name="heart rate",
+        columns=[HEART_RATE_USER_ID, HEART_RATE_START_TIME_LOCAL, HEART_RATE_START_TIME_UTC, value_column],
+        dtypes={HEART_RATE_USER_ID: "str", value_column: "float32"},
+        timestamp_columns=[HEART_RATE_START_TIME_LOCAL, HEART_RATE_START_TIME_UTC])
+
 
 def load_and_process_heart_rate(path: str) -> pd.DataFrame:
-    df = pd.read_excel(path)
+    df = load_source(path, HEART_RATE_EXPORT_SCHEMA, parse_timestamps=False)
 
     if not df["Start Time (UTC)"].is_monotonic_increasing:
         raise Exception("'Start Time (UTC)' column is sorted in ascending order. Previously this was assumed as an invariant!")
 
-    return (
-        df
-        .drop("User First Name", axis=1)
-        .drop("User Last Name", axis=1)
-        .drop("User Email", axis=1)
-        .drop("Team Names", axis=1)
-        .drop("Group Names", axis=1)
-        .drop("Calendar Date (Local)", axis=1)
-        .drop("Start Time (UTC)", axis=1)
-        .drop("Time Zone (Local)", axis=1)
-        .drop("Calendar Date (UTC)", axis=1)
-        .drop("Start Time (s)", axis=1)
-        .drop("Time Zone (s)", axis=1)
-        .drop("Status", axis=1)
-        .drop("Source", axis=1)
-    )
+    return df.drop("Start Time (UTC)", axis=1)
+
 
 def load_and_clean_heart_rate(path: str) -> pd.DataFrame:
     df = load_and_process_heart_rate(path)
-    df = df.drop_duplicates()
-    df["Timestamp (Local)"] = df["Start Time (Local)"].apply(lambda d: pd.Timestamp(d)) 
-    df["Date"] = df["Timestamp (Local)"].apply(lambda ts: ts.date())
+    df[HEART_RATE_TIMESTAMP_LOCAL] = to_timestamps(df[HEART_RATE_START_TIME_LOCAL])
+    df = df.drop_duplicates(subset=HEART_RATE_KEY_COLUMNS)
+    df[HEART_RATE_DATE] = df[HEART_RATE_TIMESTAMP_LOCAL].dt.date
+    return df
+
+
+def iter_heart_rate_chunks(path: str,
+                           chunk_size: int = DEFAULT_HEART_RATE_CHUNK_SIZE,
+                           value_column: str = HEART_RATE_VALUE) -> Iterator[pd.DataFrame]:
+    """
+    Yields cleaned chunks with the columns User Id, Timestamp (Local), Date and the heart rate.
+    The export is sorted by UTC time, so the rows of the last UTC time of a chunk are held back
+    and prepended to the next one. That way duplicates never span two chunks.
+    """
+    held_back: Union[pd.DataFrame, None] = None
+    for chunk in iter_source_chunks(path, heart_rate_samples_schema(value_column), chunk_size):
+        chunk = chunk.rename({HEART_RATE_START_TIME_LOCAL: HEART_RATE_TIMESTAMP_LOCAL}, axis=1)
+        if held_back is not None:
+            chunk = pd.concat([held_back, chunk], ignore_index=True)
+        if not chunk[HEART_RATE_START_TIME_UTC].is_monotonic_increasing:
+            raise Exception("'Start Time (UTC)' column is not sorted in ascending order. Previously this was assumed as an invariant!")
+        is_last_time = chunk[HEART_RATE_START_TIME_UTC] == chunk[HEART_RATE_START_TIME_UTC].iloc[-1]
+        held_back = chunk[is_last_time]
+        yield clean_heart_rate_chunk(chunk[~is_last_time], value_column)
+    if held_back is not None:
+        yield clean_heart_rate_chunk(held_back, value_column)
+
+
+def clean_heart_rate_chunk(chunk: pd.DataFrame, value_column: str) -> pd.DataFrame:
+    chunk = chunk.drop_duplicates(subset=HEART_RATE_KEY_COLUMNS).drop(HEART_RATE_START_TIME_UTC, axis=1)
+    # datetime.date like load_and_clean_heart_rate, so the dates of both loaders match in merges and groupbys
+    chunk.insert(2, HEART_RATE_DATE, chunk[HEART_RATE_TIMESTAMP_LOCAL].dt.date)
+    return chunk
+
+
+def load_heart_rate(path: str,
+                    chunk_size: int = DEFAULT_HEART_RATE_CHUNK_SIZE,
+                    value_column: str = HEART_RATE_VALUE) -> pd.DataFrame:
+    df = pd.concat(list(iter_heart_rate_chunks(path, chunk_size, value_column)), ignore_index=True)
+    df[HEART_RATE_USER_ID] = df[HEART_RATE_USER_ID].astype("category")
     return df
 
+
+def aggregate_heart_rate(df: pd.DataFrame, frequency: str, value_column: str = HEART_RATE_VALUE) -> pd.DataFrame:
+    # partial statistics that can be combined across chunks
+    if frequency not in RESAMPLING_FREQUENCIES:
+        raise Exception(f"Unknown resampling frequency '{frequency}', use one of {list(RESAMPLING_FREQUENCIES.keys())}!")
+    periods = df[HEART_RATE_TIMESTAMP_LOCAL].dt.floor(RESAMPLING_FREQUENCIES[frequency])
+    # samples are stored as float32, sums are accumulated in float64
+    return (
+        df[value_column]
+        .astype("float64")
+        .groupby([df[HEART_RATE_USER_ID].astype(str), periods], sort=False)
+        .agg(["min", "max", "sum", "count"])
+    )
+
+
+def finalize_heart_rate_aggregates(aggregates: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        RESAMPLED_HEART_RATE_MIN: aggregates["min"],
+        RESAMPLED_HEART_RATE_AVG: aggregates["sum"] / aggregates["count"],
+        RESAMPLED_HEART_RATE_MAX: aggregates["max"],
+        RESAMPLED_HEART_RATE_SAMPLES: aggregates["count"]
+    }).sort_index().reset_index()
+
+
+def resample_heart_rate(df: pd.DataFrame, frequency: str, value_column: str = HEART_RATE_VALUE) -> pd.DataFrame:
+    """
+    Min, average and max heart rate and the number of samples per patient and minute, hour or day.
+    """
+    return finalize_heart_rate_aggregates(aggregate_heart_rate(df, frequency, value_column))
+
+
+def load_resampled_heart_rate(path: str,
+                              frequency: str,
+                              chunk_size: int = DEFAULT_HEART_RATE_CHUNK_SIZE,
+                              value_column: str = HEART_RATE_VALUE) -> pd.DataFrame:
+    """
+    Resamples a heart rate export chunk by chunk, only the aggregates are kept in memory.
+    """
+    aggregates = pd.concat([aggregate_heart_rate(chunk, frequency, value_column)
+                            for chunk in iter_heart_rate_chunks(path, chunk_size, value_column)])
+    combined = aggregates.groupby(level=[0, 1], sort=False).agg(
+        {"min": "min", "max": "max", "sum": "sum", "count": "sum"})
+    return finalize_heart_rate_aggregates(combined)
+
+
+def join_wear_intervals(df_heart_rate: pd.DataFrame, df_dailies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the index label of the raw dailies interval each sample was taken in, matched by
+    User Id and local time, and whether the sample was taken while the tracker was worn.
+    """
+    interval_positions = assign_to_intervals(
+        df_heart_rate[HEART_RATE_USER_ID].astype(str).to_numpy(),
+        df_heart_rate[HEART_RATE_TIMESTAMP_LOCAL].to_numpy(),
+        df_dailies[HEART_RATE_USER_ID].astype(str).to_numpy(),
+        to_timestamps(df_dailies[RAW_DATA_INTERVAL_START_TIME]).to_numpy(),
+        to_timestamps(df_dailies[RAW_DATA_INTERVAL_END_TIME]).to_numpy())
+    worn = interval_positions != NO_INTERVAL
+    df = df_heart_rate.copy()
+    df[HEART_RATE_WEAR_INTERVAL] = pd.array(
+        np.where(worn, df_dailies.index.to_numpy()[np.maximum(interval_positions, 0)], pd.NA))
+    df[HEART_RATE_WORN] = worn
+    return df
+
+
+def worn_daily_heart_rate(df_heart_rate: pd.DataFrame, df_dailies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Min, average and max heart rate per patient and day over the time the tracker was worn.
+    """
+    df_joined = join_wear_intervals(df_heart_rate, df_dailies)
+    return resample_heart_rate(df_joined[df_joined[HEART_RATE_WORN]], "day")
+
+
 # You need to provide a function that preprocesses the data accordingly
 def plot_acceptance_criterion(df: pd.DataFrame, row_idx: int, acceptance_hours: int):
     colors = df.iloc[row_idx].apply(lambda h: "green" if (h >= acceptance_hours) else "gray")
@@ -41,4 +191,4 @@ def plot_acceptance_criterion(df: pd.DataFrame, row_idx: int, acceptance_hours:
     plt.ylabel("Hours worn")
     plt.title(f"Eligible days for {acceptance_hours} hour criterion")
     plt.xticks(rotation=90)
-    plt.show()
\ No newline at end of file
+    plt.show()
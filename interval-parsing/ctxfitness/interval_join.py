@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+NO_INTERVAL = -1
+
+
+def to_int64_times(times: np.ndarray) -> np.ndarray:
+    return np.asarray(times, dtype="datetime64[ns]").view(np.int64)
+
+
+def assign_to_intervals(sample_groups: np.ndarray,
+                        sample_times: np.ndarray,
+                        interval_groups: np.ndarray,
+                        interval_starts: np.ndarray,
+                        interval_ends: np.ndarray) -> np.ndarray:
+    """
+    Returns the position of the interval [start, end) of the same group enclosing each sample,
+    or NO_INTERVAL. Where intervals overlap, the sample goes to the one reaching furthest.
+
+    Samples and interval starts are merged in one sort by (group, time). Walking the merged
+    order, a sample is enclosed if the furthest reaching interval started before it ends after it.
+    """
+    n_intervals = len(interval_starts)
+    n_samples = len(sample_times)
+    if n_intervals == 0 or n_samples == 0:
+        return np.full(n_samples, NO_INTERVAL, dtype=np.int64)
+
+    group_codes, _groups = pd.factorize(np.concatenate([np.asarray(interval_groups), np.asarray(sample_groups)]))
+    interval_codes, sample_codes = group_codes[:n_intervals], group_codes[n_intervals:]
+    starts, ends = to_int64_times(interval_starts), to_int64_times(interval_ends)
+
+    # intervals sorted by group and start, with the furthest end reached so far within the group
+    interval_order = np.lexsort((starts, interval_codes))
+    sorted_codes = interval_codes[interval_order]
+    sorted_ends = ends[interval_order]
+    furthest_ends = pd.Series(sorted_ends).groupby(sorted_codes).cummax().to_numpy()
+    # positions only increase, so a global running max keeps the furthest interval of each group
+    furthest_positions = np.maximum.accumulate(
+        np.where(sorted_ends == furthest_ends, np.arange(n_intervals), NO_INTERVAL))
+
+    # interval starts sort before samples at the same time, so starts are inclusive
+    merged_codes = np.concatenate([sorted_codes, sample_codes])
+    merged_times = np.concatenate([starts[interval_order], to_int64_times(sample_times)])
+    merged_is_sample = np.concatenate([np.zeros(n_intervals, dtype=bool), np.ones(n_samples, dtype=bool)])
+    merged_order = np.lexsort((merged_is_sample, merged_times, merged_codes))
+
+    merged_positions = np.where(merged_is_sample[merged_order], NO_INTERVAL, merged_order)
+    preceding_positions = np.maximum.accumulate(merged_positions)[merged_is_sample[merged_order]]
+    sample_indices = merged_order[merged_is_sample[merged_order]] - n_intervals
+
+    candidates = furthest_positions[np.maximum(preceding_positions, 0)]
+    enclosed = ((preceding_positions != NO_INTERVAL)
+                & (sorted_codes[np.maximum(preceding_positions, 0)] == sample_codes[sample_indices])
+                & (furthest_ends[np.maximum(preceding_positions, 0)] > merged_times[n_intervals + sample_indices]))
+
+    assigned = np.full(n_samples, NO_INTERVAL, dtype=np.int64)
+    assigned[sample_indices[enclosed]] = interval_order[candidates[enclosed]]
+    return assigned
@@ -1,5 +1,6 @@
 from enum import Enum
 from typing import Any, Dict, List, Union
+from ctxfitness.source_schema import SourceSchema, load_source
 from ctxfitness.time_utils import parse_datestr_interval_time
 import pandas as pd
 import ctxfitness.interval_parser as ip
@@ -39,6 +40,34 @@ RAW_DATA_INTERVAL_END_TIME = "End Time (Local)"
 RAW_DAILIES_EXCEL_COLUMN_FILTER: List[str] = [
     RAW_DATA_INTERVAL_START_TIME, RAW_DATA_INTERVAL_END_TIME] + RAW_INTERVAL_DATA_COLUMN_FILTER
 
+# Only the filtered columns of the raw dailies are read. The interval times are parsed per
+# interval, so they are kept as read.
+RAW_DAILIES_SCHEMA = SourceSchema(
+    name="raw dailies",
+    columns=RAW_DAILIES_EXCEL_COLUMN_FILTER,
+    dtypes={
+        "User Id": "str",
+        "Summary Id": "str",
+        "Duration (s)": "float64",
+        "Steps": "float64",
+        "Distance  (m)": "float64",
+        "Moderate Intensity Duration (s)": "float64",
+        "Vigorous Intensity Duration (s)": "float64",
+        "Floors Climbed": "float64",
+        "Heart Rate (min bpm)": "float64",
+        "Heart Rate (avg bpm)": "float64",
+        "Heart Rate (max bpm)": "float64",
+        "Stress Level (avg)": "float64",
+        "Stress Level (max)": "float64",
+        "Stress Duration (s)": "float64",
+        "Rest Stress Duration (s)": "float64",
+        "Activity Stress Duration (s)": "float64",
+        "Low Stress Duration (s)": "float64",
+        "Medium Stress Duration (s)": "float64",
+        "High Stress Duration (s)": "float64"
+    },
+    timestamp_columns=[RAW_DATA_INTERVAL_START_TIME, RAW_DATA_INTERVAL_END_TIME])
+
 class ParsedDailiesColumns(str, Enum):
     # Convenience column enum for better IntelliSense
     USER_LAST_NAME = "Tracker ID",
@@ -105,6 +134,11 @@ class PreprocessingPipeline:
         df_raw = PreprocessingPipeline.parse_and_load_multiple_patients_df(path)
         return PreprocessingPipeline.rename_and_restrict_columns(df_raw)
 
+    @staticmethod
+    def run_pipeline_on_frame(multi_dailies_df: pd.DataFrame) -> pd.DataFrame:
+        df_raw = PreprocessingPipeline.parse_multiple_patients_df(multi_dailies_df)
+        return PreprocessingPipeline.rename_and_restrict_columns(df_raw)
+
     @staticmethod 
     def rename_and_restrict_columns(df: pd.DataFrame) -> pd.DataFrame:
         df_processed = df.copy()
@@ -141,7 +175,11 @@ class PreprocessingPipeline:
 
     @staticmethod
     def parse_and_load_multiple_patients_df(path: str) -> pd.DataFrame:
-        multi_dailies_df = pd.read_excel(path)
+        return PreprocessingPipeline.parse_multiple_patients_df(
+            load_source(path, RAW_DAILIES_SCHEMA, parse_timestamps=False))
+
+    @staticmethod
+    def parse_multiple_patients_df(multi_dailies_df: pd.DataFrame) -> pd.DataFrame:
         user_ids = multi_dailies_df["User Id"].unique()
         parsed_dailies_list: List[pd.DataFrame] = []
         for user_id in user_ids:
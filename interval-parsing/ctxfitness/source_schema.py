@@ -0,0 +1,317 @@
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+import openpyxl
+import pandas as pd
+from ctxfitness.time_utils import DATE_FORMAT
+
+
+@dataclass(frozen=True)
+class SourceSchema:
+    """
+    Declares which columns of a source are read and how. Either the kept columns are listed,
+    or all columns except the excluded ones are kept (for exports whose layout varies).
+    Timestamp columns are stored as DATE_FORMAT strings or Excel datetimes and are parsed
+    after reading, unless the caller keeps them as read.
+    """
+    name: str
+    columns: Union[List[str], None] = None
+    excluded_columns: List[str] = field(default_factory=list)
+    dtypes: Dict[str, str] = field(default_factory=dict)
+    timestamp_columns: List[str] = field(default_factory=list)
+
+    def usecols(self) -> Union[List[str], Callable[[str], bool]]:
+        if self.columns is not None:
+            return self.columns
+        return lambda column: column not in self.excluded_columns
+
+    def is_kept(self, column: str) -> bool:
+        if self.columns is not None:
+            return column in self.columns
+        return column not in self.excluded_columns
+
+    def kept_columns(self, available_columns: List[str]) -> List[str]:
+        return [column for column in available_columns if self.is_kept(column)]
+
+
+def to_timestamps(series: pd.Series) -> pd.Series:
+    # Excel cells may already hold datetimes, exports are strings in DATE_FORMAT and
+    # files written by pandas use ISO 8601 with a space
+    try:
+        return pd.to_datetime(series, format=DATE_FORMAT)
+    except ValueError:
+        return pd.to_datetime(series)
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        if dtype == "str":
+            # like the pandas readers, empty cells stay missing instead of becoming "None"
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def apply_schema(df: pd.DataFrame, schema: SourceSchema, parse_timestamps: bool) -> pd.DataFrame:
+    missing_columns = [column for column in (schema.columns or []) if column not in df.columns]
+    if len(missing_columns) > 0:
+        raise Exception(f"The {schema.name} source is missing the columns {missing_columns}!")
+    if schema.columns is not None:
+        df = df[schema.columns]
+    if parse_timestamps and len(schema.timestamp_columns) > 0:
+        df = df.assign(**{column: to_timestamps(df[column]) for column in schema.timestamp_columns})
+    return df
+
+
+class SourceWriter:
+    """
+    Writes a source file chunk by chunk with the writer of its format. Formats that cannot
+    append to a file collect the chunks and write them at once on close.
+    """
+
+    def __init__(self, reader: "SourceReader", path: str) -> None:
+        self.reader = reader
+        self.path = path
+        self.n_chunks = 0
+        self._chunks: List[pd.DataFrame] = []
+
+    def write(self, df: pd.DataFrame) -> None:
+        self._chunks.append(df)
+        self.n_chunks += 1
+
+    def close(self) -> None:
+        if len(self._chunks) > 0:
+            self.reader.write(pd.concat(self._chunks, ignore_index=True), self.path)
+            self._chunks = []
+
+
+class SourceReader(ABC):
+    """
+    Reads one file format. Readers are picked by file extension first and by the leading
+    bytes of the file otherwise, see detect_reader.
+    """
+    format_name = ""
+    extensions: Tuple[str, ...] = ()
+    magic: Union[bytes, None] = None
+
+    @abstractmethod
+    def read(self, path: str, schema: SourceSchema) -> pd.DataFrame:
+        pass
+
+    def iter_chunks(self, path: str, schema: SourceSchema, chunk_size: int) -> Iterator[pd.DataFrame]:
+        df = self.read(path, schema)
+        for start in range(0, df.shape[0], chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+    @abstractmethod
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        pass
+
+    def open_writer(self, path: str) -> SourceWriter:
+        return SourceWriter(self, path)
+
+
+class ExcelReader(SourceReader):
+    format_name = "excel"
+    extensions = (".xlsx", ".xlsm")
+    magic = b"PK\x03\x04"
+
+    def read(self, path: str, schema: SourceSchema) -> pd.DataFrame:
+        return pd.read_excel(path, usecols=schema.usecols(), dtype=schema.dtypes)
+
+    def iter_chunks(self, path: str, schema: SourceSchema, chunk_size: int) -> Iterator[pd.DataFrame]:
+        # streams the rows, pd.read_excel has no chunked mode
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = list(next(rows))
+            column_indices = [i for i, column in enumerate(header) if column is not None and schema.is_kept(column)]
+            columns = [header[i] for i in column_indices]
+            chunk: List[List[Any]] = []
+            for row in rows:
+                chunk.append([row[i] for i in column_indices])
+                if len(chunk) == chunk_size:
+                    yield apply_dtypes(pd.DataFrame(chunk, columns=columns), schema.dtypes)
+                    chunk = []
+            if len(chunk) > 0:
+                yield apply_dtypes(pd.DataFrame(chunk, columns=columns), schema.dtypes)
+        finally:
+            workbook.close()
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        df.to_excel(path, index=False)
+
+
+class CsvReader(SourceReader):
+    format_name = "csv"
+    extensions = (".csv",)
+
+    def read(self, path: str, schema: SourceSchema) -> pd.DataFrame:
+        return pd.read_csv(path, usecols=schema.usecols(), dtype=schema.dtypes)
+
+    def iter_chunks(self, path: str, schema: SourceSchema, chunk_size: int) -> Iterator[pd.DataFrame]:
+        yield from pd.read_csv(path, usecols=schema.usecols(), dtype=schema.dtypes, chunksize=chunk_size)
+
+    def write(self, df: pd.DataFrame, path: str, append: bool = False) -> None:
+        df.to_csv(path, mode="a" if append else "w", header=not append, index=False)
+
+    def open_writer(self, path: str) -> SourceWriter:
+        return CsvWriter(self, path)
+
+
+class CsvWriter(SourceWriter):
+    # the chunks are appended to the file, only the first one writes the header
+    def write(self, df: pd.DataFrame) -> None:
+        self.reader.write(df, self.path, append=self.n_chunks > 0)  # type: ignore
+        self.n_chunks += 1
+
+    def close(self) -> None:
+        pass
+
+
+def import_pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("Reading and writing feather or parquet files requires the 'pyarrow' package to be installed!")
+    return pyarrow
+
+
+class FeatherReader(SourceReader):
+    """
+    Arrow IPC files are memory-mapped, only the pages of the projected columns are read.
+    """
+    format_name = "feather"
+    extensions = (".feather", ".arrow")
+    magic = b"ARROW1"
+
+    def read_table(self, path: str, schema: SourceSchema) -> Any:
+        pa = import_pyarrow()
+        with pa.memory_map(path) as source:
+            available_columns = pa.ipc.open_file(source).schema.names
+        return pa.feather.read_table(path, columns=schema.kept_columns(available_columns), memory_map=True)
+
+    def read(self, path: str, schema: SourceSchema) -> pd.DataFrame:
+        return apply_dtypes(self.read_table(path, schema).to_pandas(), schema.dtypes)
+
+    def iter_chunks(self, path: str, schema: SourceSchema, chunk_size: int) -> Iterator[pd.DataFrame]:
+        for batch in self.read_table(path, schema).to_batches(max_chunksize=chunk_size):
+            yield apply_dtypes(batch.to_pandas(), schema.dtypes)
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        import_pyarrow()
+        df.reset_index(drop=True).to_feather(path)
+
+
+class ParquetReader(SourceReader):
+    format_name = "parquet"
+    extensions = (".parquet",)
+    magic = b"PAR1"
+
+    def read(self, path: str, schema: SourceSchema) -> pd.DataFrame:
+        pa = import_pyarrow()
+        columns = schema.kept_columns(pa.parquet.read_schema(path, memory_map=True).names)
+        return apply_dtypes(pa.parquet.read_table(path, columns=columns, memory_map=True).to_pandas(), schema.dtypes)
+
+    def iter_chunks(self, path: str, schema: SourceSchema, chunk_size: int) -> Iterator[pd.DataFrame]:
+        pa = import_pyarrow()
+        parquet_file = pa.parquet.ParquetFile(path, memory_map=True)
+        columns = schema.kept_columns(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield apply_dtypes(batch.to_pandas(), schema.dtypes)
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        import_pyarrow()
+        df.to_parquet(path, index=False)
+
+    def open_writer(self, path: str) -> SourceWriter:
+        return ParquetWriter(self, path)
+
+
+class ParquetWriter(SourceWriter):
+    # every chunk becomes a row group, the schema is taken from the first one
+    def __init__(self, reader: SourceReader, path: str) -> None:
+        super().__init__(reader, path)
+        self._writer: Any = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        pa = import_pyarrow()
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._writer = pa.parquet.ParquetWriter(self.path, table.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.n_chunks += 1
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# CSV is the fallback for files without a known extension or magic bytes
+SOURCE_READERS: List[SourceReader] = [FeatherReader(), ParquetReader(), ExcelReader(), CsvReader()]
+
+
+def register_reader(reader: SourceReader) -> None:
+    SOURCE_READERS.insert(0, reader)
+
+
+def get_source_file_extensions() -> List[str]:
+    return [extension for reader in SOURCE_READERS for extension in reader.extensions]
+
+
+def detect_reader(path: str) -> SourceReader:
+    extension = os.path.splitext(path)[1].lower()
+    for reader in SOURCE_READERS:
+        if extension in reader.extensions:
+            return reader
+    if os.path.exists(path):
+        with open(path, "rb") as source:
+            header = source.read(8)
+        for reader in SOURCE_READERS:
+            if reader.magic is not None and header.startswith(reader.magic):
+                return reader
+    for reader in SOURCE_READERS:
+        if isinstance(reader, CsvReader):
+            return reader
+    raise Exception(f"No reader found for the file '{path}'!")
+
+
+def load_source(path: str, schema: SourceSchema, parse_timestamps: bool = True) -> pd.DataFrame:
+    """
+    Reads only the columns of the schema, with its dtypes, from any supported file format.
+    """
+    return apply_schema(detect_reader(path).read(path, schema), schema, parse_timestamps)
+
+
+def iter_source_chunks(path: str,
+                       schema: SourceSchema,
+                       chunk_size: int,
+                       parse_timestamps: bool = True) -> Iterator[pd.DataFrame]:
+    for chunk in detect_reader(path).iter_chunks(path, schema, chunk_size):
+        yield apply_schema(chunk, schema, parse_timestamps)
+
+
+def write_source(df: pd.DataFrame, path: str) -> None:
+    detect_reader(path).write(df, path)
+
+
+def open_source_writer(path: str) -> SourceWriter:
+    """
+    Writer that takes the frames of a source one chunk at a time. The format is chosen by the
+    file extension only, there are no leading bytes yet to detect it from.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for reader in SOURCE_READERS:
+        if extension in reader.extensions:
+            return reader.open_writer(path)
+    raise Exception(
+        f"The file '{path}' has an unsupported extension, use one of {get_source_file_extensions()}!")
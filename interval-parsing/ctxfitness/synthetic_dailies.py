@@ -0,0 +1,338 @@
+"""
+Seeded, vectorized generator of synthetic raw dailies and matching patient meta data.
+
+Patients are generated in chunks, every chunk is built with numpy operations over all
+of its wear intervals and can be streamed to disk before the next one is generated:
+
+    python -m ctxfitness.synthetic_dailies --patients 10000 --dailies dailies.csv --meta patient-meta.csv
+"""
+import argparse
+import datetime as dt
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple, Union
+import numpy as np
+import pandas as pd
+from ctxfitness.column_aggregators import stress_dict
+from ctxfitness.source_schema import open_source_writer
+
+# column layout of a raw dailies export
+RAW_DAILIES_COLUMNS: List[str] = [
+    "User Id",
+    "User First Name",
+    "User Last Name",
+    "User Email",
+    "Team Names",
+    "Group Names",
+    "Calendar Date (Local)",
+    "Start Time (Local)",
+    "End Time (Local)",
+    "Time Zone (Local)",
+    "Calendar Date (UTC)",
+    "Start Time (UTC)",
+    "End Time (UTC)",
+    "Start Time (s)",
+    "Time Zone (s)",
+    "Duration (s)",
+    "Summary Id",
+    "Activity Type",
+    "Steps",
+    "Distance  (m)",
+    "Moderate Intensity Duration (s)",
+    "Vigorous Intensity Duration (s)",
+    "Floors Climbed",
+    "Heart Rate (min bpm)",
+    "Heart Rate (avg bpm)",
+    "Heart Rate (max bpm)",
+    "Stress Level (avg)",
+    "Stress Level (max)",
+    "Stress Duration (s)",
+    "Rest Stress Duration (s)",
+    "Activity Stress Duration (s)",
+    "Low Stress Duration (s)",
+    "Medium Stress Duration (s)",
+    "High Stress Duration (s)",
+    "Stress Qualifier",
+    "Steps Goal",
+    "Net Kilocalories Goal",
+    "Intensity Duration Goal (s)",
+    "Floors Climbed Gloal",
+]
+
+# metric columns a tracker may not have recorded, either for a whole patient or per interval
+HEART_RATE_COLUMNS = ["Heart Rate (min bpm)", "Heart Rate (avg bpm)", "Heart Rate (max bpm)"]
+STRESS_COLUMNS = ["Stress Level (avg)", "Stress Level (max)", "Stress Duration (s)", "Rest Stress Duration (s)",
+                  "Activity Stress Duration (s)", "Low Stress Duration (s)", "Medium Stress Duration (s)",
+                  "High Stress Duration (s)"]
+ACTIVITY_COLUMNS = ["Steps", "Distance  (m)", "Moderate Intensity Duration (s)",
+                    "Vigorous Intensity Duration (s)", "Floors Climbed"]
+
+# options of the patient meta columns, see dashboard/scripts/generate_patient_meta.py
+THERAPY_OPTIONS = [np.nan, "FOLFOX 6x nach RAPIDO-Like Schema", "Epirubicin, Ifosfamid", "FOLFOX + Nivo", "FOLFIRINOX"]
+THERAPY_REGIMEN_OPTIONS = ["Chemotherapy", "Chemoimmunotherapy", "Chemotherapy", "Chemoimmunotherapy", "Chemo + Targeted"]
+PRIMARY_TUMOR_OPTIONS = ["Gastric", "Lung", "Lung", "Sarcoma", "Sarcoma"]
+PRIOR_TREATMENT_OPTIONS = ["Chemo + Targeted", "Chemotherapy", "none", "none", "Immunotherapy"]
+ACTIVITY_TYPE_OPTIONS = ["WALKING", "SEDENTARY", "RUNNING", np.nan]
+
+SECONDS_IN_A_DAY = 24 * 60 * 60
+MAX_UTC_OFFSET_HOURS = 5
+
+
+@dataclass
+class SyntheticDailiesConfig:
+    n_patients: int = 62
+    study_start: dt.date = dt.date(2022, 6, 1)
+    n_study_days: int = 395
+    # active days cluster: probability of an active day after an active / an inactive day
+    p_stay_active: float = 0.8
+    p_become_active: float = 0.1
+    p_stay_active_spread: float = 0.1
+    # wear intervals per active day, Poisson distributed unless a fixed number is given
+    mean_intervals_per_active_day: float = 1.5
+    intervals_per_active_day: Union[int, None] = None
+    mean_wear_hours_per_day: float = 6.0
+    # share of intervals that overlap the next interval of their day / that last into following days
+    overlap_rate: float = 0.02
+    multi_day_rate: float = 0.03
+    # share of patients without a metric group and share of missing values per metric
+    missing_metric_patient_rate: float = 0.3
+    missing_value_rate: float = 0.05
+    seed: int = 0
+    patients_per_chunk: int = 1000
+
+
+@dataclass
+class SyntheticChunk:
+    dailies: pd.DataFrame
+    patient_meta: pd.DataFrame
+
+
+def simulate_active_days(rng: np.random.Generator, config: SyntheticDailiesConfig, n_patients: int) -> np.ndarray:
+    # two state Markov chain per patient, advanced for all patients of the chunk at once
+    p_stay_active = np.clip(rng.normal(config.p_stay_active, config.p_stay_active_spread, n_patients), 0, 1)
+    active = np.zeros((n_patients, config.n_study_days), dtype=bool)
+    state = rng.random(n_patients) < config.p_become_active
+    for day in range(config.n_study_days):
+        active[:, day] = state
+        draws = rng.random(n_patients)
+        state = np.where(state, draws < p_stay_active, draws < config.p_become_active)
+    return active
+
+
+def simulate_intervals(rng: np.random.Generator, config: SyntheticDailiesConfig, active: np.ndarray) -> Dict[str, np.ndarray]:
+    patient_of_day, day_of_study = np.nonzero(active)
+    n_active_days = len(patient_of_day)
+    if config.intervals_per_active_day is not None:
+        intervals_per_day = np.full(n_active_days, config.intervals_per_active_day)
+    else:
+        intervals_per_day = 1 + rng.poisson(max(config.mean_intervals_per_active_day - 1, 0), n_active_days)
+    active_day = np.repeat(np.arange(n_active_days), intervals_per_day)
+    n_intervals = len(active_day)
+
+    # starts are sorted within their day, each interval at most reaches the next start
+    start_offsets_s = rng.integers(0, SECONDS_IN_A_DAY - 60, n_intervals)
+    order = np.lexsort((start_offsets_s, active_day))
+    start_offsets_s = start_offsets_s[order]
+    has_next = np.append(active_day[1:] == active_day[:-1], False)
+    next_start_offsets_s = np.where(has_next, np.append(start_offsets_s[1:], 0), SECONDS_IN_A_DAY)
+    gaps_s = next_start_offsets_s - start_offsets_s
+    wanted_s = rng.normal(config.mean_wear_hours_per_day * 3600, 2 * 3600, n_intervals) / intervals_per_day[active_day]
+    durations_s = np.clip(np.minimum(wanted_s, 0.95 * gaps_s), 1, None)
+
+    overlapping = has_next & (rng.random(n_intervals) < config.overlap_rate)
+    durations_s = np.where(overlapping, gaps_s + rng.uniform(60, 3600, n_intervals), durations_s)
+    multi_day = ~has_next & (rng.random(n_intervals) < config.multi_day_rate)
+    durations_s = np.where(multi_day, gaps_s + rng.uniform(3600, 36 * 3600, n_intervals), durations_s)
+
+    return {
+        "patient": patient_of_day[active_day],
+        "start_s": day_of_study[active_day] * SECONDS_IN_A_DAY + start_offsets_s,
+        "duration_s": np.round(durations_s).astype(np.int64)
+    }
+
+
+def masked(rng: np.random.Generator, values: np.ndarray, missing: np.ndarray, missing_value_rate: float) -> np.ndarray:
+    return np.where(missing | (rng.random(len(values)) < missing_value_rate), np.nan, values)
+
+
+def create_dailies_frame(rng: np.random.Generator,
+                         config: SyntheticDailiesConfig,
+                         intervals: Dict[str, np.ndarray],
+                         user_ids: np.ndarray,
+                         tracker_ids: np.ndarray,
+                         utc_offsets_h: np.ndarray,
+                         first_summary_id: int) -> pd.DataFrame:
+    patient = intervals["patient"]
+    n_intervals = len(patient)
+    duration_s = intervals["duration_s"]
+    duration_h = duration_s / 3600
+    start_local = np.datetime64(config.study_start, "s") + intervals["start_s"].astype("timedelta64[s]")
+    end_local = start_local + duration_s.astype("timedelta64[s]")
+    utc_shift = (utc_offsets_h[patient] * 3600).astype("timedelta64[s]")
+    start_utc = start_local - utc_shift
+    time_zones = np.array([f"UTC{offset:+d}" for offset in range(-MAX_UTC_OFFSET_HOURS, MAX_UTC_OFFSET_HOURS + 1)],
+                          dtype=object)[utc_offsets_h[patient] + MAX_UTC_OFFSET_HOURS]
+
+    missing_groups = rng.random((3, len(user_ids))) < config.missing_metric_patient_rate
+    missing_activity, missing_heart_rate, missing_stress = (group[patient] for group in missing_groups)
+    steps = rng.poisson(400 * duration_h)
+    heart_rate_avg = rng.normal(75, 8, n_intervals)
+    stress_avg = rng.uniform(10, 60, n_intervals)
+    stress_duration = duration_s * rng.uniform(0.2, 0.8, n_intervals)
+    stress_levels = np.array(list(stress_dict.keys()), dtype=object)
+
+    metrics: Dict[str, np.ndarray] = {
+        "Steps": steps,
+        "Distance  (m)": steps * rng.uniform(0.6, 0.8, n_intervals),
+        "Moderate Intensity Duration (s)": duration_s * rng.uniform(0, 0.1, n_intervals),
+        "Vigorous Intensity Duration (s)": duration_s * rng.uniform(0, 0.03, n_intervals),
+        "Floors Climbed": rng.poisson(0.5 * duration_h),
+        "Heart Rate (min bpm)": heart_rate_avg - rng.uniform(10, 25, n_intervals),
+        "Heart Rate (avg bpm)": heart_rate_avg,
+        "Heart Rate (max bpm)": heart_rate_avg + rng.uniform(20, 70, n_intervals),
+        "Stress Level (avg)": stress_avg,
+        "Stress Level (max)": np.minimum(stress_avg + rng.uniform(10, 40, n_intervals), 100),
+        "Stress Duration (s)": stress_duration,
+        "Rest Stress Duration (s)": stress_duration * 0.4,
+        "Activity Stress Duration (s)": stress_duration * 0.1,
+        "Low Stress Duration (s)": stress_duration * 0.3,
+        "Medium Stress Duration (s)": stress_duration * 0.15,
+        "High Stress Duration (s)": stress_duration * 0.05,
+    }
+    for columns, missing in [(ACTIVITY_COLUMNS, missing_activity),
+                             (HEART_RATE_COLUMNS, missing_heart_rate),
+                             (STRESS_COLUMNS, missing_stress)]:
+        for column in columns:
+            metrics[column] = masked(rng, metrics[column].astype(float), missing, config.missing_value_rate)
+
+    stress_qualifier = stress_levels[rng.integers(0, len(stress_levels), n_intervals)]
+    stress_qualifier[missing_stress | (rng.random(n_intervals) < config.missing_value_rate)] = np.nan
+    activity_type = np.array(ACTIVITY_TYPE_OPTIONS, dtype=object)[
+        rng.integers(0, len(ACTIVITY_TYPE_OPTIONS), n_intervals)]
+    empty = np.full(n_intervals, np.nan)
+
+    df = pd.DataFrame({
+        "User Id": user_ids[patient],
+        "User First Name": empty,
+        "User Last Name": tracker_ids[patient],
+        "User Email": empty,
+        "Team Names": empty,
+        "Group Names": empty,
+        "Calendar Date (Local)": np.datetime_as_string(start_local, unit="D"),
+        "Start Time (Local)": np.datetime_as_string(start_local, unit="s"),
+        "End Time (Local)": np.datetime_as_string(end_local, unit="s"),
+        "Time Zone (Local)": time_zones,
+        "Calendar Date (UTC)": np.datetime_as_string(start_utc, unit="D"),
+        "Start Time (UTC)": np.datetime_as_string(start_utc, unit="s"),
+        "End Time (UTC)": np.datetime_as_string(start_utc + duration_s.astype("timedelta64[s]"), unit="s"),
+        "Start Time (s)": start_utc.astype(np.int64),
+        "Time Zone (s)": time_zones,
+        "Duration (s)": duration_s.astype(float),
+        "Summary Id": (first_summary_id + np.arange(n_intervals)).astype(str),
+        "Activity Type": activity_type,
+        "Stress Qualifier": stress_qualifier,
+        "Steps Goal": empty,
+        "Net Kilocalories Goal": empty,
+        "Intensity Duration Goal (s)": empty,
+        "Floors Climbed Gloal": empty,
+        **metrics
+    })
+    return df[RAW_DAILIES_COLUMNS]
+
+
+def pick(rng: np.random.Generator, options: List, n: int) -> np.ndarray:
+    return np.array(options, dtype=object)[rng.integers(0, len(options), n)]
+
+
+def create_patient_meta_frame(rng: np.random.Generator,
+                              config: SyntheticDailiesConfig,
+                              active: np.ndarray,
+                              user_ids: np.ndarray,
+                              tracker_ids: np.ndarray) -> pd.DataFrame:
+    n_patients = len(user_ids)
+    therapy_regimen = pick(rng, THERAPY_REGIMEN_OPTIONS, n_patients)
+    # the baseline visit is on the first day the tracker was worn, or at the study start
+    first_active_day = np.where(active.any(axis=1), active.argmax(axis=1), 0)
+    # column names match ctxdashboard.domain.patientmeta.PatientMetaColumn
+    return pd.DataFrame({
+        "User Id": user_ids,
+        "Tracker": tracker_ids,
+        "Date_BL": np.datetime64(config.study_start, "D") + first_active_day.astype("timedelta64[D]"),
+        "ECOG": np.round(rng.uniform(0, 5, n_patients)).astype(int),
+        "Age": np.round(rng.normal(59, 10, n_patients)).astype(int),
+        "Gender": np.where(rng.random(n_patients) > 0.5, "M", "F"),
+        "Therapy": pick(rng, THERAPY_OPTIONS, n_patients),
+        "Therapy Regimen": therapy_regimen,
+        "Treatment Naive": np.where(np.isin(therapy_regimen, ["Chemotherapy", "Chemoimmunotherapy"]), "Yes", "No"),
+        "Primary Tumor": pick(rng, PRIMARY_TUMOR_OPTIONS, n_patients),
+        "Prior Treatment": pick(rng, PRIOR_TREATMENT_OPTIONS, n_patients),
+        "Fitness: TUG": rng.normal(8, 2, n_patients),
+        "Fitness: HGS": rng.normal(35, 6, n_patients),
+    })
+
+
+def generate_chunks(config: SyntheticDailiesConfig) -> Iterator[SyntheticChunk]:
+    """
+    Yields the dailies and patient meta data of config.patients_per_chunk patients at a time.
+    Every chunk has its own random stream derived from the seed, so the output only depends
+    on the seed and the chunk size.
+    """
+    chunk_starts = range(0, config.n_patients, config.patients_per_chunk)
+    chunk_seeds = np.random.SeedSequence(config.seed).spawn(len(chunk_starts))
+    first_summary_id = 0
+    for chunk_start, chunk_seed in zip(chunk_starts, chunk_seeds):
+        rng = np.random.default_rng(chunk_seed)
+        n_patients = min(config.patients_per_chunk, config.n_patients - chunk_start)
+        patient_numbers = np.arange(chunk_start, chunk_start + n_patients)
+        user_ids = np.array([f"{0x60ec5e00f300c47500000000 + number:024x}" for number in patient_numbers], dtype=object)
+        tracker_ids = patient_numbers + 1
+        utc_offsets_h = rng.integers(-MAX_UTC_OFFSET_HOURS, MAX_UTC_OFFSET_HOURS + 1, n_patients)
+
+        active = simulate_active_days(rng, config, n_patients)
+        intervals = simulate_intervals(rng, config, active)
+        dailies = create_dailies_frame(
+            rng, config, intervals, user_ids, tracker_ids, utc_offsets_h, first_summary_id)
+        first_summary_id += dailies.shape[0]
+        yield SyntheticChunk(dailies, create_patient_meta_frame(rng, config, active, user_ids, tracker_ids))
+
+
+def generate_dailies(config: SyntheticDailiesConfig) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    chunks = list(generate_chunks(config))
+    return (pd.concat([chunk.dailies for chunk in chunks], ignore_index=True),
+            pd.concat([chunk.patient_meta for chunk in chunks], ignore_index=True))
+
+
+def write_synthetic_dataset(config: SyntheticDailiesConfig, dailies_path: str, patient_meta_path: str) -> int:
+    dailies_writer = open_source_writer(dailies_path)
+    patient_meta_writer = open_source_writer(patient_meta_path)
+    n_rows = 0
+    try:
+        for chunk in generate_chunks(config):
+            dailies_writer.write(chunk.dailies)
+            patient_meta_writer.write(chunk.patient_meta)
+            n_rows += chunk.dailies.shape[0]
+    finally:
+        dailies_writer.close()
+        patient_meta_writer.close()
+    return n_rows
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Generates synthetic raw dailies and patient meta data.")
+    parser.add_argument("--patients", type=int, default=SyntheticDailiesConfig.n_patients)
+    parser.add_argument("--days", type=int, default=SyntheticDailiesConfig.n_study_days)
+    parser.add_argument("--seed", type=int, default=SyntheticDailiesConfig.seed)
+    parser.add_argument("--chunk-size", type=int, default=SyntheticDailiesConfig.patients_per_chunk,
+                        help="patients generated and written at a time")
+    parser.add_argument("--dailies", required=True, help="output path, e.g. .csv or .parquet")
+    parser.add_argument("--meta", required=True, help="output path of the patient meta data, e.g. .csv or .parquet")
+    args = parser.parse_args(argv)
+    config = SyntheticDailiesConfig(
+        n_patients=args.patients, n_study_days=args.days, seed=args.seed, patients_per_chunk=args.chunk_size)
+    n_rows = write_synthetic_dataset(config, args.dailies, args.meta)
+    print(f"Wrote {n_rows} dailies rows of {args.patients} patients to '{args.dailies}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,8 +1,9 @@
 from typing import Callable, List
+import pickle
 import unittest
 import pandas as pd
 import ctxfitness.preprocessing_pipeline as ipc
-from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler, CTxPatientDay, minimum_overall_and_consecutive_days_patient_acceptance_criterion, simple_min_hours_daily_acceptance_criterion
+from ctxfitness.ctx_patient_dailies_handler import CTxPatientDailiesHandler, CTxPatientDay, CTxPatientDays, minimum_overall_and_consecutive_days_patient_acceptance_criterion, simple_min_hours_daily_acceptance_criterion
 import datetime as dt
 from pyxtension.streams import stream
 
@@ -174,6 +175,62 @@ class CTxPatientDailiesHandlerTest(unittest.TestCase):
             ))
 
 
+class CTxPatientDaysTest(unittest.TestCase):
+    def test_from_frame_fills_gaps(self):
+        df = pd.DataFrame({
+            ipc.ParsedDailiesColumns.START_DT: pd.to_datetime(["2021-08-01", "2021-08-03", "2021-08-03 12:00", "2021-08-05"]),
+            ipc.ParsedDailiesColumns.END_DT: pd.to_datetime(["2021-08-01 10:00", "2021-08-03 10:00", "2021-08-03 20:00", "2021-08-05 10:00"]),
+            ipc.ParsedDailiesColumns.DAILY_DURATION_S: [30000.0, 20000.0, 40000.0, 50000.0]
+        })
+        dailies_handler = CTxPatientDailiesHandler.from_frame(
+            SOME_PAT_ID,
+            df,
+            daily_criterion=simple_min_hours_daily_acceptance_criterion(10),
+            patient_acceptance_criterion=simple_patient_criterion)
+        self.assertEqual(
+            dailies_handler,
+            CTxPatientDailiesHandler(
+                SOME_PAT_ID,
+                [
+                    CTxPatientDay(dt.date(2021, 8, 1), 30000, False, "08:20:00"),
+                    CTxPatientDay(dt.date(2021, 8, 2), 0, False, "00:00:00"),
+                    CTxPatientDay(dt.date(2021, 8, 3), 40000, True, "11:06:40"),
+                    CTxPatientDay(dt.date(2021, 8, 4), 0, False, "00:00:00")
+                ],
+                accepted=False
+            )
+        )
+        self.assertEqual(dailies_handler.patient_days[2], CTxPatientDay(dt.date(2021, 8, 3), 40000, True, "11:06:40"))
+        self.assertEqual(
+            CTxPatientDailiesHandler.from_frame(SOME_PAT_ID, df, simple_daily_criterion, simple_patient_criterion).get_accepted(),
+            [True, False, True, False])
+        self.assertEqual(dailies_handler.get_days(), [dt.date(2021, 8, 1), dt.date(2021, 8, 2), dt.date(2021, 8, 3), dt.date(2021, 8, 4)])
+        self.assertEqual(dailies_handler.get_durations(), [30000, 0, 40000, 0])
+        self.assertEqual(sum(dailies_handler.get_durations()), 70000)
+
+    def test_from_frame_rejects_missing_durations(self):
+        df = pd.DataFrame({
+            ipc.ParsedDailiesColumns.START_DT: pd.to_datetime(["2021-08-01", "2021-08-02", "2021-08-03"]),
+            ipc.ParsedDailiesColumns.END_DT: pd.to_datetime(["2021-08-01 10:00", "2021-08-02 10:00", "2021-08-03 10:00"]),
+            ipc.ParsedDailiesColumns.DAILY_DURATION_S: [30000.0, float("nan"), 50000.0]
+        })
+        with self.assertRaises(Exception):
+            CTxPatientDailiesHandler.from_frame(SOME_PAT_ID, df, simple_daily_criterion, simple_patient_criterion)
+
+    def test_handler_is_slotted_and_pickles(self):
+        handler = CTxPatientDailiesHandler(
+            SOME_PAT_ID,
+            [CTxPatientDay(dt.date(2021, 8, 1), 86400, True, "24:00:00"),
+             CTxPatientDay(dt.date(2021, 8, 2), 0, False, "00:00:00")],
+            accepted=True)
+        self.assertFalse(hasattr(handler, "__dict__"))
+        self.assertIsInstance(handler.patient_days, CTxPatientDays)
+        unpickled = pickle.loads(pickle.dumps(handler))
+        self.assertEqual(unpickled, handler)
+        self.assertEqual(unpickled.get_formatted_durations(), ["24:00:00", "00:00:00"])
+        self.assertEqual(list(unpickled.patient_days)[1], CTxPatientDay(dt.date(2021, 8, 2), 0, False, "00:00:00"))
+
+
 class CTxPatientDayTest(unittest.TestCase):
     def test_format_seconds(self):
         self.assertEqual(
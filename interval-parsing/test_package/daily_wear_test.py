@@ -0,0 +1,140 @@
+import unittest
+import numpy as np
+import pandas as pd
+import datetime as dt
+from ctxfitness.daily_wear import EARLIEST_CONSECUTIVE_END, EARLIEST_CONSECUTIVE_START, EARLIEST_WINDOW_END, EARLIEST_WINDOW_PATIENT, EARLIEST_WINDOW_START, earliest_qualifying_windows, WINDOW_ACCEPTED, WINDOW_ACCEPTED_DAYS, WINDOW_BASELINE_DAY, WINDOW_MAX_CONSECUTIVE_DAYS, WINDOW_WEAR_S, baseline_window_acceptance, EVENT_WINDOW_POST_ACCEPTED_DAYS, EVENT_WINDOW_POST_MEAN_WEAR_S, EVENT_WINDOW_POST_OBSERVED_DAYS, EVENT_WINDOW_POST_WEAR_S, EVENT_WINDOW_PRE_ACCEPTED_DAYS, EVENT_WINDOW_PRE_MEAN_WEAR_S, EVENT_WINDOW_PRE_OBSERVED_DAYS, EVENT_WINDOW_PRE_WEAR_S, DailyWear, event_aligned_windows
+from ctxfitness.preprocessing_pipeline import ParsedDailiesColumns as pdc
+
+HOUR = 60 * 60
+
+
+def create_dailies(days) -> pd.DataFrame:
+    # days of (tracker id, date, hours worn)
+    return pd.DataFrame({
+        pdc.USER_LAST_NAME.value: [tracker_id for tracker_id, _day, _hours in days],
+        pdc.START_DT.value: [dt.datetime.combine(day, dt.time()) for _tracker_id, day, _hours in days],
+        pdc.DAILY_DURATION_S.value: [hours * HOUR for _tracker_id, _day, hours in days]
+    })
+
+
+class DailyWearTest(unittest.TestCase):
+    dailies = create_dailies([
+        ("b", dt.date(2022, 6, 1), 10),
+        ("a", dt.date(2022, 6, 3), 2),
+        ("a", dt.date(2022, 6, 1), 9),
+        ("a", dt.date(2022, 6, 4), 12),
+    ])
+
+    def test_from_frame(self):
+        daily_wear = DailyWear.from_frame(DailyWearTest.dailies, min_hours_per_day=8)
+        self.assertSequenceEqual(list(daily_wear.patient_ids), ["a", "b"])
+        self.assertSequenceEqual(list(daily_wear.offsets), [0, 4, 5])
+        self.assertSequenceEqual(list(daily_wear.wear_s / HOUR), [9, 0, 2, 12, 10])
+        self.assertSequenceEqual(list(daily_wear.accepted), [True, False, False, True, True])
+
+    def test_event_aligned_windows(self):
+        daily_wear = DailyWear.from_frame(DailyWearTest.dailies, min_hours_per_day=8)
+        df = event_aligned_windows(daily_wear,
+                                   ["a", "b", "c"],
+                                   [dt.date(2022, 6, 3), dt.date(2022, 6, 1), dt.date(2022, 6, 1)],
+                                   days_before=2, days_after=7)
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_PRE_WEAR_S].iloc[:2] / HOUR), [9, 0])
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_PRE_OBSERVED_DAYS].iloc[:2]), [2, 0])
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_PRE_MEAN_WEAR_S].iloc[:1] / HOUR), [4.5])
+        self.assertTrue(np.isnan(df[EVENT_WINDOW_PRE_MEAN_WEAR_S].iloc[1]))
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_PRE_ACCEPTED_DAYS].iloc[:2]), [1, 0])
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_POST_WEAR_S].iloc[:2] / HOUR), [14, 10])
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_POST_MEAN_WEAR_S].iloc[:2] / HOUR), [7, 10])
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_POST_ACCEPTED_DAYS].iloc[:2]), [1, 1])
+        self.assertSequenceEqual(list(df[EVENT_WINDOW_POST_OBSERVED_DAYS].iloc[:2]), [2, 1])
+        self.assertTrue(df.iloc[2, 2:].isna().all())
+
+    def test_event_aligned_windows_matches_filtering(self):
+        rng = np.random.default_rng(0)
+        days = pd.date_range("2022-06-01", periods=60)
+        dailies = create_dailies([(tracker_id, pd.Timestamp(day).date(), hours) for tracker_id in range(20)
+                                  for day, hours in zip(rng.choice(days, 30, replace=False), rng.integers(0, 24, 30))])
+        daily_wear = DailyWear.from_frame(dailies, min_hours_per_day=8)
+        event_ids = rng.integers(0, 20, 100)
+        event_days = rng.choice(days, 100)
+        df = event_aligned_windows(daily_wear, event_ids, event_days, days_before=7, days_after=5)
+        for i, (tracker_id, event_day) in enumerate(zip(event_ids, event_days)):
+            df_tracker = dailies[dailies[pdc.USER_LAST_NAME] == tracker_id]
+            pre = df_tracker[(df_tracker[pdc.START_DT] >= event_day - pd.Timedelta(days=7)) & (df_tracker[pdc.START_DT] < event_day)]
+            post = df_tracker[(df_tracker[pdc.START_DT] >= event_day) & (df_tracker[pdc.START_DT] < event_day + pd.Timedelta(days=5))]
+            self.assertEqual(df[EVENT_WINDOW_PRE_WEAR_S].iloc[i], pre[pdc.DAILY_DURATION_S].sum())
+            self.assertEqual(df[EVENT_WINDOW_POST_WEAR_S].iloc[i], post[pdc.DAILY_DURATION_S].sum())
+            self.assertEqual(df[EVENT_WINDOW_PRE_ACCEPTED_DAYS].iloc[i], (pre[pdc.DAILY_DURATION_S] >= 8 * HOUR).sum())
+            self.assertEqual(df[EVENT_WINDOW_POST_ACCEPTED_DAYS].iloc[i], (post[pdc.DAILY_DURATION_S] >= 8 * HOUR).sum())
+
+    def test_baseline_window_acceptance(self):
+        dailies = create_dailies([("a", dt.date(2022, 6, d), hours) for d, hours in
+                                  [(1, 9), (2, 9), (3, 1), (4, 9), (5, 9), (6, 9), (8, 9)]]
+                                 + [("b", dt.date(2022, 6, 10), 9), ("b", dt.date(2022, 6, 11), 9)])
+        daily_wear = DailyWear.from_frame(dailies, min_hours_per_day=8)
+        df = baseline_window_acceptance(daily_wear,
+                                        ["a", "a", "b", "c"],
+                                        [pd.Timestamp(2022, 6, 2), pd.NaT, None, pd.Timestamp(2022, 6, 1)],
+                                        window_days=(0, 4),
+                                        min_days=3,
+                                        min_consecutive_days=3)
+        self.assertSequenceEqual(list(df[WINDOW_ACCEPTED_DAYS]), [4, 4, 2, 0])
+        self.assertSequenceEqual(list(df[WINDOW_MAX_CONSECUTIVE_DAYS]), [3, 2, 2, 0])
+        self.assertSequenceEqual(list(df[WINDOW_WEAR_S] / HOUR), [37, 37, 18, 0])
+        self.assertSequenceEqual(list(df[WINDOW_ACCEPTED]), [True, False, False, False])
+        self.assertEqual(df[WINDOW_BASELINE_DAY].iloc[1], pd.Timestamp(2022, 6, 1))
+        self.assertTrue(pd.isna(df[WINDOW_BASELINE_DAY].iloc[3]))
+
+    def test_max_consecutive_accepted_matches_slicing(self):
+        rng = np.random.default_rng(0)
+        days = pd.date_range("2022-06-01", periods=40)
+        dailies = create_dailies([(tracker_id, pd.Timestamp(day).date(), hours) for tracker_id in range(10)
+                                  for day, hours in zip(rng.choice(days, 30, replace=False), rng.integers(0, 24, 30))])
+        daily_wear = DailyWear.from_frame(dailies, min_hours_per_day=6)
+        lower = rng.integers(0, daily_wear.offsets[-1], 500)
+        patients = np.searchsorted(daily_wear.offsets, lower, side="right") - 1
+        upper = rng.integers(lower, daily_wear.offsets[patients + 1] + 1)
+        result = daily_wear.max_consecutive_accepted(lower, upper)
+        for i in range(len(lower)):
+            runs = "".join("1" if a else "0" for a in daily_wear.accepted[lower[i]:upper[i]]).split("0")
+            self.assertEqual(result[i], max(len(run) for run in runs))
+
+    def test_earliest_qualifying_windows(self):
+        dailies = create_dailies([("a", dt.date(2022, 6, d), hours) for d, hours in
+                                  [(1, 9), (2, 9), (3, 1), (6, 9), (7, 9), (8, 9)]]
+                                 + [("b", dt.date(2022, 6, 10), 1)])
+        df = earliest_qualifying_windows(DailyWear.from_frame(dailies, min_hours_per_day=8),
+                                         min_days=3, window_length=5, min_consecutive_days=3)
+        self.assertSequenceEqual(list(df[EARLIEST_WINDOW_PATIENT]), ["a", "b"])
+        self.assertEqual(df[EARLIEST_WINDOW_END].iloc[0], pd.Timestamp(2022, 6, 8))
+        self.assertEqual(df[EARLIEST_WINDOW_START].iloc[0], pd.Timestamp(2022, 6, 4))
+        self.assertEqual(df[EARLIEST_CONSECUTIVE_END].iloc[0], pd.Timestamp(2022, 6, 8))
+        self.assertEqual(df[EARLIEST_CONSECUTIVE_START].iloc[0], pd.Timestamp(2022, 6, 6))
+        self.assertTrue(df.iloc[1, 1:].isna().all())
+
+    def test_earliest_qualifying_windows_without_window_after_many_days(self):
+        # 400 patients of a year each, the last one has no window
+        dailies = create_dailies([(tracker_id, day, 9 if tracker_id < 399 else 1) for tracker_id in range(400)
+                                  for day in [dt.date(2021, 1, 1), dt.date(2021, 12, 31)]])
+        df = earliest_qualifying_windows(DailyWear.from_frame(dailies, min_hours_per_day=8),
+                                         min_days=2, window_length=365, min_consecutive_days=1)
+        self.assertEqual(df[EARLIEST_WINDOW_END].iloc[0], pd.Timestamp(2021, 12, 31))
+        self.assertTrue(df.iloc[-1, 1:].isna().all())
+
+    def test_earliest_qualifying_windows_matches_slicing(self):
+        rng = np.random.default_rng(0)
+        days = pd.date_range("2022-06-01", periods=40)
+        dailies = create_dailies([(tracker_id, pd.Timestamp(day).date(), hours) for tracker_id in range(10)
+                                  for day, hours in zip(rng.choice(days, 30, replace=False), rng.integers(0, 24, 30))])
+        daily_wear = DailyWear.from_frame(dailies, min_hours_per_day=10)
+        df = earliest_qualifying_windows(daily_wear, min_days=4, window_length=7, min_consecutive_days=3)
+        for i in range(len(daily_wear.patient_ids)):
+            accepted = list(daily_wear.accepted[daily_wear.offsets[i]:daily_wear.offsets[i + 1]])
+            first_day = pd.Timestamp(np.datetime64(int(daily_wear.first_days[i]), "D"))
+            window_end = next((d for d in range(len(accepted)) if sum(accepted[max(d - 6, 0):d + 1]) >= 4), None)
+            run_end = next((d for d in range(len(accepted)) if d >= 2 and all(accepted[d - 2:d + 1])), None)
+            for column, expected in [(EARLIEST_WINDOW_END, window_end), (EARLIEST_CONSECUTIVE_END, run_end)]:
+                if expected is None:
+                    self.assertTrue(pd.isna(df[column].iloc[i]))
+                else:
+                    self.assertEqual(df[column].iloc[i], first_day + pd.Timedelta(days=expected))
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import datetime as dt
+from ctxfitness.heart_rate import HEART_RATE_DATE, HEART_RATE_WEAR_INTERVAL, HEART_RATE_WORN, join_wear_intervals, load_and_clean_heart_rate, worn_daily_heart_rate, HEART_RATE_TIMESTAMP_LOCAL, HEART_RATE_USER_ID, HEART_RATE_VALUE, RESAMPLED_HEART_RATE_AVG, RESAMPLED_HEART_RATE_MAX, RESAMPLED_HEART_RATE_MIN, RESAMPLED_HEART_RATE_SAMPLES, load_heart_rate, load_resampled_heart_rate, resample_heart_rate
+from ctxfitness.time_utils import DATE_FORMAT
+
+
+def create_heart_rate_export(samples) -> pd.DataFrame:
+    # samples of (user id, local time, utc offset in hours, heart rate)
+    return pd.DataFrame({
+        "User Id": [user_id for user_id, _time, _offset, _bpm in samples],
+        "User First Name": np.nan,
+        "Start Time (Local)": [time.strftime(DATE_FORMAT) for _user_id, time, _offset, _bpm in samples],
+        "Start Time (UTC)": [(time - dt.timedelta(hours=offset)).strftime(DATE_FORMAT)
+                             for _user_id, time, offset, _bpm in samples],
+        "Heart Rate (bpm)": [bpm for _user_id, _time, _offset, bpm in samples],
+        "Source": "Tracker"
+    })
+
+
+class HeartRateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        start = dt.datetime(2022, 6, 1, 23, 58)
+        self.samples = [
+            ("a", start, 0, 60),
+            ("b", start, 2, 80),
+            ("a", start + dt.timedelta(seconds=30), 0, 70),
+            ("a", start + dt.timedelta(seconds=30), 0, 70),
+            ("a", start + dt.timedelta(minutes=1), 0, 90),
+            ("a", start + dt.timedelta(minutes=1), 0, 90),
+            ("a", start + dt.timedelta(minutes=2, seconds=5), 0, 50),
+        ]
+        # sorted by UTC time like the exports
+        self.export = create_heart_rate_export(self.samples).sort_values("Start Time (UTC)", kind="stable")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, df: pd.DataFrame, file_name: str) -> str:
+        path = os.path.join(self.tmp_dir.name, file_name)
+        if file_name.endswith(".csv"):
+            df.to_csv(path, index=False)
+        else:
+            df.to_excel(path, index=False)
+        return path
+
+    def test_load_heart_rate_drops_duplicates(self):
+        df = load_heart_rate(self.write(self.export, "hr.csv"))
+        self.assertEqual(df.shape[0], 5)
+        self.assertEqual(list(df.columns), [HEART_RATE_USER_ID, HEART_RATE_TIMESTAMP_LOCAL, HEART_RATE_DATE, HEART_RATE_VALUE])
+
+    def test_load_heart_rate_duplicates_across_chunks(self):
+        for chunk_size in [1, 2, 3, 4]:
+            df = load_heart_rate(self.write(self.export, "hr.csv"), chunk_size=chunk_size)
+            self.assertEqual(df.shape[0], 5)
+            self.assertEqual(df[HEART_RATE_VALUE].sum(), 60 + 80 + 70 + 90 + 50)
+
+    def test_load_heart_rate_excel(self):
+        df_csv = load_heart_rate(self.write(self.export, "hr.csv"), chunk_size=2)
+        df_excel = load_heart_rate(self.write(self.export, "hr.xlsx"), chunk_size=2)
+        pd.testing.assert_frame_equal(df_csv, df_excel)
+
+    def test_load_heart_rate_dates(self):
+        df = load_heart_rate(self.write(self.export, "hr.csv"))
+        self.assertSequenceEqual(
+            list(df[HEART_RATE_DATE]),
+            [dt.date(2022, 6, 1), dt.date(2022, 6, 1), dt.date(2022, 6, 1), dt.date(2022, 6, 1), dt.date(2022, 6, 2)])
+        # the same dates as the loader that reads the whole export at once
+        self.assertSequenceEqual(
+            list(df[HEART_RATE_DATE]),
+            list(load_and_clean_heart_rate(self.write(self.export, "hr.csv"))[HEART_RATE_DATE]))
+
+    def test_load_heart_rate_unsorted(self):
+        unsorted = self.export.iloc[::-1]
+        with self.assertRaises(Exception):
+            load_heart_rate(self.write(unsorted, "hr.csv"), chunk_size=2)
+
+    def test_resample_heart_rate_minute(self):
+        df = resample_heart_rate(load_heart_rate(self.write(self.export, "hr.csv")), "minute")
+        df_a = df[df[HEART_RATE_USER_ID] == "a"]
+        self.assertSequenceEqual(list(df_a[RESAMPLED_HEART_RATE_MIN]), [60, 90, 50])
+        self.assertSequenceEqual(list(df_a[RESAMPLED_HEART_RATE_AVG]), [65, 90, 50])
+        self.assertSequenceEqual(list(df_a[RESAMPLED_HEART_RATE_MAX]), [70, 90, 50])
+        self.assertSequenceEqual(list(df_a[RESAMPLED_HEART_RATE_SAMPLES]), [2, 1, 1])
+
+    def test_resample_heart_rate_day(self):
+        df = resample_heart_rate(load_heart_rate(self.write(self.export, "hr.csv")), "day")
+        df_a = df[df[HEART_RATE_USER_ID] == "a"]
+        self.assertSequenceEqual(list(df_a[HEART_RATE_TIMESTAMP_LOCAL]),
+                                 [pd.Timestamp(2022, 6, 1), pd.Timestamp(2022, 6, 2)])
+        self.assertSequenceEqual(list(df_a[RESAMPLED_HEART_RATE_AVG]), [220 / 3, 50])
+
+    def test_load_resampled_heart_rate_matches_in_memory(self):
+        path = self.write(self.export, "hr.csv")
+        for frequency in ["minute", "hour", "day"]:
+            pd.testing.assert_frame_equal(
+                load_resampled_heart_rate(path, frequency, chunk_size=2),
+                resample_heart_rate(load_heart_rate(path), frequency))
+
+    def test_resample_heart_rate_unknown_frequency(self):
+        with self.assertRaises(Exception):
+            resample_heart_rate(load_heart_rate(self.write(self.export, "hr.csv")), "week")
+
+    def test_join_wear_intervals(self):
+        df_heart_rate = load_heart_rate(self.write(self.export, "hr.csv"))
+        df_dailies = pd.DataFrame({
+            "User Id": ["a", "a", "b"],
+            "Start Time (Local)": ["2022-06-01T23:58:00", "2022-06-02T00:00:00", "2022-06-01T00:00:00"],
+            "End Time (Local)": ["2022-06-01T23:59:00", "2022-06-02T08:00:00", "2022-06-01T12:00:00"],
+        }, index=[10, 11, 12])
+        df = join_wear_intervals(df_heart_rate, df_dailies)
+        df_a = df[df[HEART_RATE_USER_ID] == "a"]
+        self.assertSequenceEqual(list(df_a[HEART_RATE_WORN]), [True, True, False, True])
+        self.assertSequenceEqual(list(df_a[HEART_RATE_WEAR_INTERVAL].fillna(-1)), [10, 10, -1, 11])
+        self.assertFalse(df[df[HEART_RATE_USER_ID] == "b"][HEART_RATE_WORN].any())
+
+    def test_worn_daily_heart_rate(self):
+        df_heart_rate = load_heart_rate(self.write(self.export, "hr.csv"))
+        df_dailies = pd.DataFrame({
+            "User Id": ["a", "a"],
+            "Start Time (Local)": ["2022-06-01T23:58:00", "2022-06-02T00:00:00"],
+            "End Time (Local)": ["2022-06-01T23:59:00", "2022-06-02T08:00:00"],
+        })
+        df = worn_daily_heart_rate(df_heart_rate, df_dailies)
+        self.assertSequenceEqual(list(df[RESAMPLED_HEART_RATE_AVG]), [65, 50])
+        self.assertSequenceEqual(list(df[RESAMPLED_HEART_RATE_SAMPLES]), [2, 1])
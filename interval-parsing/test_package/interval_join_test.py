@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+import datetime as dt
+from ctxfitness.interval_join import NO_INTERVAL, assign_to_intervals
+
+
+def brute_force_assign(sample_groups, sample_times, interval_groups, interval_starts, interval_ends):
+    assigned = []
+    for group, time in zip(sample_groups, sample_times):
+        enclosing = [i for i in range(len(interval_starts))
+                     if interval_groups[i] == group and interval_starts[i] <= time < interval_ends[i]]
+        # the furthest reaching interval, the latest started one among equal ends
+        assigned.append(max(enclosing, key=lambda i: (interval_ends[i], interval_starts[i], i))
+                        if len(enclosing) > 0 else NO_INTERVAL)
+    return np.array(assigned)
+
+
+def minutes(values):
+    return np.datetime64("2022-06-01T00:00") + np.array(values, dtype="timedelta64[m]")
+
+
+class IntervalJoinTest(unittest.TestCase):
+    def test_assign_to_intervals(self):
+        assigned = assign_to_intervals(
+            np.array(["a", "a", "a", "b", "a", "c"]),
+            minutes([5, 10, 30, 5, 0, 5]),
+            np.array(["a", "b"]),
+            minutes([0, 0]),
+            minutes([10, 20]))
+        self.assertSequenceEqual(list(assigned), [0, NO_INTERVAL, NO_INTERVAL, 1, 0, NO_INTERVAL])
+
+    def test_assign_to_intervals_overlapping(self):
+        assigned = assign_to_intervals(
+            np.array(["a", "a", "a", "a"]),
+            minutes([5, 15, 25, 35]),
+            np.array(["a", "a", "a"]),
+            minutes([10, 0, 12]),
+            minutes([20, 30, 14]))
+        self.assertSequenceEqual(list(assigned), [1, 1, 1, NO_INTERVAL])
+
+    def test_assign_to_intervals_empty(self):
+        self.assertEqual(len(assign_to_intervals(
+            np.array([]), minutes([]), np.array(["a"]), minutes([0]), minutes([10]))), 0)
+        self.assertSequenceEqual(list(assign_to_intervals(
+            np.array(["a"]), minutes([0]), np.array([]), minutes([]), minutes([]))), [NO_INTERVAL])
+
+    def test_assign_to_intervals_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            n_intervals, n_samples = rng.integers(1, 30), rng.integers(1, 200)
+            interval_groups = rng.choice(["a", "b", "c"], n_intervals)
+            interval_starts = minutes(rng.integers(0, 1000, n_intervals))
+            interval_ends = interval_starts + rng.integers(1, 200, n_intervals).astype("timedelta64[m]")
+            sample_groups = rng.choice(["a", "b", "c", "d"], n_samples)
+            sample_times = minutes(rng.integers(0, 1200, n_samples))
+            assigned = assign_to_intervals(sample_groups, sample_times, interval_groups, interval_starts, interval_ends)
+            expected = brute_force_assign(sample_groups, sample_times, interval_groups, interval_starts, interval_ends)
+            # ties between equally far reaching intervals may go either way
+            is_enclosed = assigned != NO_INTERVAL
+            self.assertSequenceEqual(list(is_enclosed), list(expected != NO_INTERVAL))
+            self.assertTrue(np.array_equal(interval_ends[assigned[is_enclosed]], interval_ends[expected[is_enclosed]]))
+            self.assertTrue((interval_groups[assigned[is_enclosed]] == sample_groups[is_enclosed]).all())
+            self.assertTrue((interval_starts[assigned[is_enclosed]] <= sample_times[is_enclosed]).all())
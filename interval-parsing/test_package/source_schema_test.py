@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from ctxfitness.daily_steps import load_and_process_daily_steps
+from ctxfitness.source_schema import CsvReader, ExcelReader, FeatherReader, ParquetReader, SourceReader, SourceSchema, detect_reader, iter_source_chunks, load_source, open_source_writer, write_source
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_INSTALLED = True
+except ImportError:
+    PYARROW_INSTALLED = False
+
+SCHEMA = SourceSchema(
+    name="test",
+    columns=["User Id", "Start Time (Local)", "Steps"],
+    dtypes={"User Id": "str", "Steps": "float32"},
+    timestamp_columns=["Start Time (Local)"])
+
+
+class SourceSchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({
+            "User Id": ["60ec61f0", "60ec61f1", None],
+            "User First Name": ["A", "B", "C"],
+            "Start Time (Local)": ["2022-06-01T08:00:00", "2022-06-01T09:00:00", "2022-06-02T10:30:00"],
+            "Steps": [10, np.nan, 30]
+        })
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, file_name: str) -> str:
+        path = os.path.join(self.tmp_dir.name, file_name)
+        if file_name.endswith(".csv"):
+            self.df.to_csv(path, index=False)
+        else:
+            self.df.to_excel(path, index=False)
+        return path
+
+    def test_load_source_projects_columns(self):
+        for file_name in ["source.csv", "source.xlsx"]:
+            df = load_source(self.write(file_name), SCHEMA)
+            self.assertEqual(list(df.columns), SCHEMA.columns)
+            self.assertEqual(df["Steps"].dtype, np.float32)
+            self.assertEqual(df["Start Time (Local)"].iloc[2], pd.Timestamp(2022, 6, 2, 10, 30))
+            self.assertEqual(list(df["User Id"].iloc[:2]), ["60ec61f0", "60ec61f1"])
+            self.assertTrue(pd.isna(df["User Id"].iloc[2]))
+
+    def test_load_source_keeps_timestamps_as_read(self):
+        df = load_source(self.write("source.csv"), SCHEMA, parse_timestamps=False)
+        self.assertEqual(df["Start Time (Local)"].iloc[0], "2022-06-01T08:00:00")
+
+    def test_load_source_excluded_columns(self):
+        schema = SourceSchema(name="test", excluded_columns=["User First Name", "Not In Source"])
+        df = load_source(self.write("source.csv"), schema)
+        self.assertEqual(list(df.columns), ["User Id", "Start Time (Local)", "Steps"])
+
+    def test_load_source_missing_columns(self):
+        schema = SourceSchema(name="test", columns=["User Id", "Missing"])
+        with self.assertRaises(Exception):
+            load_source(self.write("source.csv"), schema)
+
+    def test_iter_source_chunks(self):
+        for file_name in ["source.csv", "source.xlsx"]:
+            chunks = list(iter_source_chunks(self.write(file_name), SCHEMA, chunk_size=2))
+            self.assertEqual([chunk.shape[0] for chunk in chunks], [2, 1])
+            pd.testing.assert_frame_equal(
+                pd.concat(chunks, ignore_index=True), load_source(self.write(file_name), SCHEMA))
+
+    def test_load_and_process_daily_steps(self):
+        df = load_and_process_daily_steps(self.write("steps.xlsx"))
+        self.assertEqual(list(df.columns), ["User Id", "Start Time (Local)", "Steps"])
+
+    def test_load_source_timestamps_written_by_pandas(self):
+        path = os.path.join(self.tmp_dir.name, "source.csv")
+        self.df.assign(**{"Start Time (Local)": pd.to_datetime(self.df["Start Time (Local)"])}).to_csv(path, index=False)
+        df = load_source(path, SCHEMA)
+        self.assertEqual(df["Start Time (Local)"].iloc[2], pd.Timestamp(2022, 6, 2, 10, 30))
+
+    def test_detect_reader_by_extension(self):
+        self.assertIsInstance(detect_reader("dailies.xlsx"), ExcelReader)
+        self.assertIsInstance(detect_reader("dailies.csv"), CsvReader)
+        self.assertIsInstance(detect_reader("dailies.feather"), FeatherReader)
+        self.assertIsInstance(detect_reader("dailies.parquet"), ParquetReader)
+
+    def test_incomplete_reader_is_not_instantiated(self):
+        class ReadOnlyReader(SourceReader):
+            def read(self, path: str, schema: SourceSchema) -> pd.DataFrame:
+                return pd.DataFrame()
+
+        with self.assertRaises(TypeError):
+            ReadOnlyReader()
+
+    def test_detect_reader_by_content(self):
+        excel_path = self.write("source.xlsx")
+        os.rename(excel_path, os.path.join(self.tmp_dir.name, "source"))
+        self.assertIsInstance(detect_reader(os.path.join(self.tmp_dir.name, "source")), ExcelReader)
+        csv_path = self.write("source.csv")
+        os.rename(csv_path, os.path.join(self.tmp_dir.name, "source.txt"))
+        self.assertIsInstance(detect_reader(os.path.join(self.tmp_dir.name, "source.txt")), CsvReader)
+
+    @unittest.skipUnless(PYARROW_INSTALLED, "requires pyarrow")
+    def test_columnar_formats(self):
+        expected = load_source(self.write("source.csv"), SCHEMA)
+        for file_name in ["source.feather", "source.parquet"]:
+            path = os.path.join(self.tmp_dir.name, file_name)
+            write_source(self.df, path)
+            pd.testing.assert_frame_equal(load_source(path, SCHEMA), expected)
+            chunks = list(iter_source_chunks(path, SCHEMA, chunk_size=2))
+            self.assertEqual([chunk.shape[0] for chunk in chunks], [2, 1])
+            pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+            self.assertIsInstance(detect_reader(path), FeatherReader if file_name.endswith(".feather") else ParquetReader)
+
+    def test_open_source_writer(self):
+        expected = load_source(self.write("source.csv"), SCHEMA)
+        file_names = ["chunks.csv", "chunks.xlsx"] + (["chunks.feather", "chunks.parquet"] if PYARROW_INSTALLED else [])
+        for file_name in file_names:
+            path = os.path.join(self.tmp_dir.name, file_name)
+            writer = open_source_writer(path)
+            writer.write(self.df.iloc[:2])
+            writer.write(self.df.iloc[2:])
+            writer.close()
+            self.assertEqual(writer.n_chunks, 2)
+            pd.testing.assert_frame_equal(load_source(path, SCHEMA), expected)
+        with self.assertRaises(Exception):
+            open_source_writer(os.path.join(self.tmp_dir.name, "chunks.txt"))
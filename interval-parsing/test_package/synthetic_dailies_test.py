@@ -0,0 +1,104 @@
+import logging
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from ctxfitness.preprocessing_pipeline import RAW_DAILIES_EXCEL_COLUMN_FILTER, PreprocessingPipeline
+from ctxfitness.synthetic_dailies import RAW_DAILIES_COLUMNS, SyntheticDailiesConfig, generate_chunks, generate_dailies, write_synthetic_dataset
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_INSTALLED = True
+except ImportError:
+    PYARROW_INSTALLED = False
+
+
+class SyntheticDailiesTest(unittest.TestCase):
+    config = SyntheticDailiesConfig(n_patients=7, n_study_days=40, seed=3, patients_per_chunk=3)
+
+    def test_generate_dailies_is_reproducible(self):
+        df_first, meta_first = generate_dailies(self.config)
+        df_second, meta_second = generate_dailies(self.config)
+        pd.testing.assert_frame_equal(df_first, df_second)
+        pd.testing.assert_frame_equal(meta_first, meta_second)
+
+    def test_generate_dailies_seed_changes_data(self):
+        df_first, _ = generate_dailies(self.config)
+        df_second, _ = generate_dailies(SyntheticDailiesConfig(
+            n_patients=7, n_study_days=40, seed=4, patients_per_chunk=3))
+        self.assertFalse(df_first.equals(df_second))
+
+    def test_generate_dailies_columns(self):
+        df, meta = generate_dailies(self.config)
+        self.assertEqual(list(df.columns), RAW_DAILIES_COLUMNS)
+        self.assertEqual(meta.shape[0], 7)
+        self.assertEqual(meta["Tracker"].tolist(), list(range(1, 8)))
+        self.assertTrue(set(df["User Last Name"]).issubset(set(meta["Tracker"])))
+        self.assertEqual(df["Summary Id"].nunique(), df.shape[0])
+
+    def test_generate_chunks_sizes(self):
+        chunks = list(generate_chunks(self.config))
+        self.assertEqual([chunk.patient_meta.shape[0] for chunk in chunks], [3, 3, 1])
+
+    def test_generate_dailies_fixed_intervals_per_day(self):
+        df, _ = generate_dailies(SyntheticDailiesConfig(
+            n_patients=2, n_study_days=10, p_stay_active=1, p_become_active=1, p_stay_active_spread=0,
+            intervals_per_active_day=3, overlap_rate=0, multi_day_rate=0))
+        self.assertEqual(df.shape[0], 2 * 10 * 3)
+        starts = pd.to_datetime(df["Start Time (Local)"])
+        ends = pd.to_datetime(df["End Time (Local)"])
+        self.assertTrue((starts.dt.date == ends.dt.date).all())
+        self.assertTrue((ends.values[:-1] <= starts.values[1:])[df["User Id"].values[:-1] == df["User Id"].values[1:]].all())
+
+    def test_generate_dailies_overlaps_and_multi_day_intervals(self):
+        df, _ = generate_dailies(SyntheticDailiesConfig(
+            n_patients=2, n_study_days=30, p_stay_active=1, p_become_active=1, p_stay_active_spread=0,
+            intervals_per_active_day=2, overlap_rate=0.5, multi_day_rate=0.5))
+        starts = pd.to_datetime(df["Start Time (Local)"]).values
+        ends = pd.to_datetime(df["End Time (Local)"]).values
+        same_patient = df["User Id"].values[:-1] == df["User Id"].values[1:]
+        self.assertTrue((ends[:-1] > starts[1:])[same_patient].any())
+        self.assertTrue((pd.to_datetime(df["End Time (Local)"]).dt.date
+                         > pd.to_datetime(df["Start Time (Local)"]).dt.date).any())
+
+    def test_generate_dailies_missing_metrics(self):
+        df, _ = generate_dailies(SyntheticDailiesConfig(
+            n_patients=20, n_study_days=20, missing_metric_patient_rate=0, missing_value_rate=0))
+        self.assertFalse(df["Heart Rate (avg bpm)"].isna().any())
+        df, _ = generate_dailies(SyntheticDailiesConfig(
+            n_patients=20, n_study_days=20, missing_metric_patient_rate=1))
+        self.assertTrue(df["Heart Rate (avg bpm)"].isna().all())
+
+    def test_generate_dailies_runs_through_pipeline(self):
+        logging.getLogger("IntervalNormalizer").setLevel(logging.CRITICAL)
+        df, _ = generate_dailies(SyntheticDailiesConfig(n_patients=2, n_study_days=20, seed=1))
+        df_normalized = PreprocessingPipeline.run_pipeline_on_frame(df[RAW_DAILIES_EXCEL_COLUMN_FILTER])
+        self.assertGreater(df_normalized.shape[0], 0)
+        self.assertEqual(set(df_normalized["Tracker ID"]), set(df["User Last Name"]))
+
+    def test_write_synthetic_dataset_csv(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dailies_path = os.path.join(tmp_dir, "dailies.csv")
+            meta_path = os.path.join(tmp_dir, "patient-meta.csv")
+            n_rows = write_synthetic_dataset(self.config, dailies_path, meta_path)
+            df_expected, meta_expected = generate_dailies(self.config)
+            df = pd.read_csv(dailies_path, dtype={"Summary Id": str})
+            self.assertEqual(n_rows, df_expected.shape[0])
+            self.assertEqual(df.shape, df_expected.shape)
+            np.testing.assert_allclose(df["Duration (s)"], df_expected["Duration (s)"])
+            self.assertEqual(pd.read_csv(meta_path)["User Id"].tolist(), meta_expected["User Id"].tolist())
+
+    @unittest.skipUnless(PYARROW_INSTALLED, "requires pyarrow")
+    def test_write_synthetic_dataset_parquet(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dailies_path = os.path.join(tmp_dir, "dailies.parquet")
+            meta_path = os.path.join(tmp_dir, "patient-meta.parquet")
+            write_synthetic_dataset(self.config, dailies_path, meta_path)
+            df_expected, meta_expected = generate_dailies(self.config)
+            pd.testing.assert_frame_equal(pd.read_parquet(dailies_path), df_expected)
+            self.assertEqual(pd.read_parquet(meta_path)["User Id"].tolist(), meta_expected["User Id"].tolist())
+
+    def test_write_synthetic_dataset_unsupported_extension(self):
+        with self.assertRaises(Exception):
+            write_synthetic_dataset(self.config, "dailies.txt", "patient-meta.csv")